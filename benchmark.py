@@ -0,0 +1,119 @@
+# benchmark.py
+# Offline benchmark of the camera render loop: frames come from frame_sources, windows go to HeadlessDisplay,
+# so it runs on a headless box. Results are JSON, and --compare fails (exit code 1) on throughput regressions.
+#   python benchmark.py --output results.json
+#   python benchmark.py --compare results.json
+import argparse
+import itertools
+import json
+import os
+import platform
+import queue
+import random
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from camera_process import CameraHandler
+from frame_sources import FileSource, SyntheticPCBSource
+from headless_display import HeadlessDisplay
+from perf_stats import PerfStats
+
+class _DiscardQueue:
+    def put(self, item): pass
+
+def random_markers(count, frame_size, seed=0):
+    rng = random.Random(seed)
+    return [{"pos": (rng.randrange(frame_size[0]), rng.randrange(frame_size[1])), "shape": rng.choice(['Cross', 'Circle', 'Square']),
+             "color": rng.choice([(0, 0, 255), (0, 255, 0), (255, 0, 0), (0, 255, 255)]), "size": rng.choice([9, 15, 25]), "desc": ""} for _ in range(count)]
+
+def _percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda fraction: ordered[min(len(ordered)-1, int(fraction * len(ordered)))]
+    return {"mean": sum(ordered)/len(ordered), "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": ordered[-1]}
+
+def run_case(width, height, zoom, marker_count, zoom_windows, frames, warmup, source, display_size=None, reduced_decode=False):
+    """Drives CameraHandler.step() synchronously (no capture thread, no pacing), so every step renders a new frame.
+
+    display_size is the screen area the main window is fitted into; None renders at sensor resolution.
+    With reduced_decode the synthetic source hands over JPEG buffers, decoded at the scale the view needs.
+    """
+    frame_source = (lambda index: SyntheticPCBSource(index)) if source == "synthetic" else (lambda index: FileSource(source))
+    handler = CameraHandler(queue.Queue(), _DiscardQueue(), threaded_capture=False, camera_names={0: "Benchmark"}, frame_source=frame_source, display=HeadlessDisplay(), reduced_decode=reduced_decode)
+    handler.max_display_size = display_size
+    if not handler._initialize_camera(width, height): raise RuntimeError(f"Frame source could not open at {width}x{height}.")
+    frame_size = (handler.frame_width, handler.frame_height)
+    markers = random_markers(marker_count, frame_size)
+    handler._reset_markers(handler._get_current_cam_state(), markers)
+    # Zoom in on the middle of the frame
+    view_w, view_h = int(frame_size[0]/zoom), int(frame_size[1]/zoom)
+    handler.zoom_level, handler.pan_x, handler.pan_y = zoom, (frame_size[0]-view_w)//2, (frame_size[1]-view_h)//2
+    for index in range(min(zoom_windows, marker_count)): handler._dispatch_command('start_zoom_view', {'index': index, 'data': markers[index]})
+    for _ in range(warmup): handler.step()
+    handler.perf, latencies = PerfStats(window=frames), []
+    start = time.perf_counter()
+    for _ in range(frames):
+        step_start = time.perf_counter(); handler.step(); latencies.append((time.perf_counter() - step_start) * 1000)
+    elapsed = time.perf_counter() - start
+    stages = handler.perf.summary()['stages']; handler.close()
+    return {"width": frame_size[0], "height": frame_size[1], "display": list(handler.display_size), "reduced_decode": reduced_decode, "zoom": zoom, "markers": marker_count, "zoom_windows": min(zoom_windows, marker_count),
+            "frames": frames, "fps": frames / elapsed, "latency_ms": _percentiles(latencies),
+            "stages_ms": {stage: {"p50": values['p50'], "p95": values['p95']} for stage, values in stages.items()}}
+
+def case_key(result):
+    return (result['width'], result['height'], tuple(result.get('display', (result['width'], result['height']))), result.get('reduced_decode', False),
+            result['zoom'], result['markers'], result['zoom_windows'])
+
+def compare(results, baseline_path, tolerance):
+    """Cases whose fps dropped more than tolerance (a fraction) below the baseline file's."""
+    with open(baseline_path, 'r') as f: baseline = {case_key(r): r for r in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        before = baseline.get(case_key(result))
+        if before and result['fps'] < before['fps'] * (1 - tolerance):
+            regressions.append({"case": dict(zip(("width", "height", "display", "reduced_decode", "zoom", "markers", "zoom_windows"), case_key(result))), "fps": result['fps'], "baseline_fps": before['fps']})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="PCB Cam render-loop benchmark")
+    parser.add_argument('--resolutions', nargs='+', default=["1280x720", "1920x1080", "3840x2160", "4656x3496"])
+    parser.add_argument('--zooms', nargs='+', type=float, default=[1.0, 4.0])
+    parser.add_argument('--markers', nargs='+', type=int, default=[0, 1000])
+    parser.add_argument('--zoom-windows', nargs='+', type=int, default=[0, 4])
+    parser.add_argument('--display', default="1920x1080", help="Screen area WxH the main window is fitted into, or 'sensor' to render at full frame size")
+    parser.add_argument('--reduced-decode', action='store_true', help="Decode JPEG frames at reduced scale where the view allows (see main.py --reduced-decode)")
+    parser.add_argument('--frames', type=int, default=60)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--source', default="synthetic", help="'synthetic' or the path of an image/video file")
+    parser.add_argument('--output', help="Write the JSON results here instead of stdout")
+    parser.add_argument('--compare', help="Baseline results file; exit with status 1 if any case is slower than it by more than --tolerance")
+    parser.add_argument('--tolerance', type=float, default=0.15)
+    args = parser.parse_args()
+    if args.source != "synthetic" and not os.path.exists(args.source): parser.error(f"Frame source '{args.source}' not found.")
+    display_size = None if args.display == "sensor" else tuple(int(v) for v in args.display.lower().split('x'))
+
+    results, seen = [], set()
+    for resolution, zoom, marker_count, zoom_windows in itertools.product(args.resolutions, args.zooms, args.markers, args.zoom_windows):
+        width, height = (int(v) for v in resolution.lower().split('x'))
+        # A zoom window needs a marker to follow, so e.g. 0 markers with 4 windows is the same case as with none
+        if (resolution, zoom, marker_count, min(zoom_windows, marker_count)) in seen: continue
+        seen.add((resolution, zoom, marker_count, min(zoom_windows, marker_count)))
+        result = run_case(width, height, zoom, marker_count, zoom_windows, args.frames, args.warmup, args.source, display_size, args.reduced_decode)
+        results.append(result)
+        print(f"{result['width']}x{result['height']} on {result['display'][0]}x{result['display'][1]} zoom {zoom:g} markers {marker_count} zoom windows {result['zoom_windows']}: "
+              f"{result['fps']:.1f} fps, p50 {result['latency_ms']['p50']:.2f} ms, p95 {result['latency_ms']['p95']:.2f} ms", file=sys.stderr)
+    report = {"meta": {"timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'), "host": platform.node(), "platform": platform.platform(), "machine": platform.machine(),
+                       "cpu_count": os.cpu_count(), "python": platform.python_version(), "opencv": cv2.__version__, "numpy": np.__version__,
+                       "source": args.source, "display": args.display, "reduced_decode": args.reduced_decode, "frames": args.frames, "warmup": args.warmup}, "results": results}
+    if args.compare:
+        report['regressions'] = compare(results, args.compare, args.tolerance)
+        for regression in report['regressions']: print(f"REGRESSION {regression['case']}: {regression['fps']:.1f} fps vs {regression['baseline_fps']:.1f} fps", file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w') as f: json.dump(report, f, indent=4)
+    else: json.dump(report, sys.stdout, indent=4); print()
+    return 1 if report.get('regressions') else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
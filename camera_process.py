@@ -2,12 +2,24 @@
 import cv2
 import numpy as np
 import queue
+import collections
 import time
 import math
 import sys
 import subprocess
 import json
 
+from capture import BackgroundReconnect, LatestFrameGrabber, decode_frame
+from frame_ring import FrameRingWriter
+from frame_sources import open_frame_source
+import v4l2_native
+from marker_index import MarkerIndex
+from marker_store import MarkerStore
+from message_channel import StampedSender, unpack_message
+from perf_stats import NULL_STATS, PerfStats
+from undo_history import UndoHistory
+from render import MarkerOverlay, crop_zoom_patch, draw_banner, draw_single_marker, render_view, view_size
+
 if sys.platform == "win32":
     try:
         import comtypes
@@ -15,53 +27,109 @@ if sys.platform == "win32":
     except ImportError: print("CAM: WARNING - 'comtypes' library not found.")
 
 class CameraHandler:
-    def __init__(self, command_queue, update_queue):
+    def __init__(self, command_queue, update_queue, threaded_capture=True, render_fps=30, camera_names=None, frame_source=None, display=None, reduced_decode=False, decode_workers=0, keep_warm=False, window_name="PCB Cam"):
         self.command_queue, self.update_queue = command_queue, update_queue
+        # frame_source(index) opens a VideoCapture-like object and display provides the HighGUI calls (see frame_sources, headless_display)
+        self.frame_source, self.display = frame_source or cv2.VideoCapture, display or cv2
         self.camera_states = {}
         self.zoom_level, self.pan_x, self.pan_y = 1.0, 0, 0
         self.is_panning, self.last_mouse_pos = False, (0, 0)
         self.right_button_down, self.pan_start_pos = False, (0,0)
         self.DRAG_THRESHOLD_SQ = 5**2
         self.frame_height, self.frame_width = 1080, 1920
-        self.WINDOW_NAME, self.device_index, self.camera_name = "Initializing...", 0, "Unknown Camera"
+        # The main view is rendered at display_size, the frame fitted into the window; max_display_size (set by the GUI from the screen size) caps its initial size
+        self.max_display_size, self.display_size = None, (1920, 1080)
+        # One main window for the whole session; its title shows the camera and resolution. Each camera in multi-camera mode has its own window_name
+        self.WINDOW_NAME, self.window_open, self.device_index, self.camera_name = window_name, False, 0, "Unknown Camera"
+        # With keep_warm the camera switched away from stays open (one at a time), so switching back skips opening it
+        self.keep_warm, self.warm_captures = keep_warm, {}
+        # Time from a switch/resolution/restart command to the first frame from the new capture
+        self.switch_started_at, self.switch_latency_ms = None, collections.deque(maxlen=50)
+        # time.time() at application launch, set by run_camera_process, for the time-to-first-frame report
+        self.launched_at = None
+        # Session-wide {index: name}, seeded from the capability discovery in main.py and filled in by _get_camera_name
+        self.camera_names = dict(camera_names or {})
         
         # This variable holds the data for active zoom windows
         self.zoomed_markers = {}
         
         self.marker_shape, self.marker_color, self.marker_size = 'Cross', (0,0,255), 15
-        self.restart_attempts, self.MAX_RESTART_ATTEMPTS = 0, 5
+        # A failed grab starts a BackgroundReconnect; until it succeeds the last good frame is shown under a banner
+        self.v, self.reconnect, self.last_frame, self.banner, self.MAX_RESTART_ATTEMPTS = None, None, None, None, 8
+        self.MARKER_RESYNC_EVERY = 256
+
+        # Capture-thread mode: frames are grabbed on a background thread and the render loop runs at render_fps
+        self.threaded_capture, self.render_fps = threaded_capture, render_fps
+        # Reduced-decode mode: the camera hands over raw MJPEG and frames are decoded at 1/2, 1/4 or 1/8 scale whenever that still covers the display
+        self.reduced_decode = reduced_decode
+        # With decode_workers the capture thread only grabs raw MJPEG and a pool of that many threads decodes it (capture-thread mode only)
+        self.decode_workers = decode_workers if threaded_capture else 0
+        self.grabber, self.last_frame_seq, self.view_dirty = None, 0, True
+        self.frame_stats = {'rendered': 0, 'dropped': 0, 'stale': 0}
+        # Queue depth is the number of commands found waiting per drain; latency is send-to-execute time
+        self.command_stats = {'processed': 0, 'coalesced': 0, 'last_depth': 0, 'max_depth': 0, 'latency_ms': collections.deque(maxlen=500)}
+        # While the GUI asks for frames (share_frames), each rendered frame is also copied into a shared-memory ring it can read
+        self.share_frames, self.frame_ring = False, None
+        # Per-stage timers are off (a null object) until the GUI's Performance window asks for them
+        self.perf, self.PERF_REPORT_INTERVAL, self.perf_reported_at = NULL_STATS, 1.0, 0.0
 
     def _get_current_cam_state(self):
         if self.device_index not in self.camera_states:
-            self.camera_states[self.device_index] = {"markers": [], "undo_stack": [], "redo_stack": []}
+            self.camera_states[self.device_index] = {"camera": self.device_index, "markers": MarkerStore(), "index": MarkerIndex(), "history": UndoHistory(), "overlay": MarkerOverlay(),
+                                                     "version": 0, "deltas_since_sync": 0}
         return self.camera_states[self.device_index]
-    def _sync_gui_markers(self): self.update_queue.put(('sync_markers', self._get_current_cam_state()['markers']))
+    # --- Marker edits: every change to a marker store goes through these so the grid index, overlay and GUI table stay in step ---
+    def _insert_marker(self, state, index, marker):
+        state['markers'].insert(index, marker); state['index'].insert(index, marker['pos']); self._markers_changed(state, ('insert', index, marker))
+    def _append_marker(self, state, marker): self._insert_marker(state, len(state['markers']), marker)
+    def _remove_marker(self, state, index):
+        marker = state['markers'].pop(index); state['index'].remove(index); self._markers_changed(state, ('remove', index, None)); return marker
+    def _replace_marker(self, state, index, marker):
+        state['markers'][index] = marker; state['index'].move(index, marker['pos']); self._markers_changed(state, ('replace', index, marker))
+    def _translate_markers(self, state, dx, dy):
+        state['markers'].translate(dx, dy); state['index'].rebuild(state['markers']); self._markers_changed(state)
+    def _reset_markers(self, state, markers):
+        state['markers'] = MarkerStore(markers); state['index'].rebuild(state['markers']); self._markers_changed(state)
+    def _markers_changed(self, state, delta=None):
+        state['overlay'].invalidate(); self.view_dirty = True
+        # The GUI gets each edit as a versioned delta; a reset, or every MARKER_RESYNC_EVERY deltas, sends the whole list instead
+        state['version'] += 1; state['deltas_since_sync'] += 1
+        if delta is None or state['deltas_since_sync'] >= self.MARKER_RESYNC_EVERY: self._sync_gui_markers(state)
+        else: self.update_queue.put(('marker_delta', (state['camera'], state['version']) + delta))
+    def _sync_gui_markers(self, state=None):
+        state = state or self._get_current_cam_state(); state['deltas_since_sync'] = 0
+        self.update_queue.put(('sync_markers', (state['camera'], state['version'], state['markers'].to_list())))
+    def _apply_history(self, state, entry, forward):
+        """Applies an UndoHistory entry again (forward, for redo) or reverts it (for undo)."""
+        action_type = entry[0]
+        if action_type == 'group':
+            for part in (entry[2] if forward else reversed(entry[2])): self._apply_history(state, part, forward)
+        elif action_type in ('add', 'delete'):
+            if (action_type == 'add') == forward: self._insert_marker(state, entry[1], entry[2])
+            else: self._remove_marker(state, entry[1])
+        elif action_type == 'modify':
+            marker = state['markers'][entry[1]]
+            marker.update({field: change[1] if forward else change[0] for field, change in entry[2].items()})
+            self._replace_marker(state, entry[1], marker)
+        elif action_type == 'translate':
+            (dx, dy), sign = entry[1], 1 if forward else -1; self._translate_markers(state, sign*dx, sign*dy)
     def _undo_action(self):
-        state = self._get_current_cam_state()
-        if not state['undo_stack']: return
-        last_action = state['undo_stack'].pop(); state['redo_stack'].append(last_action)
-        action_type = last_action.get('action_type')
-        if action_type == 'add': state['markers'].pop()
-        elif action_type == 'delete': state['markers'].insert(last_action['index'], last_action['data'])
-        elif action_type == 'modify': state['markers'][last_action['index']] = last_action['old_data']
-        self._sync_gui_markers()
+        state = self._get_current_cam_state(); entry = state['history'].undo()
+        if entry is not None: self._apply_history(state, entry, forward=False)
     def _redo_action(self):
-        state = self._get_current_cam_state()
-        if not state['redo_stack']: return
-        last_action = state['redo_stack'].pop(); state['undo_stack'].append(last_action)
-        action_type = last_action.get('action_type')
-        if action_type == 'add': state['markers'].append(last_action['data'])
-        elif action_type == 'delete': del state['markers'][last_action['index']]
-        elif action_type == 'modify': state['markers'][last_action['index']] = last_action['new_data']
-        self._sync_gui_markers()
+        state = self._get_current_cam_state(); entry = state['history'].redo()
+        if entry is not None: self._apply_history(state, entry, forward=True)
+    def _history_bytes(self): return sum(state['history'].nbytes for state in self.camera_states.values())
     def _get_camera_name(self):
-        if sys.platform == "win32":
-            name = self._get_camera_name_windows_comtypes()
-            if name == f"Camera {self.device_index}": name = self._get_camera_name_windows_powershell()
-            return name
-        elif sys.platform.startswith("linux"): return self._get_camera_name_linux()
-        else: return f"Camera {self.device_index}"
-    def _get_camera_name_windows_comtypes(self):
+        # An index with no name yet is most likely a camera plugged in since the last enumeration, so enumerate again
+        # (this only runs when a camera is opened or switched to, never per frame)
+        if self.device_index not in self.camera_names: self.camera_names.update(self._enumerate_camera_names())
+        return self.camera_names.get(self.device_index, f"Camera {self.device_index}")
+    def _enumerate_camera_names(self):
+        if sys.platform == "win32": return self._enumerate_camera_names_windows_comtypes() or self._enumerate_camera_names_windows_powershell()
+        elif sys.platform.startswith("linux"): return self._enumerate_camera_names_linux()
+        else: return {}
+    def _enumerate_camera_names_windows_comtypes(self):
         try:
             comtypes.CoInitialize()
             DEVICES_CATEGORY_GUID="{860BB310-5D01-11d0-BD3B-00A0C911CE86}"; devices = []
@@ -72,127 +140,238 @@ class CameraHandler:
                     prop_bag = pMoniker.BindToStorage(0, 0, comtypes.GUID("{55272A00-42CB-11CE-8135-00AA004BB851}"))
                     devices.append(prop_bag.Read("FriendlyName", 0))
             comtypes.CoUninitialize()
-            if self.device_index < len(devices): return devices[self.device_index]
+            return dict(enumerate(devices))
         except Exception as e: print(f"CAM: comtypes method failed. Error: {e}")
-        return f"Camera {self.device_index}"
-    def _get_camera_name_windows_powershell(self):
+        return {}
+    def _enumerate_camera_names_windows_powershell(self):
         print("CAM: comtypes failed, trying PowerShell fallback...")
         try:
             command = "Get-PnpDevice -Class 'Camera','Image' -Status 'OK' | Select-Object FriendlyName | ConvertTo-Json"
             result = subprocess.run(["powershell", "-Command", command], capture_output=True, text=True, check=True)
             output = result.stdout.strip()
-            if not output: return f"Camera {self.device_index}"
+            if not output: return {}
             data = json.loads(output);
             if not isinstance(data, list): data = [data]
-            devices = [item['FriendlyName'] for item in data]
-            if self.device_index < len(devices): return devices[self.device_index]
+            return dict(enumerate(item['FriendlyName'] for item in data))
         except Exception as e: print(f"CAM: PowerShell method failed. Error: {e}")
-        return f"Camera {self.device_index}"
-    def _get_camera_name_linux(self):
+        return {}
+    def _enumerate_camera_names_linux(self):
+        if v4l2_native.is_available(): return dict(v4l2_native.list_video_nodes())
         try:
             cmd = "v4l2-ctl --list-devices"; result = subprocess.run(cmd.split(), capture_output=True, text=True)
-            output = result.stdout.strip(); devices = []; current_device_name = None; device_paths = []
-            for line in output.split('\n'):
-                if not line.startswith('\t'): current_device_name = line.strip().split(' (')[0]; device_paths = []
-                elif line.strip().startswith('/dev/video'): device_paths.append(line.strip())
-                if current_device_name and device_paths:
-                    for path in device_paths:
-                        try:
-                            index = int(path.replace('/dev/video', ''))
-                            if not any(d['name'] == current_device_name for d in devices): devices.append({"index": index, "name": current_device_name})
-                        except ValueError: continue
-                    device_paths = []
-            if self.device_index < len(devices): return devices[self.device_index]['name']
-        except Exception as e: print(f"CAM: Could not get camera name using v4l2-ctl. Error: {e}")
-        return f"Camera {self.device_index}"
+            names, current_device_name = {}, None
+            for line in result.stdout.strip().split('\n'):
+                if not line.startswith('\t'): current_device_name = line.strip().split(' (')[0]
+                elif line.strip().startswith('/dev/video'):
+                    try: names[int(line.strip().replace('/dev/video', ''))] = current_device_name
+                    except ValueError: continue
+            return names
+        except Exception as e: print(f"CAM: Could not get camera names using v4l2-ctl. Error: {e}")
+        return {}
+    def _stop_grabber(self):
+        """Stops the capture thread. One stuck in the camera keeps the capture and releases it itself, so self.v is dropped."""
+        if self.grabber is None: return
+        stopped = self.grabber.stop(); decoder = self.grabber.decoder; self.grabber = None
+        if not stopped: print("CAM: Capture thread did not stop in time; it will release the camera when it returns."); self.v = None
+        if decoder is not None: print(f"CAM: Decode pool: {decoder.decoded} frames decoded on {decoder.workers} threads, {decoder.dropped} dropped behind the decoders.")
+    def _cancel_reconnect(self):
+        if self.reconnect is not None: self.reconnect.cancel(); self.reconnect, self.banner = None, None
     def _initialize_camera(self, w=1920, h=1080):
-        if hasattr(self, 'v'):
-            try: cv2.destroyWindow(self.WINDOW_NAME)
-            except cv2.error: pass
-            self.v.release()
+        """Opens the current device from scratch, releasing whatever capture was open."""
+        self._cancel_reconnect(); self._stop_grabber()
+        if self.v is not None: self.v.release(); self.v = None
         self.camera_name = self._get_camera_name()
-        self.v = cv2.VideoCapture(self.device_index)
-        if not self.v.isOpened(): print("CAM: Error: Could not open camera."); return False
-        self.v.set(cv2.CAP_PROP_FRAME_WIDTH, w); self.v.set(cv2.CAP_PROP_FRAME_HEIGHT, h)
-        self.v.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
-        self.frame_width = int(self.v.get(cv2.CAP_PROP_FRAME_WIDTH))
-        self.frame_height = int(self.v.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        if self.frame_width == 0 or self.frame_height == 0: print("CAM: Error: Failed to set resolution."); return False
-        self.WINDOW_NAME = f"{self.camera_name} - {self.frame_width}x{self.frame_height}"
-        cv2.namedWindow(self.WINDOW_NAME); cv2.setMouseCallback(self.WINDOW_NAME, self.mouse_events)
-        status = {"name": self.camera_name, "index": self.device_index, "resolution": (self.frame_width, self.frame_height)}
-        self.update_queue.put(('status_update', status))
+        capture = self._open_capture(w, h)
+        if capture is None: return False
+        self._start_capture(capture)
+        return True
+    def _switch_to(self, index, w, h):
+        """Switches to camera index at w x h, reusing what it can: the open capture if the camera stays the same
+        (only the resolution is set), a warm capture kept from earlier, and the main window in every case.
+        If the new camera cannot be opened, the loop's background reconnect takes over."""
+        started = time.perf_counter(); self._cancel_reconnect()
+        if self.v is None: self.device_index = index; opened = self._initialize_camera(w, h)
+        else:
+            self._stop_grabber()
+            if index != self.device_index:
+                warm = self.warm_captures.pop(index, None)
+                if self.v is not None: self._park_capture(self.device_index, self.v)
+                self.device_index = index; self.camera_name = self._get_camera_name()
+                self.v = warm
+            # Also when a capture thread that would not stop kept the old capture
+            if self.v is None: self.v = self._open_capture(w, h)
+            if self.v is not None and (int(self.v.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.v.get(cv2.CAP_PROP_FRAME_HEIGHT))) != (w, h):
+                self.v.set(cv2.CAP_PROP_FRAME_WIDTH, w); self.v.set(cv2.CAP_PROP_FRAME_HEIGHT, h)
+                if int(self.v.get(cv2.CAP_PROP_FRAME_WIDTH)) == 0 or int(self.v.get(cv2.CAP_PROP_FRAME_HEIGHT)) == 0:
+                    print("CAM: Error: Failed to set resolution."); self.v.release(); self.v = None
+            opened = self.v is not None
+            if opened: self._start_capture(self.v)
+        if opened: self.switch_started_at = started
+        return opened
+    def _park_capture(self, index, capture):
+        if not self.keep_warm: capture.release(); return
+        for other in [i for i in self.warm_captures if i != index]: self.warm_captures.pop(other).release()
+        self.warm_captures[index] = capture
+    def _open_capture(self, w, h, index=None):
+        """Opens device index (the current one by default) at w x h; None if it cannot be opened. Touches no windows, so it may run on the reconnect thread."""
+        capture = self.frame_source(self.device_index if index is None else index)
+        if not capture.isOpened(): print("CAM: Error: Could not open camera."); capture.release(); return None
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH, w); capture.set(cv2.CAP_PROP_FRAME_HEIGHT, h)
+        capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+        if self.reduced_decode or self.decode_workers: capture.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+        if int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)) == 0 or int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)) == 0:
+            print("CAM: Error: Failed to set resolution."); capture.release(); return None
+        return capture
+    def _start_capture(self, capture):
+        """Makes capture the live one: frame size, main window (created once, refitted if the aspect ratio changed), title and capture thread."""
+        self.v = capture
+        old_size = (self.frame_width, self.frame_height)
+        self.frame_width, self.frame_height = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        # A last frame of another size would be shown mis-scaled under a reconnect banner
+        if old_size != (self.frame_width, self.frame_height): self.zoom_level, self.pan_x, self.pan_y, self.last_frame = 1.0, 0, 0, None
+        if not self.window_open:
+            self.display.namedWindow(self.WINDOW_NAME, cv2.WINDOW_NORMAL | cv2.WINDOW_KEEPRATIO); self.display.setMouseCallback(self.WINDOW_NAME, self.mouse_events)
+            self.window_open = True; self._resize_main_window()
+        elif old_size[0]*self.frame_height != old_size[1]*self.frame_width: self._resize_main_window()
+        self.display.setWindowTitle(self.WINDOW_NAME, f"{self.camera_name} - {self.frame_width}x{self.frame_height}")
+        if self.threaded_capture: self.grabber, self.last_frame_seq = LatestFrameGrabber(self.v, self.perf, self._decode_reduction(), self.decode_workers).start(), 0
+        self.view_dirty = True; self._send_status()
         return True
+    def _send_status(self):
+        self.update_queue.put(('status_update', {"name": self.camera_name, "index": self.device_index, "resolution": (self.frame_width, self.frame_height)}))
+        if self.frame_ring is not None: self.update_queue.put(('frame_ring', (self.device_index, self.frame_ring.info())))
+    def _publish_frame(self, frame):
+        """Copies frame into the shared-memory ring, replacing the ring (and telling the GUI where the new one is) when the frame no longer fits."""
+        if self.frame_ring is None or not self.frame_ring.fits(frame.nbytes):
+            self._close_frame_ring(notify=False)
+            self.frame_ring = FrameRingWriter(max(frame.nbytes, self.frame_width*self.frame_height*3))
+            self.update_queue.put(('frame_ring', (self.device_index, self.frame_ring.info())))
+        with self.perf.time('share'): self.frame_ring.write(frame)
+    def _close_frame_ring(self, notify=True):
+        if self.frame_ring is None: return
+        self.frame_ring.close(); self.frame_ring = None
+        if notify: self.update_queue.put(('frame_ring', (self.device_index, None)))
+    def _fit_display_size(self, bounds):
+        """The frame size scaled down (never up) to fit bounds, keeping its aspect ratio."""
+        if not bounds: return self.frame_width, self.frame_height
+        scale = min(1.0, bounds[0]/self.frame_width, bounds[1]/self.frame_height)
+        return max(1, int(round(self.frame_width*scale))), max(1, int(round(self.frame_height*scale)))
+    def _resize_main_window(self):
+        self.display_size = self._fit_display_size(self.max_display_size)
+        try: self.display.resizeWindow(self.WINDOW_NAME, *self.display_size)
+        except cv2.error: pass
+    def _update_display_size(self):
+        """Follows the main window's image area, so the view is rendered at the size it is shown (the user may have resized the window)."""
+        try: rect = self.display.getWindowImageRect(self.WINDOW_NAME)
+        except cv2.error: return
+        if rect[2] > 0 and rect[3] > 0: self.display_size = self._fit_display_size(rect[2:4])
+    def _decode_reduction(self):
+        """The JPEG decode scale divisor for the next frame: None when frames arrive decoded, else the largest of 8, 4, 2
+        that still leaves at least one frame pixel per display pixel. Zoom windows show full detail, so they force 1."""
+        if not self.reduced_decode: return 1 if self.decode_workers else None
+        if self.zoomed_markers: return 1
+        view_w, view_h = view_size((self.frame_width, self.frame_height), self.zoom_level)
+        for reduction in (8, 4, 2):
+            if view_w/reduction >= self.display_size[0] and view_h/reduction >= self.display_size[1]: return reduction
+        return 1
+    def _window_scale(self):
+        """Rotated-frame pixels per main-window pixel along x and y."""
+        view_w, view_h = view_size((self.frame_width, self.frame_height), self.zoom_level)
+        return view_w/self.display_size[0], view_h/self.display_size[1]
+    def _window_to_rotated(self, x, y):
+        """Maps a main-window pixel to rotated-frame coordinates, through pixel centres as cv2.resize maps them."""
+        scale_x, scale_y = self._window_scale()
+        return self.pan_x + (x+0.5)*scale_x - 0.5, self.pan_y + (y+0.5)*scale_y - 0.5
+    def _drain_commands(self):
+        """Takes every command waiting on command_queue and drops the ones a later command supersedes.
+
+        Repeated set_property for one property, update_marker for one index and set_marker_* collapse to
+        the newest. Any other command is a barrier: nothing is merged across it, so ordering is preserved.
+        """
+        commands, pending, drained, stats = [], {}, 0, self.command_stats
+        while True:
+            try: item = self.command_queue.get_nowait()
+            except queue.Empty: break
+            drained += 1
+            command, value, sent_at = unpack_message(item)
+            if command in ('set_property', 'update_marker'): key = (command, value[0])
+            elif command in ('set_marker_shape', 'set_marker_color', 'set_marker_size'): key = (command,)
+            else: key = None; pending.clear()
+            if key is not None and key in pending:
+                commands[pending[key]] = (command, value, sent_at); stats['coalesced'] += 1
+            else:
+                if key is not None: pending[key] = len(commands)
+                commands.append((command, value, sent_at))
+        stats['last_depth'], stats['max_depth'] = drained, max(stats['max_depth'], drained)
+        return commands
     def handle_commands(self):
-        try:
-            command, value = self.command_queue.get_nowait()
+        for command, value, sent_at in self._drain_commands():
+            if sent_at is not None: self.command_stats['latency_ms'].append((time.time() - sent_at) * 1000)
+            self.command_stats['processed'] += 1
+            if not self._dispatch_command(command, value): return False
+        return True
+    def _dispatch_command(self, command, value):
+        state = self._get_current_cam_state(); self.view_dirty = True
+        if command == 'exit': return False
+        elif command == 'start_zoom_view':
+            marker_info = value; index = marker_info['index']
+            self.zoomed_markers[index] = marker_info['data']
+            zoom_window_name = self._zoom_window_name(index)
+            self.display.namedWindow(zoom_window_name, cv2.WINDOW_NORMAL)
+            self.display.setWindowProperty(zoom_window_name, cv2.WND_PROP_TOPMOST, 1)
+        elif command == 'switch_camera':
+            self._switch_to(value, self.frame_width, self.frame_height)
+            self._sync_gui_markers()
+        elif command == 'restart_camera':
+            started = time.perf_counter()
+            if self._initialize_camera(self.frame_width, self.frame_height): self.switch_started_at = started
+        elif command == 'delete_marker_confirmed':
+            index_to_delete = value
+            if 0 <= index_to_delete < len(state['markers']):
+                state['history'].delete(index_to_delete, self._remove_marker(state, index_to_delete))
+        elif command == 'update_marker':
+            index, new_marker_data = value
+            if 0 <= index < len(state['markers']):
+                state['history'].modify(index, state['markers'][index], new_marker_data)
+                self._replace_marker(state, index, new_marker_data)
+        elif command == 'move_all_markers':
+            # One undo step however many markers there are
+            with state['history'].group('move_all_markers'): self._translate_markers(state, *value); state['history'].translate(*value)
+        elif command == 'set_resolution': self._switch_to(self.device_index, value[0], value[1])
+        elif command == 'set_property':
+            prop_name, val = value
+            prop_map = {'brightness': cv2.CAP_PROP_BRIGHTNESS, 'contrast': cv2.CAP_PROP_CONTRAST}
+            # The capture thread owns the capture while it runs, so it makes the change itself between grabs
+            if prop_name in prop_map and self.grabber is not None: self.grabber.set_property(prop_map[prop_name], val)
+            elif prop_name in prop_map and self.v is not None: self.v.set(prop_map[prop_name], val)
+        elif command == 'clear_markers':
+            self._reset_markers(state, []); state['history'].clear()
+        elif command == 'load_file':
+            res = value.get('resolution', (1920, 1080))
+            self._switch_to(value.get('camera_index', self.device_index), res[0], res[1])
             state = self._get_current_cam_state()
-            if command == 'exit': return False
-            elif command == 'start_zoom_view':
-                marker_info = value; index = marker_info['index']
-                self.zoomed_markers[index] = marker_info['data']
-                zoom_window_name = f"Zoom - Marker #{index + 1}"
-                cv2.namedWindow(zoom_window_name, cv2.WINDOW_NORMAL)
-                cv2.setWindowProperty(zoom_window_name, cv2.WND_PROP_TOPMOST, 1)
-            elif command == 'switch_camera':
-                self.device_index = value; self._initialize_camera(self.frame_width, self.frame_height)
-                self._sync_gui_markers()
-            elif command == 'restart_camera': self._initialize_camera(self.frame_width, self.frame_height)
-            elif command == 'delete_marker_confirmed':
-                index_to_delete = value
-                if 0 <= index_to_delete < len(state['markers']):
-                    deleted_marker = state['markers'].pop(index_to_delete)
-                    action = {'action_type': 'delete', 'index': index_to_delete, 'data': deleted_marker}
-                    state['undo_stack'].append(action); state['redo_stack'].clear(); self._sync_gui_markers()
-            elif command == 'update_marker':
-                index, new_marker_data = value
-                if 0 <= index < len(state['markers']):
-                    old_marker_data = state['markers'][index]
-                    action = {'action_type': 'modify', 'index': index, 'old_data': old_marker_data, 'new_data': new_marker_data}
-                    state['undo_stack'].append(action); state['redo_stack'].clear()
-                    state['markers'][index] = new_marker_data; self._sync_gui_markers()
-            elif command == 'set_resolution': self._initialize_camera(value[0], value[1])
-            elif command == 'set_property':
-                prop_name, val = value
-                prop_map = {'brightness': cv2.CAP_PROP_BRIGHTNESS, 'contrast': cv2.CAP_PROP_CONTRAST}
-                if prop_name in prop_map: self.v.set(prop_map[prop_name], val)
-            elif command == 'clear_markers':
-                state['markers'].clear(); state['undo_stack'].clear(); state['redo_stack'].clear(); self._sync_gui_markers()
-            elif command == 'load_file':
-                self.device_index = value.get('camera_index', self.device_index)
-                state = self._get_current_cam_state()
-                state['markers'] = value.get('markers', []); state['undo_stack'].clear(); state['redo_stack'].clear()
-                res = value.get('resolution', (1920, 1080))
-                self._initialize_camera(res[0], res[1]); self._sync_gui_markers()
-            elif command == 'set_marker_shape': self.marker_shape = value
-            elif command == 'set_marker_color': self.marker_color = value
-            elif command == 'set_marker_size': self.marker_size = value
-        except queue.Empty: pass
+            self._reset_markers(state, value.get('markers', [])); state['history'].clear()
+        elif command == 'set_perf_stats':
+            self.perf = PerfStats() if value else NULL_STATS
+            if self.grabber is not None: self.grabber.set_stats(self.perf)
+        elif command == 'request_marker_sync':
+            if value in self.camera_states: self._sync_gui_markers(self.camera_states[value])
+        elif command == 'share_frames':
+            self.share_frames = value
+            if not value: self._close_frame_ring()
+        elif command == 'set_display_size': self.max_display_size = tuple(value); self._resize_main_window()
+        elif command == 'set_camera_names': self.camera_names = dict(value)
+        elif command == 'set_marker_shape': self.marker_shape = value
+        elif command == 'set_marker_color': self.marker_color = value
+        elif command == 'set_marker_size': self.marker_size = value
         return True
-    def _draw_single_marker(self, frame, marker_data, position):
-        shape, color, size = marker_data['shape'], marker_data['color'], marker_data['size']
-        draw_x, draw_y = position
-        half_size = size // 2
-        if shape == 'Cross':
-            cv2.line(frame, (draw_x - half_size, draw_y), (draw_x + half_size, draw_y), color, 1)
-            cv2.line(frame, (draw_x, draw_y - half_size), (draw_x, draw_y + half_size), color, 1)
-        elif shape == 'Circle': cv2.circle(frame, (draw_x, draw_y), half_size, color, 1)
-        elif shape == 'Square': cv2.rectangle(frame, (draw_x - half_size, draw_y - half_size), (draw_x + half_size, draw_y + half_size), color, 1)
-    def draw_markers(self, frame):
-        current_markers = self._get_current_cam_state()['markers']
-        for marker in current_markers:
-            pos = marker['pos']
-            draw_x = self.frame_width - 1 - pos[0]
-            draw_y = self.frame_height - 1 - pos[1]
-            self._draw_single_marker(frame, marker, (draw_x, draw_y))
     def mouse_events(self, event, x, y, flags, param):
-        state = self._get_current_cam_state()
+        state = self._get_current_cam_state(); self.view_dirty = True
         if event == cv2.EVENT_LBUTTONDOWN:
-            state['redo_stack'].clear()
-            coord_on_rotated_frame_x, coord_on_rotated_frame_y = self.pan_x + x/self.zoom_level, self.pan_y + y/self.zoom_level
+            coord_on_rotated_frame_x, coord_on_rotated_frame_y = self._window_to_rotated(x, y)
             original_frame_x, original_frame_y = self.frame_width-1-coord_on_rotated_frame_x, self.frame_height-1-coord_on_rotated_frame_y
             new_marker = {"pos": (int(round(original_frame_x)), int(round(original_frame_y))), "shape": self.marker_shape, "color": self.marker_color, "size": self.marker_size, "desc": ""}
-            state['markers'].append(new_marker); state['undo_stack'].append({'action_type': 'add', 'data': new_marker}); self._sync_gui_markers()
+            state['history'].add(len(state['markers']), new_marker); self._append_marker(state, new_marker)
         elif event == cv2.EVENT_MBUTTONDOWN:
             if (flags & cv2.EVENT_FLAG_SHIFTKEY): self.find_and_request_delete(x, y)
             else: self._undo_action()
@@ -204,106 +383,178 @@ class CameraHandler:
                     dist_sq = (x - self.pan_start_pos[0])**2 + (y - self.pan_start_pos[1])**2
                     if dist_sq > self.DRAG_THRESHOLD_SQ: self.is_panning, self.last_mouse_pos = True, self.pan_start_pos
                 if self.is_panning:
-                    dx, dy = x-self.last_mouse_pos[0], y-self.last_mouse_pos[1]
-                    self.pan_x -= int(round(dx/self.zoom_level)); self.pan_y -= int(round(dy/self.zoom_level)); self.last_mouse_pos = (x, y)
+                    dx, dy = x-self.last_mouse_pos[0], y-self.last_mouse_pos[1]; scale_x, scale_y = self._window_scale()
+                    self.pan_x -= int(round(dx*scale_x)); self.pan_y -= int(round(dy*scale_y)); self.last_mouse_pos = (x, y)
         elif event == cv2.EVENT_RBUTTONUP:
             if self.right_button_down and not self.is_panning: self.find_and_request_description_dialog(x, y)
             self.right_button_down, self.is_panning = False, False
         elif event == cv2.EVENT_MOUSEWHEEL:
-            img_x, img_y = self.pan_x + x/self.zoom_level, self.pan_y + y/self.zoom_level
+            img_x, img_y = self._window_to_rotated(x, y)
             if flags > 0: self.zoom_level = min(self.zoom_level*1.2, 10.0)
             else: self.zoom_level = max(self.zoom_level/1.2, 1.0)
             if self.zoom_level <= 1.0: self.pan_x, self.pan_y = 0, 0
-            else: self.pan_x, self.pan_y = int(round(img_x-(x/self.zoom_level))), int(round(img_y-(y/self.zoom_level)))
+            else:
+                # Keep the point under the cursor fixed
+                new_x, new_y = self._window_to_rotated(x, y)
+                self.pan_x, self.pan_y = int(round(self.pan_x+img_x-new_x)), int(round(self.pan_y+img_y-new_y))
         view_w, view_h = int(self.frame_width/self.zoom_level), int(self.frame_height/self.zoom_level)
         max_pan_x, max_pan_y = self.frame_width-view_w, self.frame_height-view_h
         self.pan_x, self.pan_y = np.clip(self.pan_x, 0, max_pan_x), np.clip(self.pan_y, 0, max_pan_y)
-    def find_and_request_description_dialog(self, window_x, window_y):
-        current_markers = self._get_current_cam_state()['markers']
-        if not current_markers: return
-        coord_on_rot_x, coord_on_rot_y = self.pan_x+window_x/self.zoom_level, self.pan_y+window_y/self.zoom_level
+    def _find_nearest_marker(self, window_x, window_y):
+        coord_on_rot_x, coord_on_rot_y = self._window_to_rotated(window_x, window_y)
         target_x, target_y = self.frame_width-1-coord_on_rot_x, self.frame_height-1-coord_on_rot_y
-        min_dist_sq, nearest_index = float('inf'), -1
-        for i, marker in enumerate(current_markers):
-            dist_sq = (marker['pos'][0]-target_x)**2 + (marker['pos'][1]-target_y)**2
-            if dist_sq < min_dist_sq: min_dist_sq, nearest_index = dist_sq, i
+        return self._get_current_cam_state()['index'].nearest(target_x, target_y)
+    def find_and_request_description_dialog(self, window_x, window_y):
+        nearest_index = self._find_nearest_marker(window_x, window_y)
         if nearest_index != -1: self.update_queue.put(('show_description_dialog_for_marker', nearest_index))
     def find_and_request_delete(self, window_x, window_y):
-        current_markers = self._get_current_cam_state()['markers']
-        if not current_markers: return
-        coord_on_rot_x, coord_on_rot_y = self.pan_x+window_x/self.zoom_level, self.pan_y+window_y/self.zoom_level
-        target_x, target_y = self.frame_width-1-coord_on_rot_x, self.frame_height-1-coord_on_rot_y
-        min_dist_sq, nearest_index = float('inf'), -1
-        for i, marker in enumerate(current_markers):
-            dist_sq = (marker['pos'][0]-target_x)**2 + (marker['pos'][1]-target_y)**2
-            if dist_sq < min_dist_sq: min_dist_sq, nearest_index = dist_sq, i
-        if nearest_index != -1: self.update_queue.put(('confirm_delete_marker', (nearest_index, current_markers[nearest_index])))
+        nearest_index = self._find_nearest_marker(window_x, window_y)
+        if nearest_index != -1: self.update_queue.put(('confirm_delete_marker', (nearest_index, self._get_current_cam_state()['markers'][nearest_index])))
+    def _read_frame(self):
+        """Returns the frame to render, None if there is nothing new to draw, or False if the grab failed."""
+        if self.v is None or (self.threaded_capture and self.grabber is None): return False
+        if not self.threaded_capture:
+            with self.perf.time('grab'): rv = self.v.grab()
+            if rv:
+                with self.perf.time('decode'):
+                    rv, frame = self.v.retrieve()
+                    if rv and self.reduced_decode: frame = decode_frame(frame, self._decode_reduction())
+            return frame if rv else False
+        self.grabber.reduction = self._decode_reduction()
+        seq, frame = self.grabber.latest()
+        if seq == self.last_frame_seq:
+            if self.grabber.failed: return False
+            if frame is None: return None
+            self.frame_stats['stale'] += 1
+            return frame if self.view_dirty else None
+        self.frame_stats['dropped'] += seq - self.last_frame_seq - 1; self.last_frame_seq = seq
+        return frame
+    def _render_frame(self, frame):
+        self.view_dirty = False; self.frame_stats['rendered'] += 1
+        if self.launched_at is not None:
+            print(f"CAM: First frame shown {(time.time() - self.launched_at) * 1000:.0f} ms after launch."); self.launched_at = None
+        if self.switch_started_at is not None:
+            latency = (time.perf_counter() - self.switch_started_at) * 1000; self.switch_started_at = None
+            self.switch_latency_ms.append(latency); self.perf.add('switch', latency)
+            print(f"CAM: Showing {self.camera_name} at {self.frame_width}x{self.frame_height} {latency:.0f} ms after the switch.")
+        state = self._get_current_cam_state(); self._update_display_size(); self.last_frame = frame
+        final_display = render_view(frame, state['markers'], self.zoom_level, (self.pan_x, self.pan_y), self.display_size, state['overlay'], self.perf, (self.frame_width, self.frame_height))
+        if self.banner: draw_banner(final_display, self.banner)
+        with self.perf.time('imshow'): self.display.imshow(self.WINDOW_NAME, final_display)
+        if self.share_frames: self._publish_frame(frame)
+        self.perf.tick('rendered')
+        # A frame decoded at reduced scale (from before a zoom window opened) lacks the detail they show, so they wait for the next one
+        if self.zoomed_markers and frame.shape[1] == self.frame_width:
+            with self.perf.time('zoom_windows'): self._render_zoom_windows(frame)
+    def _zoom_window_name(self, index):
+        return f"{self.WINDOW_NAME} Zoom - Marker #{index + 1}"
+    def _render_zoom_windows(self, frame):
+        indices_to_remove = set()
+        for index, marker_data in list(self.zoomed_markers.items()):
+            zoom_window_name = self._zoom_window_name(index)
+            if self.display.getWindowProperty(zoom_window_name, cv2.WND_PROP_VISIBLE) < 1:
+                indices_to_remove.add(index); continue
+            current_markers = self._get_current_cam_state()['markers']
+            if index >= len(current_markers): indices_to_remove.add(index); continue
+            marker_data = current_markers[index]
+            crop_size = 150; half_crop = crop_size // 2
+            cropped_frame = crop_zoom_patch(frame, marker_data['pos'], crop_size)
+            draw_single_marker(cropped_frame, marker_data, (half_crop, half_crop))
+            try:
+                rect = self.display.getWindowImageRect(zoom_window_name)
+                win_width, win_height = rect[2], rect[3]
+                if win_width > 0 and win_height > 0:
+                    display_zoom_frame = cv2.resize(cropped_frame, (win_width, win_height))
+                else: display_zoom_frame = cropped_frame
+            except cv2.error: display_zoom_frame = cropped_frame
+            self.display.imshow(zoom_window_name, display_zoom_frame)
+        if indices_to_remove:
+            for index in indices_to_remove:
+                if index in self.zoomed_markers: del self.zoomed_markers[index]
+                try: self.display.destroyWindow(self._zoom_window_name(index))
+                except cv2.error: pass
+    def _recover_capture(self):
+        """Starts reopening the camera in the background after a failed grab; the loop carries on meanwhile."""
+        print("CAM: Frame grab failed, reconnecting in the background...")
+        self._stop_grabber(); stale, self.v = self.v, None
+        w, h = self.frame_width, self.frame_height
+        # Bound now: the reconnect must reopen the camera that was lost, even if device_index changes meanwhile
+        self.reconnect = BackgroundReconnect(lambda index=self.device_index: self._open_capture(w, h, index), stale, max_attempts=self.MAX_RESTART_ATTEMPTS).start()
+    def _poll_reconnect(self):
+        """Adopts the reopened camera once the reconnect has one; False when it has given up. Keeps the banner's countdown current."""
+        reconnect = self.reconnect
+        if reconnect.result is not None:
+            print(f"CAM: Camera reconnected after {reconnect.attempt} attempt(s).")
+            self.reconnect, self.banner = None, None; self._start_capture(reconnect.result); return True
+        if reconnect.gave_up:
+            print("CAM: Max restart attempts reached."); return False
+        banner = f"Camera lost - reconnecting (attempt {reconnect.attempt + 1}/{self.MAX_RESTART_ATTEMPTS} in {max(0, math.ceil(reconnect.next_attempt_at - time.time()))} s)"
+        if banner != self.banner: self.banner, self.view_dirty = banner, True
+        return True
+    def advance(self):
+        """Reads and renders the next frame, if there is one, or carries on reconnecting. Returns False once a reconnect has given up."""
+        if self.reconnect is None:
+            frame = self._read_frame()
+            if frame is False: self._recover_capture()
+        if self.reconnect is not None:
+            # Meanwhile the last good frame stays up, redrawn when the view or the banner changes
+            if not self._poll_reconnect(): return False
+            frame = self.last_frame if self.reconnect is not None and self.view_dirty else None
+            # A camera lost before its first frame has no last frame, so the banner goes on a blank view
+            if frame is None and self.reconnect is not None and self.view_dirty: self._render_banner_only()
+        if frame is not None: self._render_frame(frame)
+        return True
+    def _render_banner_only(self):
+        self.view_dirty = False; self._update_display_size()
+        blank = np.zeros((self.display_size[1], self.display_size[0], 3), np.uint8); draw_banner(blank, self.banner)
+        self.display.imshow(self.WINDOW_NAME, blank)
+    def step(self):
+        """One pass of the main loop: commands, frame, render, keys. Returns False when the loop should end."""
+        perf, loop_start = self.perf, time.perf_counter()
+        with perf.time('commands'):
+            if not self.handle_commands(): return False
+        if not self.advance(): self.update_queue.put(('exit_gui', None)); return False
+        # In capture-thread mode (and while reconnecting) the loop paces itself to render_fps; waitKey doubles as the sleep so HighGUI stays responsive
+        delay = 1
+        if self.threaded_capture or self.reconnect is not None: delay = max(1, int(1000/self.render_fps - (time.perf_counter()-loop_start)*1000))
+        with perf.time('waitKey'): key = self.display.waitKey(delay) & 0xFF
+        perf.add('loop', (time.perf_counter()-loop_start)*1000)
+        if perf.enabled and time.time() - self.perf_reported_at >= self.PERF_REPORT_INTERVAL:
+            self.perf_reported_at = time.time(); perf.gauge('undo_history_kib', self._history_bytes()/1024); self.update_queue.put(('perf_stats', perf.summary()))
+        if key == 26: self._undo_action() # CTRL+Z
+        elif key == 25: self._redo_action() # CTRL+Y
+        elif key == ord('q') or self.display.getWindowProperty(self.WINDOW_NAME, cv2.WND_PROP_VISIBLE) < 1:
+            self.update_queue.put(('exit_gui', None)); return False
+        return True
+    def close(self):
+        self._cancel_reconnect(); self._stop_grabber(); self._close_frame_ring()
+        if self.v is not None: self.v.release()
+        for capture in self.warm_captures.values(): capture.release()
+        self.warm_captures.clear()
+        # Only this handler's own windows, as others may share the display in multi-camera mode
+        window_names = [self._zoom_window_name(index) for index in self.zoomed_markers]
+        if self.window_open: window_names.append(self.WINDOW_NAME)
+        for name in window_names:
+            try: self.display.destroyWindow(name)
+            except cv2.error: pass
+        self.zoomed_markers.clear(); self.window_open = False
     def run(self):
         if not self._initialize_camera(): self.update_queue.put(('exit_gui', None)); return
-        while True:
-            if not self.handle_commands(): break
-            rv, frame = self.v.read()
-            if not rv:
-                print(f"CAM: Frame grab failed... restart {self.restart_attempts+1}/{self.MAX_RESTART_ATTEMPTS}...")
-                self.v.release(); time.sleep(2.0)
-                if self._initialize_camera(self.frame_width, self.frame_height):
-                    print("CAM: Camera restart successful."); self.restart_attempts = 0; continue
-                else:
-                    self.restart_attempts += 1
-                    if self.restart_attempts >= self.MAX_RESTART_ATTEMPTS: print(f"CAM: Max restart attempts reached."); self.update_queue.put(('exit_gui', None)); break
-                    else: continue
-            self.restart_attempts = 0
-            display_frame_main = frame.copy()
-            display_frame_main = cv2.rotate(display_frame_main, cv2.ROTATE_180)
-            self.draw_markers(display_frame_main)
-            view_w, view_h = int(self.frame_width/self.zoom_level), int(self.frame_height/self.zoom_level)
-            zoomed_display_frame = display_frame_main[self.pan_y:self.pan_y+view_h, self.pan_x:self.pan_x+view_w]
-            final_display = cv2.resize(zoomed_display_frame, (self.frame_width, self.frame_height))
-            cv2.imshow(self.WINDOW_NAME, final_display)
-            
-            indices_to_remove = set()
-            # --- CORRECTED: Loop over the correct dictionary name ---
-            for index, marker_data in list(self.zoomed_markers.items()):
-                zoom_window_name = f"Zoom - Marker #{index + 1}"
-                if cv2.getWindowProperty(zoom_window_name, cv2.WND_PROP_VISIBLE) < 1:
-                    indices_to_remove.add(index); continue
-                current_markers = self._get_current_cam_state()['markers']
-                if index >= len(current_markers): indices_to_remove.add(index); continue
-                marker_data = current_markers[index]
-                crop_size = 150; half_crop = crop_size // 2
-                marker_pos = marker_data['pos']
-                rotated_frame = cv2.rotate(frame, cv2.ROTATE_180)
-                draw_x, draw_y = self.frame_width-1-marker_pos[0], self.frame_height-1-marker_pos[1]
-                x1, y1 = draw_x-half_crop, draw_y-half_crop
-                x1c, y1c = max(0, x1), max(0, y1)
-                x2c, y2c = min(self.frame_width, x1+crop_size), min(self.frame_height, y1+crop_size)
-                cropped_frame = rotated_frame[y1c:y2c, x1c:x2c]
-                h, w = cropped_frame.shape[:2]
-                if h < crop_size or w < crop_size:
-                    top=max(0, y1*-1); bottom=max(0, y2-self.frame_height); left=max(0, x1*-1); right=max(0, x2-self.frame_width)
-                    cropped_frame = cv2.copyMakeBorder(cropped_frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=[0,0,0])
-                self._draw_single_marker(cropped_frame, marker_data, (half_crop, half_crop))
-                try:
-                    rect = cv2.getWindowImageRect(zoom_window_name)
-                    win_width, win_height = rect[2], rect[3]
-                    if win_width > 0 and win_height > 0:
-                        display_zoom_frame = cv2.resize(cropped_frame, (win_width, win_height))
-                    else: display_zoom_frame = cropped_frame
-                except cv2.error: display_zoom_frame = cropped_frame
-                cv2.imshow(zoom_window_name, display_zoom_frame)
-            if indices_to_remove:
-                for index in indices_to_remove:
-                    if index in self.zoomed_markers: del self.zoomed_markers[index]
-                    try: cv2.destroyWindow(f"Zoom - Marker #{index + 1}")
-                    except cv2.error: pass
-            
-            key = cv2.waitKey(1) & 0xFF
-            if key == 26: self._undo_action() # CTRL+Z
-            elif key == 25: self._redo_action() # CTRL+Y
-            elif key == ord('q') or cv2.getWindowProperty(self.WINDOW_NAME, cv2.WND_PROP_VISIBLE) < 1:
-                self.update_queue.put(('exit_gui', None)); break
-        self.v.release(); cv2.destroyAllWindows(); print("CAM: Camera process finished.")
+        while self.step(): pass
+        self.close()
+        print(f"CAM: Frames rendered: {self.frame_stats['rendered']}, dropped: {self.frame_stats['dropped']}, stale: {self.frame_stats['stale']}")
+        print(f"CAM: Undo history: {sum(len(state['history']) for state in self.camera_states.values())} step(s) in {self._history_bytes()/1024:.1f} KiB")
+        latencies = self.command_stats['latency_ms']
+        if latencies: print(f"CAM: Commands processed: {self.command_stats['processed']}, coalesced: {self.command_stats['coalesced']}, max queue depth: {self.command_stats['max_depth']}, mean latency: {sum(latencies)/len(latencies):.1f} ms")
+        print("CAM: Camera process finished.")
 
-def run_camera_process(command_queue, update_queue):
-    handler = CameraHandler(command_queue, update_queue)
+def run_camera_process(command_queue, update_queue, camera_names=None, source=None, reduced_decode=False, decode_workers=0, keep_warm=False, launched_at=None, cameras=None):
+    if cameras and len(cameras) > 1:
+        # Several cameras at once, each in its own window (see multi_camera)
+        from multi_camera import run_multi_camera_process
+        run_multi_camera_process(command_queue, StampedSender(update_queue), cameras, camera_names, open_frame_source(source), reduced_decode, decode_workers, keep_warm); return
+    handler = CameraHandler(command_queue, StampedSender(update_queue), camera_names=camera_names, frame_source=open_frame_source(source),
+                            reduced_decode=reduced_decode, decode_workers=decode_workers, keep_warm=keep_warm)
+    if cameras: handler.device_index = cameras[0]
+    handler.launched_at = launched_at
     handler.run()
\ No newline at end of file
@@ -0,0 +1,66 @@
+# capability_cache.py
+import json
+import os
+import sys
+import tempfile
+
+from resolution_lister import camera_index, get_camera_devices, get_device_identities, probe_devices
+
+CACHE_VERSION = 2
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".pcbcam", "camera_capabilities.json")
+
+def _read_cache(path):
+    try:
+        with open(path, 'r') as f: data = json.load(f)
+        if data.get('version') == CACHE_VERSION: return data
+    except (OSError, ValueError) as e:
+        if not isinstance(e, FileNotFoundError): print(f"Cache: Ignoring unreadable capability cache '{path}'. Error: {e}", file=sys.stderr)
+    return {"version": CACHE_VERSION, "min_fps": None, "order": [], "known": {}}
+
+def _write_cache(path, data):
+    tmp_path = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Each writer gets its own temp file (the launch and a Rescan, or two instances, may write at once); os.replace leaves one whole file
+        with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp", delete=False) as f:
+            tmp_path = f.name; json.dump(data, f, indent=4)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Cache: Could not write capability cache '{path}'. Error: {e}", file=sys.stderr)
+        if tmp_path is not None:
+            try: os.remove(tmp_path)
+            except OSError: pass
+
+def _as_caps(entry): return {"name": entry['name'], "resolutions": [tuple(res) for res in entry['resolutions']]}
+
+def load_cached_capabilities(min_fps=30, path=DEFAULT_CACHE_PATH):
+    """Capabilities as of the last discovery, in the same {index: caps} form, without touching any device."""
+    data = _read_cache(path)
+    if data['min_fps'] != min_fps: return {}
+    return {index: _as_caps(data['known'][identity]) for index, identity in data['order'] if identity in data['known']}
+
+def discover_camera_capabilities_cached(min_fps=30, path=DEFAULT_CACHE_PATH, rescan=False):
+    """Enumerates the cameras and only probes those whose identity is new or whose fingerprint changed.
+
+    Cached entries are keyed by device identity (see get_device_identities), so a camera keeps its entry
+    when it moves to another index. rescan=True ignores the cache and probes everything again.
+    """
+    data = _read_cache(path)
+    if rescan or data['min_fps'] != min_fps: data['known'] = {}
+    devices = get_camera_devices()
+    identities = get_device_identities(devices)
+    all_camera_caps, to_probe = {}, []
+    indices = [camera_index(position, device) for position, device in enumerate(devices)]
+    for index, device, (identity, fingerprint) in zip(indices, devices, identities):
+        entry = data['known'].get(identity)
+        if entry and entry['fingerprint'] == fingerprint: all_camera_caps[index] = _as_caps(entry)
+        else: to_probe.append((index, device, identity, fingerprint))
+    if to_probe: print(f"Cache: Probing {len(to_probe)} of {len(devices)} camera(s).", file=sys.stderr)
+    for (index, device, identity, fingerprint), caps in zip(to_probe, probe_devices([item[1] for item in to_probe], min_fps)):
+        all_camera_caps[index] = caps
+        # Failed probes are not cached, so the next launch tries them again
+        if caps.get('error'): data['known'].pop(identity, None)
+        else: data['known'][identity] = {"fingerprint": fingerprint, "name": caps['name'], "resolutions": caps['resolutions']}
+    data['min_fps'], data['order'] = min_fps, [[index, identity] for index, (identity, _) in zip(indices, identities)]
+    _write_cache(path, data)
+    return all_camera_caps
@@ -0,0 +1,231 @@
+# capture.py
+import collections
+import random
+import threading
+import time
+
+import cv2
+
+from perf_stats import NULL_STATS
+
+_REDUCED_READ_FLAGS = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+def decode_frame(frame, reduction=1):
+    """Decodes a raw MJPEG buffer (what retrieve() returns with CAP_PROP_CONVERT_RGB off) at 1/reduction of full size.
+
+    libjpeg scales while it decodes, so a reduced frame costs a fraction of a full one. Frames the backend
+    already decoded (it may ignore CONVERT_RGB) pass through; a corrupt buffer gives None.
+    """
+    if frame is None or frame.ndim == 3: return frame
+    return cv2.imdecode(frame.reshape(-1), _REDUCED_READ_FLAGS[reduction])
+
+class BackgroundReconnect:
+    """Calls open_capture() on a background thread until it returns an opened capture, backing off between tries.
+
+    The wait before try n is base_delay * 2**n seconds, capped at max_delay, with jitter (a random point in
+    the upper half of that), so stations sharing a hub don't all retry at once. `stale`, the capture that
+    failed, is released on the thread first, as releasing a vanished device can block. The caller polls
+    `result`; after max_attempts failed tries `gave_up` is set instead.
+    """
+    def __init__(self, open_capture, stale=None, base_delay=0.5, max_delay=10.0, max_attempts=8):
+        self.base_delay, self.max_delay, self.max_attempts = base_delay, max_delay, max_attempts
+        self.result, self.attempt, self.next_attempt_at, self.gave_up = None, 0, time.time(), False
+        self._lock, self._cancelled = threading.Lock(), threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(open_capture, stale), name="CameraReconnect", daemon=True)
+
+    def start(self): self._thread.start(); return self
+
+    def cancel(self):
+        """Stops retrying; a capture opened after this is released rather than handed over. Does not wait for a try in progress."""
+        with self._lock:
+            self._cancelled.set()
+            if self.result is not None: self.result.release(); self.result = None
+
+    def _run(self, open_capture, stale):
+        if stale is not None: stale.release()
+        while True:
+            delay = min(self.max_delay, self.base_delay * 2**self.attempt)
+            delay = random.uniform(delay/2, delay); self.next_attempt_at = time.time() + delay
+            if self._cancelled.wait(delay): return
+            self.attempt += 1
+            capture = open_capture()
+            with self._lock:
+                if capture is not None:
+                    if self._cancelled.is_set(): capture.release()
+                    else: self.result = capture
+                    return
+                if self._cancelled.is_set(): return
+                if self.attempt >= self.max_attempts: self.gave_up = True; return
+
+class DecodePool:
+    """Decodes raw MJPEG buffers on `workers` threads (cv2.imdecode releases the GIL) and delivers them in capture order.
+
+    submit() queues a buffer; at most max_pending wait for a worker, and a new one arriving at a full queue
+    drops the oldest waiting one, so a decoder that cannot keep up costs frames rather than latency.
+    Decoded frames go to deliver(seq, frame) in seq order: a frame finished ahead of an older one still being
+    decoded is held back until that one is done. seq must count up by one per submit().
+    stats gets each decode time as the 'decode' stage, throughput as the 'decoded' counter and the share of
+    worker time spent decoding over the last second as the 'decode_utilization' gauge.
+    """
+    def __init__(self, deliver, workers=2, max_pending=2, stats=NULL_STATS):
+        self.deliver, self.workers, self.max_pending, self.stats = deliver, workers, max_pending, stats
+        self._cond = threading.Condition()
+        self._jobs, self._finished, self._next_seq = collections.deque(), {}, None
+        self._busy, self._started_at = collections.deque(), None
+        self.decoded, self.dropped = 0, 0
+        self._running, self._threads = False, []
+
+    def start(self):
+        self._running, self._started_at = True, time.perf_counter()
+        self._threads = [threading.Thread(target=self._work, name=f"FrameDecoder-{i}", daemon=True) for i in range(self.workers)]
+        for thread in self._threads: thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        with self._cond: self._running = False; self._cond.notify_all()
+        for thread in self._threads: thread.join(timeout)
+        self._threads = []
+
+    def submit(self, seq, buffer, reduction=1):
+        with self._cond:
+            if self._next_seq is None: self._next_seq = seq
+            if len(self._jobs) >= self.max_pending:
+                dropped_seq = self._jobs.popleft()[0]; self.dropped += 1; self._finish(dropped_seq, None)
+            self._jobs.append((seq, buffer, reduction)); self._cond.notify()
+
+    def _finish(self, seq, frame):
+        # Called with the lock held; a None frame (dropped or corrupt) only advances the sequence
+        self._finished[seq] = frame
+        while self._next_seq in self._finished:
+            frame = self._finished.pop(self._next_seq)
+            if frame is not None: self.deliver(self._next_seq, frame)
+            self._next_seq += 1
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while self._running and not self._jobs: self._cond.wait()
+                if not self._running: return
+                seq, buffer, reduction = self._jobs.popleft()
+            start = time.perf_counter()
+            frame = decode_frame(buffer, reduction)
+            end = time.perf_counter()
+            stats = self.stats; stats.add('decode', (end - start) * 1000); stats.tick('decoded')
+            with self._cond:
+                self._busy.append((end, end - start))
+                if frame is not None: self.decoded += 1
+                self._finish(seq, frame)
+            stats.gauge('decode_utilization', self.utilization())
+
+    def utilization(self, window=1.0):
+        """Fraction of the workers' time spent decoding over the last `window` seconds."""
+        now = time.perf_counter()
+        with self._cond:
+            while self._busy and self._busy[0][0] < now - window: self._busy.popleft()
+            busy = sum(seconds for _, seconds in self._busy)
+        elapsed = min(window, now - self._started_at) if self._started_at else 0.0
+        return min(1.0, busy / (elapsed * self.workers)) if elapsed > 0 else 0.0
+
+class LatestFrameGrabber:
+    """Reads frames from a capture on a background thread and keeps only the newest one.
+
+    The render loop calls latest() to get (seq, frame) without ever blocking on the camera.
+    seq increases by one for every frame grabbed, so gaps tell the caller how many frames were dropped.
+    Reads are split into grab() and retrieve() so stats can time waiting on the camera apart from decoding.
+    If reduction is set, retrieve() gives raw MJPEG buffers and they are decoded at that scale (see decode_frame);
+    the render loop may change it between frames. With decode_workers the decoding moves to a DecodePool and
+    this thread only grabs and hands over buffers; seq still counts grabbed frames, so pool drops show as gaps.
+    VideoCapture is not thread-safe, so while the thread runs nothing else may touch the capture: property
+    changes go through set_property() and are applied by the thread between grabs.
+    """
+    def __init__(self, capture, stats=NULL_STATS, reduction=None, decode_workers=0):
+        self.capture, self.stats, self.reduction = capture, stats, reduction
+        self._lock = threading.Lock()
+        self._frame, self._seq, self._grabbed = None, 0, 0
+        self.failed = False
+        self._running, self._thread, self._done, self._release_on_exit, self._properties = False, None, False, False, {}
+        self.decoder = DecodePool(self._publish, decode_workers, stats=stats) if decode_workers else None
+
+    def set_stats(self, stats):
+        self.stats = stats
+        if self.decoder is not None: self.decoder.stats = stats
+
+    def start(self):
+        self._running = True
+        if self.decoder is not None: self.decoder.start()
+        self._thread = threading.Thread(target=self._grab_loop, name="FrameGrabber", daemon=True)
+        self._thread.start()
+        return self
+
+    def set_property(self, prop, value):
+        """capture.set(prop, value), done on the grab thread before its next grab; the newest value per property wins."""
+        with self._lock: self._properties[prop] = value
+
+    def stop(self, timeout=2.0):
+        """Stops the thread; False if it is still blocked in the camera after timeout. The thread then keeps the
+        capture and releases it when the blocked call returns, so the caller must not use or release it any more."""
+        self._running, stopped = False, True
+        if self._thread is not None:
+            self._thread.join(timeout)
+            with self._lock:
+                stopped = self._done or not self._thread.is_alive()
+                if not stopped: self._release_on_exit = True
+            self._thread = None
+        if stopped:
+            # Changes the thread never got to apply; the capture is ours again
+            for prop, value in self._properties.items(): self.capture.set(prop, value)
+            self._properties.clear()
+        if self.decoder is not None: self.decoder.stop(timeout)
+        return stopped
+
+    def _publish(self, seq, frame):
+        with self._lock: self._frame = frame; self._seq = seq
+
+    def _grab_loop(self):
+        try: self._grab_frames()
+        finally:
+            with self._lock: self._done = True; release = self._release_on_exit
+            if release: self.capture.release()
+
+    def _grab_frames(self):
+        while self._running:
+            with self._lock: properties, self._properties = self._properties, {}
+            for prop, value in properties.items(): self.capture.set(prop, value)
+            stats = self.stats
+            with stats.time('grab'): rv = self.capture.grab()
+            if rv and self.decoder is not None:
+                with stats.time('retrieve'): rv, buffer = self.capture.retrieve()
+                if not rv: self.failed = True; break
+                self._grabbed += 1; self.decoder.submit(self._grabbed, buffer, self.reduction or 1); stats.tick('captured')
+                continue
+            if rv:
+                with stats.time('decode'):
+                    rv, frame = self.capture.retrieve()
+                    if rv and self.reduction is not None: frame = decode_frame(frame, self.reduction)
+            if not rv: self.failed = True; break
+            if frame is None: continue
+            with self._lock: self._frame = frame; self._seq += 1
+            stats.tick('captured')
+
+    def latest(self):
+        with self._lock: return self._seq, self._frame
+
+if __name__ == '__main__':
+    # Decode throughput and utilization for 1..4 workers, fed as fast as they take frames
+    import os
+    from frame_sources import SyntheticPCBSource
+    from perf_stats import PerfStats
+    source = SyntheticPCBSource(width=4656, height=3496); source.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+    buffers = [source.retrieve()[1] for _ in range(2) if source.grab()]
+    print(f"{os.cpu_count()} CPUs, {buffers[0].nbytes/1e6:.1f} MB per 4656x3496 JPEG")
+    for workers in (1, 2, 4):
+        stats = PerfStats()
+        pool = DecodePool(lambda seq, frame: None, workers, max_pending=workers, stats=stats).start()
+        start, submitted = time.perf_counter(), 0
+        while time.perf_counter() - start < 3.0:
+            submitted += 1; pool.submit(submitted, buffers[submitted % 2])
+            time.sleep(0.005)
+        utilization = pool.utilization(); pool.stop()
+        summary = stats.summary()
+        print(f"{workers} worker(s): {pool.decoded/(time.perf_counter()-start):.1f} frames/s decoded, {pool.dropped} of {submitted} dropped, "
+              f"decode p50 {summary['stages']['decode']['p50']:.0f} ms, utilization {utilization:.0%}")
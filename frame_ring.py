@@ -0,0 +1,140 @@
+# frame_ring.py
+import os
+import struct
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+# Ring header: magic, layout version, slot count, bytes per slot, sequence number of the newest frame
+_HEADER = struct.Struct('<4sIIQQ')
+# Slot header: seqlock (odd while the slot is being written), frame sequence number, width, height, channels, capture time
+_SLOT = struct.Struct('<QQIIId')
+_MAGIC, _VERSION = b'PCBR', 1
+_ALIGN = 64
+
+def _slot_offset(index, slot_bytes):
+    return _HEADER.size + index * (-(-(_SLOT.size + slot_bytes) // _ALIGN) * _ALIGN)
+
+def _attach(name):
+    """Opens an existing segment without taking ownership of it, as SharedMemory(track=False) does from Python 3.13."""
+    if sys.version_info >= (3, 13): return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    # Earlier versions register every attach with the resource tracker, which would unlink the segment when the reader exits
+    if os.name == 'posix': resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+class FrameRingWriter:
+    """A ring of frame buffers in shared memory, written by the camera process.
+
+    Each write() copies one frame (a C-contiguous uint8 array, or anything exposing the buffer protocol) into
+    the next slot under that slot's seqlock and then publishes its sequence number. Readers in other processes
+    attach by name (see FrameRingReader) and never block the writer. info() is the control message that tells
+    them where to attach. The writer owns the memory: close() unlinks it, after which readers that are still
+    attached keep their mapping until they close it too.
+    """
+    def __init__(self, slot_bytes, slots=3):
+        self.slots, self.slot_bytes, self.seq = slots, slot_bytes, 0
+        self.shm = shared_memory.SharedMemory(create=True, size=_slot_offset(slots, slot_bytes))
+        _HEADER.pack_into(self.shm.buf, 0, _MAGIC, _VERSION, slots, slot_bytes, 0)
+
+    @property
+    def name(self): return self.shm.name
+    def info(self): return {'name': self.shm.name, 'slots': self.slots, 'slot_bytes': self.slot_bytes}
+    def fits(self, nbytes): return nbytes <= self.slot_bytes
+    def write(self, frame, captured_at=None):
+        """Publishes frame as the newest; returns its sequence number. The frame must fit a slot (see fits())."""
+        data = memoryview(frame)
+        if not data.c_contiguous: data = memoryview(frame.copy())
+        height, width = data.shape[0], data.shape[1]; channels = data.shape[2] if data.ndim > 2 else 1
+        data = data.cast('B'); nbytes = len(data)
+        if nbytes > self.slot_bytes: raise ValueError(f"Frame of {nbytes} bytes does not fit a {self.slot_bytes} byte slot.")
+        seq = self.seq + 1; offset = _slot_offset((seq - 1) % self.slots, self.slot_bytes); buf = self.shm.buf
+        lock = _SLOT.unpack_from(buf, offset)[0]
+        _SLOT.pack_into(buf, offset, lock + 1, seq, width, height, channels, captured_at or time.time())
+        buf[offset + _SLOT.size:offset + _SLOT.size + nbytes] = data
+        _SLOT.pack_into(buf, offset, lock + 2, seq, width, height, channels, captured_at or time.time())
+        struct.pack_into('<Q', buf, _HEADER.size - 8, seq); self.seq = seq
+        return seq
+    def close(self):
+        if self.shm is None: return
+        self.shm.close()
+        # A reader sharing our resource tracker (a spawned child, say) dropped the registration when it attached; unlink() expects it
+        if os.name == 'posix': resource_tracker.register(self.shm._name, 'shared_memory')
+        try: self.shm.unlink()
+        except FileNotFoundError: pass
+        self.shm = None
+
+class FrameRingReader:
+    """Attaches to a FrameRingWriter's memory by the name in its info(), from any local process.
+
+    latest() copies the newest frame out in one pass; read_rows() copies only a band of rows, so a consumer that
+    wants a region or a thumbnail does not copy the whole frame. A read that overlaps a write to its slot is
+    retried. Neither needs NumPy: frames come back as (seq, width, height, channels, bytes), rows top to bottom.
+    """
+    def __init__(self, name):
+        self.shm = _attach(name)
+        magic, version, self.slots, self.slot_bytes, _ = _HEADER.unpack_from(self.shm.buf, 0)
+        if (magic, version) != (_MAGIC, _VERSION): self.shm.close(); raise ValueError(f"Shared memory '{name}' is not a frame ring.")
+        self.name = name
+
+    def latest_seq(self): return struct.unpack_from('<Q', self.shm.buf, _HEADER.size - 8)[0]
+    def frame_size(self):
+        """(width, height) of the newest frame, or None if there is none yet."""
+        seq = self.latest_seq()
+        if seq == 0: return None
+        return _SLOT.unpack_from(self.shm.buf, _slot_offset((seq - 1) % self.slots, self.slot_bytes))[2:4]
+    def _read(self, copy, retries=5):
+        for _ in range(retries):
+            seq = self.latest_seq()
+            if seq == 0: return None
+            offset = _slot_offset((seq - 1) % self.slots, self.slot_bytes); buf = self.shm.buf
+            lock, slot_seq, width, height, channels, captured_at = _SLOT.unpack_from(buf, offset)
+            if lock % 2 or slot_seq != seq: continue
+            result = copy(buf, offset + _SLOT.size, width, height, channels)
+            if _SLOT.unpack_from(buf, offset)[0] == lock: return (seq, width, height, channels, captured_at) + result
+        return None
+    def latest(self):
+        """(seq, width, height, channels, captured_at, bytes) of the newest frame, or None if there is none yet."""
+        return self._read(lambda buf, start, width, height, channels: (bytes(buf[start:start + width * height * channels]),))
+    def read_rows(self, top, bottom, step=1):
+        """Like latest(), but only rows top..bottom-1 (every step-th), clipped to the frame; the last item is the row count."""
+        def copy(buf, start, width, height, channels):
+            row_bytes, rows = width * channels, range(max(0, top), min(bottom, height), step)
+            return b''.join(buf[start + row * row_bytes:start + (row + 1) * row_bytes] for row in rows), len(rows)
+        return self._read(copy)
+    def latest_ppm(self, step=1):
+        """The newest frame as binary PPM (BGR frames) or PGM (greyscale ones), turned 180 degrees as the camera window
+        shows it and keeping every step-th row and column; tk.PhotoImage(data=...) takes either as is. None if there
+        is no frame yet; ValueError for any other channel count, which has no such format."""
+        frame = self.read_rows(0, 1 << 30, step)
+        if frame is None: return None
+        _, width, height, channels, _, data, rows = frame
+        if channels not in (1, 3): raise ValueError(f"Cannot make a preview image of a {channels}-channel frame.")
+        # Reversing BGR bytes both turns the image round and puts each pixel in RGB order
+        if step == 1: pixels, columns = data[::-1], width
+        else:
+            row_bytes, columns = width * channels, len(range(0, width, step)); pixels = bytearray(rows * columns * channels)
+            for row in range(rows):
+                flipped = data[(rows - 1 - row) * row_bytes:(rows - row) * row_bytes][::-1]; out = row * columns * channels
+                for channel in range(channels): pixels[out + channel:out + columns * channels:channels] = flipped[channel::channels * step]
+        return b'%s %d %d 255\n' % (b'P6' if channels == 3 else b'P5', columns, rows) + bytes(pixels)
+    def close(self):
+        if self.shm is not None: self.shm.close(); self.shm = None
+
+if __name__ == '__main__':
+    # Throughput with the writer never waiting and a reader in another process copying out every frame it can
+    import multiprocessing
+    import numpy as np
+    def read_frames(name, count, results):
+        reader, seen = FrameRingReader(name), set()
+        while len(seen) < count:
+            frame = reader.latest()
+            if frame is not None: seen.add(frame[0])
+        reader.close(); results.put(len(seen))
+    writer = FrameRingWriter(1920 * 1080 * 3)
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=read_frames, args=(writer.name, 200, results)); process.start()
+    frames, start, written = [np.full((1080, 1920, 3), value, np.uint8) for value in range(8)], time.perf_counter(), 0
+    while process.is_alive() and time.perf_counter() - start < 20: writer.write(frames[written % 8]); written += 1
+    elapsed = time.perf_counter() - start; process.join(); writer.close()
+    print(f"{written} frames written at {written / elapsed:.0f} fps ({written * frames[0].nbytes / elapsed / 1e9:.2f} GB/s), reader copied {results.get(timeout=5)} in that time")
@@ -0,0 +1,131 @@
+# frame_sources.py
+import os
+import time
+
+import cv2
+import numpy as np
+
+def _wait_for_frame_slot(next_at, fps):
+    """Sleeps until next_at (a perf_counter time) and returns the slot after it; a source that fell more than a second behind starts over."""
+    now = time.perf_counter()
+    if next_at is None or next_at < now - 1.0: next_at = now
+    if next_at > now: time.sleep(next_at - now)
+    return next_at + 1.0 / fps
+
+class SyntheticPCBSource:
+    """Stands in for cv2.VideoCapture with generated frames of a PCB-like pattern.
+
+    The board is drawn once per resolution (traces, pads, ICs and silkscreen on a green substrate) and a
+    second, shifted copy is kept so consecutive frames differ. Frames are reused, never written to, so
+    reading costs nothing; with fps set, grab() waits to hold that frame rate like a real camera.
+    With CAP_PROP_CONVERT_RGB set to 0, retrieve() returns the frames as JPEG buffers, as V4L2 does for an MJPG camera.
+    """
+    def __init__(self, index=0, width=1920, height=1080, fps=None, seed=0):
+        self.width, self.height, self.fps, self.seed = width, height, fps, seed
+        self._frames, self._count, self._next_at, self._opened = None, 0, None, True
+        self.convert_rgb, self._encoded = True, None
+
+    def isOpened(self): return self._opened
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH: self.width, self._frames = int(value), None
+        elif prop == cv2.CAP_PROP_FRAME_HEIGHT: self.height, self._frames = int(value), None
+        elif prop == cv2.CAP_PROP_FPS: self.fps = value or None
+        elif prop == cv2.CAP_PROP_CONVERT_RGB: self.convert_rgb = bool(value)
+        else: return False
+        return True
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH: return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT: return float(self.height)
+        if prop == cv2.CAP_PROP_FPS: return float(self.fps or 0)
+        if prop == cv2.CAP_PROP_CONVERT_RGB: return float(self.convert_rgb)
+        return 0.0
+
+    def _draw_board(self):
+        rng = np.random.default_rng(self.seed)
+        w, h = self.width, self.height
+        board = np.empty((h, w, 3), np.uint8); board[:] = (40, 90, 30)
+        unit = max(4, min(w, h) // 120)
+        for _ in range(400):
+            # Traces run in 45 degree steps, as routed copper does
+            x, y = int(rng.integers(0, w)), int(rng.integers(0, h))
+            for _ in range(int(rng.integers(2, 5))):
+                dx, dy = [(1, 0), (0, 1), (1, 1), (1, -1)][int(rng.integers(0, 4))]
+                length = int(rng.integers(5, 40)) * unit
+                cv2.line(board, (x, y), (x + dx*length, y + dy*length), (60, 140, 190), max(1, unit // 3))
+                x, y = x + dx*length, y + dy*length
+        for _ in range(600):
+            x, y = int(rng.integers(0, w)), int(rng.integers(0, h))
+            if rng.random() < 0.5: cv2.circle(board, (x, y), unit, (200, 200, 210), -1); cv2.circle(board, (x, y), unit // 3, (20, 20, 20), -1)
+            else: cv2.rectangle(board, (x, y), (x + unit, y + 2*unit), (200, 200, 210), -1)
+        for _ in range(25):
+            x, y = int(rng.integers(0, w)), int(rng.integers(0, h))
+            cv2.rectangle(board, (x, y), (x + 12*unit, y + 8*unit), (25, 25, 25), -1)
+            cv2.putText(board, f"U{int(rng.integers(1, 99))}", (x, y - unit), cv2.FONT_HERSHEY_SIMPLEX, unit / 10, (230, 230, 230), max(1, unit // 6))
+        return [board, np.roll(board, (1, 1), axis=(0, 1))]
+
+    def grab(self):
+        if not self._opened: return False
+        if self._frames is None: self._frames, self._encoded = self._draw_board(), None
+        if self.fps: self._next_at = _wait_for_frame_slot(self._next_at, self.fps)
+        self._count += 1
+        return True
+    def retrieve(self):
+        if not self._opened or self._frames is None: return False, None
+        if self.convert_rgb: return True, self._frames[self._count % 2]
+        if self._encoded is None: self._encoded = [cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].reshape(1, -1) for frame in self._frames]
+        return True, self._encoded[self._count % 2]
+    def read(self): return self.retrieve() if self.grab() else (False, None)
+    def release(self): self._opened = False
+
+class FileSource:
+    """Stands in for cv2.VideoCapture with a still image or a video file, played in a loop.
+
+    A still image is resized to the requested resolution; a video keeps its own size and restarts at the end.
+    """
+    def __init__(self, path, fps=None):
+        self.path, self.fps, self._next_at = path, fps, None
+        self._image = cv2.imread(path)
+        self._video = None if self._image is not None else cv2.VideoCapture(path)
+        self._frame, self._size = None, None
+        if self._image is not None: self._size = (self._image.shape[1], self._image.shape[0])
+        elif self._video.isOpened():
+            self._size = (int(self._video.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self._video.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+    def isOpened(self): return self._image is not None or (self._video is not None and self._video.isOpened())
+    def set(self, prop, value):
+        if self._image is None or prop not in (cv2.CAP_PROP_FRAME_WIDTH, cv2.CAP_PROP_FRAME_HEIGHT): return False
+        self._size = (int(value), self._size[1]) if prop == cv2.CAP_PROP_FRAME_WIDTH else (self._size[0], int(value))
+        self._frame = None; return True
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH: return float(self._size[0]) if self._size else 0.0
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT: return float(self._size[1]) if self._size else 0.0
+        return 0.0
+
+    def grab(self):
+        if self.fps: self._next_at = _wait_for_frame_slot(self._next_at, self.fps)
+        if self._image is not None:
+            if self._frame is None: self._frame = cv2.resize(self._image, self._size) if self._size != (self._image.shape[1], self._image.shape[0]) else self._image
+            return True
+        if self._video is None: return False
+        rv, frame = self._video.read()
+        if not rv: self._video.set(cv2.CAP_PROP_POS_FRAMES, 0); rv, frame = self._video.read()
+        self._frame = frame if rv else None
+        return rv
+    def retrieve(self): return (self._frame is not None, self._frame)
+    def read(self): return self.retrieve() if self.grab() else (False, None)
+    def release(self):
+        if self._video is not None: self._video.release()
+        self._image = self._video = self._frame = None
+
+def open_frame_source(spec=None):
+    """Returns the capture factory (index -> VideoCapture-like object) for a --source string.
+
+    None or "camera" opens real devices; "synthetic" generates frames at 30 fps and "synthetic:FPS" at another
+    rate (0 for as fast as they are read); any other value is taken as an image or video file, played at 30 fps.
+    """
+    if not spec or spec == "camera": return cv2.VideoCapture
+    if spec == "synthetic" or spec.startswith("synthetic:"):
+        fps = float(spec.split(":", 1)[1]) if ":" in spec else 30
+        return lambda index: SyntheticPCBSource(index, fps=fps)
+    if not os.path.exists(spec): raise FileNotFoundError(f"Frame source '{spec}' not found.")
+    return lambda index: FileSource(spec, fps=30)
@@ -1,7 +1,7 @@
 # gui_module.py
 import tkinter as tk
 from tkinter import ttk
-from tkinter import filedialog, messagebox, Toplevel, Scale, Spinbox, Entry, Text
+from tkinter import filedialog, messagebox, simpledialog, Toplevel, Scale, Spinbox, Entry, Text
 import json
 import queue
 import os
@@ -9,15 +9,28 @@ import subprocess
 import sys
 import webbrowser
 import tkinter.font as tkFont
+import threading
+import collections
+import platform
+import time
+
+from capability_cache import discover_camera_capabilities_cached
+from frame_ring import FrameRingReader
+from marker_table import VirtualMarkerTable
+from message_channel import StampedSender, unpack_message, wake_fileno
+from perf_stats import SUMMARY_FIELDS, export_csv, export_json
 
 class AppGUI(tk.Tk):
-    def __init__(self, command_queue, update_queue, camera_capabilities):
+    def __init__(self, command_queue, update_queue, camera_capabilities, capabilities_pending=False):
         super().__init__()
         self.withdraw()
-        self.command_queue = command_queue
+        self.command_queue = StampedSender(command_queue)
         self.update_queue = update_queue
-        self.camera_capabilities = camera_capabilities
-        self.camera_states = {}
+        # capabilities_pending: discovery is still running and will send 'camera_capabilities'; until then empty menus say so
+        self.camera_capabilities, self.capabilities_pending = camera_capabilities, capabilities_pending
+        self.camera_states = {}; self.performance_window = None
+        # {camera index: FrameRingReader} for the camera process's shared-memory frames, attached as it announces them
+        self.frame_rings, self.snapshot_window = {}, None
         self.current_resolution = (1920, 1080); self.current_filepath = None
         self.current_camera_name = "Default"; self.camera_index_var = tk.IntVar(value=0)
         self.marker_shape = tk.StringVar(value='Cross'); self.marker_color_name = tk.StringVar(value='Red')
@@ -25,17 +38,15 @@ class AppGUI(tk.Tk):
         self.title("Camera Control Panel"); self.geometry("800x450")
         self._create_menus(); self._create_widgets()
         self.protocol("WM_DELETE_WINDOW", self._on_exit)
-        self.after(100, self._check_for_updates)
+        # Latency is send-to-handle time for every update; dialog latency runs from the camera-window click to the dialog being up
+        self.update_stats = {'latency_ms': collections.deque(maxlen=500), 'dialog_latency_ms': collections.deque(maxlen=100)}
+        self._closed = False; self._start_update_delivery()
+        # The camera window renders at the size it is shown; start it fitted to the screen, less room for the title bar and taskbar
+        self.command_queue.put(('set_display_size', (int(self.winfo_screenwidth()*0.9), int(self.winfo_screenheight()*0.85))))
         self.deiconify()
 
     def _create_widgets(self):
-        tree_frame = ttk.Frame(self); tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 5))
-        columns = ('index', 'x', 'y', 'shape', 'color', 'size', 'desc')
-        self.tree = ttk.Treeview(tree_frame, columns=columns, show='headings')
-        self.tree.heading('index', text='#'); self.tree.heading('x', text='X-Coord'); self.tree.heading('y', text='Y-Coord'); self.tree.heading('shape', text='Shape'); self.tree.heading('color', text='Color'); self.tree.heading('size', text='Size'); self.tree.heading('desc', text='Description')
-        self.tree.column('index', width=40, anchor=tk.CENTER); self.tree.column('x', width=80, anchor=tk.CENTER); self.tree.column('y', width=80, anchor=tk.CENTER); self.tree.column('shape', width=80, anchor=tk.W); self.tree.column('color', width=80, anchor=tk.W); self.tree.column('size', width=60, anchor=tk.CENTER); self.tree.column('desc', width=200, anchor=tk.W)
-        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscroll=scrollbar.set); scrollbar.pack(side=tk.RIGHT, fill=tk.Y); self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.marker_table = VirtualMarkerTable(self, self.bgr_to_color_name); self.marker_table.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 5))
         button_frame = ttk.Frame(self); button_frame.pack(fill=tk.X, padx=10, pady=(5, 10))
         desc_button = ttk.Button(button_frame, text="Add/Edit Last Marker...", command=self._open_description_dialog_event)
         desc_button.pack(side=tk.LEFT)
@@ -47,53 +58,109 @@ class AppGUI(tk.Tk):
         file_menu = tk.Menu(self.menubar, tearoff=0); self.menubar.add_cascade(label="File", menu=file_menu)
         file_menu.add_command(label="New", command=self._new_file); file_menu.add_command(label="Load Markers...", command=self._load_file); file_menu.add_command(label="Save", command=self._save_current_file); file_menu.add_command(label="Save Markers As...", command=self._save_as_file); file_menu.add_separator(); file_menu.add_command(label="Exit", command=self._on_exit)
         camera_menu = tk.Menu(self.menubar, tearoff=0); self.menubar.add_cascade(label="Camera", menu=camera_menu)
-        select_camera_menu = tk.Menu(camera_menu, tearoff=0); camera_menu.add_cascade(label="Select Camera", menu=select_camera_menu)
-        if self.camera_capabilities:
-            for index, caps in self.camera_capabilities.items():
-                select_camera_menu.add_radiobutton(label=f"[{index}] {caps['name']}", value=index, variable=self.camera_index_var, command=self._switch_camera)
-        else: select_camera_menu.add_command(label="No cameras found", state="disabled")
+        self.select_camera_menu = tk.Menu(camera_menu, tearoff=0); camera_menu.add_cascade(label="Select Camera", menu=self.select_camera_menu)
+        self._update_camera_menu()
         self.resolution_menu = tk.Menu(camera_menu, tearoff=0); camera_menu.add_cascade(label="Set Resolution", menu=self.resolution_menu)
         self._update_resolution_menu()
+        camera_menu.add_command(label="Rescan Cameras", command=self._rescan_cameras)
         camera_menu.add_separator(); camera_menu.add_command(label="Camera Settings...", command=self._open_cam_settings)
+        camera_menu.add_command(label="Performance...", command=self._open_performance)
+        camera_menu.add_command(label="Snapshot...", command=self._open_snapshot)
         marker_menu = tk.Menu(self.menubar, tearoff=0); self.menubar.add_cascade(label="Markers", menu=marker_menu)
         shape_menu = tk.Menu(marker_menu, tearoff=0); marker_menu.add_cascade(label="Shape", menu=shape_menu)
         for shape in ['Cross', 'Circle', 'Square']: shape_menu.add_radiobutton(label=shape, variable=self.marker_shape, command=self._set_marker_shape)
         color_menu = tk.Menu(marker_menu, tearoff=0); marker_menu.add_cascade(label="Color", menu=color_menu)
-        self.colors = {'Red': (0, 0, 255), 'Green': (0, 255, 0), 'Blue': (255, 0, 0), 'Yellow': (0, 255, 255)}
+        self.colors = {'Red': (0, 0, 255), 'Green': (0, 255, 0), 'Blue': (255, 0, 0), 'Yellow': (0, 255, 255)}; self.bgr_to_color_name = {v: k for k, v in self.colors.items()}
         for color_name in self.colors: color_menu.add_radiobutton(label=color_name, variable=self.marker_color_name, command=self._set_marker_color)
         size_menu = tk.Menu(marker_menu, tearoff=0); marker_menu.add_cascade(label="Size (pixels)", menu=size_menu)
         for size in [9, 15, 25]: size_menu.add_radiobutton(label=f"{size}px", value=size, variable=self.marker_size, command=self._set_marker_size)
+        marker_menu.add_separator(); marker_menu.add_command(label="Move All Markers...", command=self._move_all_markers)
         help_menu = tk.Menu(self.menubar, tearoff=0); self.menubar.add_cascade(label="Help", menu=help_menu)
         help_menu.add_command(label="View Commands", command=self._show_help); help_menu.add_command(label="About", command=self._show_about)
 
+    def _update_camera_menu(self):
+        self.select_camera_menu.delete(0, tk.END)
+        if self.camera_capabilities:
+            for index, caps in self.camera_capabilities.items():
+                label = f"[{index}] {caps['name']}" + (" (probe failed)" if caps.get('error') else "")
+                self.select_camera_menu.add_radiobutton(label=label, value=index, variable=self.camera_index_var, command=self._switch_camera)
+        else: self.select_camera_menu.add_command(label="Searching for cameras..." if self.capabilities_pending else "No cameras found", state="disabled")
     def _update_resolution_menu(self):
         self.resolution_menu.delete(0, tk.END)
         cam_index = self.camera_index_var.get()
         caps = self.camera_capabilities.get(cam_index)
         if caps and caps['resolutions']:
             for w, h in caps['resolutions']: self.resolution_menu.add_command(label=f"{w}x{h}", command=lambda w=w, h=h: self._set_resolution(w, h))
-        else: self.resolution_menu.add_command(label="No resolutions found", state="disabled")
-    def _refresh_marker_table(self):
-        for item in self.tree.get_children(): self.tree.delete(item)
-        bgr_to_color_name = {v: k for k, v in self.colors.items()}
-        current_markers = self._get_current_cam_state().get('markers', [])
-        for i, marker in enumerate(current_markers):
-            pos, shape = marker['pos'], marker['shape']; color_name = bgr_to_color_name.get(tuple(marker['color']), "Custom")
-            size, desc = marker['size'], marker.get('desc', ''); self.tree.insert('', tk.END, values=(i+1, pos[0], pos[1], shape, color_name, f"{size}px", desc))
+        else: self.resolution_menu.add_command(label="Searching for cameras..." if self.capabilities_pending else "No resolutions found", state="disabled")
+    def _refresh_marker_table(self): self.marker_table.set_markers(self._get_current_cam_state().get('markers', []))
+    def _apply_marker_delta(self, delta, update_table):
+        """Applies one ('marker_delta', ...) message; a version gap means a message was missed, so a full resync is requested."""
+        cam_index, version, op, index, marker = delta
+        state = self._get_cam_state(cam_index)
+        if state['awaiting_sync']: return
+        if version != state['version'] + 1:
+            state['awaiting_sync'] = True; self.command_queue.put(('request_marker_sync', cam_index)); return
+        state['version'], markers = version, state['markers']
+        if op == 'insert': markers.insert(index, marker)
+        elif op == 'remove': markers.pop(index)
+        elif op == 'replace': markers[index] = marker
+        if not update_table: return
+        if op == 'insert': self.marker_table.marker_inserted(index)
+        elif op == 'remove': self.marker_table.marker_removed(index)
+        elif op == 'replace': self.marker_table.marker_replaced(index)
+    def _start_update_delivery(self):
+        # Tk sleeps until the update queue's pipe turns readable; where it cannot watch the pipe, fall back to polling
+        self._update_fd = wake_fileno(self.update_queue)
+        if self._update_fd is not None and hasattr(self.tk, 'createfilehandler'):
+            self.tk.createfilehandler(self._update_fd, tk.READABLE, self._on_update_fd)
+        else: self._update_fd = None; self.after(100, self._check_for_updates)
+    def _on_update_fd(self, fd, mask):
+        # The pipe is unwatched while the queue is drained: a modal dialog opened by the drain runs a nested event loop,
+        # which would otherwise start a second drain inside the first (the after() polling never re-entered)
+        self.tk.deletefilehandler(fd)
+        try: self._check_for_updates()
+        finally:
+            if self._update_fd is not None: self.tk.createfilehandler(fd, tk.READABLE, self._on_update_fd)
+    def _record_dialog_latency(self, sent_at):
+        if sent_at is not None: self.update_idletasks(); self.update_stats['dialog_latency_ms'].append((time.time() - sent_at) * 1000)
+    def _shutdown(self):
+        self._closed = True
+        if self._update_fd is not None: self.tk.deletefilehandler(self._update_fd); self._update_fd = None
+        latencies, dialog_latencies = self.update_stats['latency_ms'], self.update_stats['dialog_latency_ms']
+        if latencies: print(f"GUI: Updates handled: {len(latencies)}, mean latency: {sum(latencies)/len(latencies):.1f} ms")
+        if dialog_latencies: print(f"GUI: Click-to-dialog mean latency: {sum(dialog_latencies)/len(dialog_latencies):.1f} ms over {len(dialog_latencies)} dialog(s)")
+        for ring in self.frame_rings.values(): ring.close()
+        self.frame_rings.clear(); self.destroy()
     def _check_for_updates(self):
         needs_refresh = False
         try:
-            while True:
-                command, value = self.update_queue.get_nowait()
-                if command == 'sync_markers': self._get_current_cam_state()['markers'] = value; needs_refresh = True
+            # A dialog below may end the session (its nested event loop runs the Exit command, say); the root is gone then
+            while not self._closed:
+                command, value, sent_at = unpack_message(self.update_queue.get_nowait())
+                if sent_at is not None: self.update_stats['latency_ms'].append((time.time() - sent_at) * 1000)
+                if command == 'marker_delta':
+                    # Rows are patched in place unless the whole table is about to be rebuilt anyway
+                    self._apply_marker_delta(value, update_table=not needs_refresh and value[0] == self.camera_index_var.get())
+                elif command == 'sync_markers':
+                    cam_index, version, markers = value
+                    state = self._get_cam_state(cam_index); state['markers'], state['version'], state['awaiting_sync'] = markers, version, False
+                    if cam_index == self.camera_index_var.get(): needs_refresh = True
                 elif command == 'status_update':
                     status = value; self.current_camera_name = status['name']; self.camera_index_var.set(status['index']); self.current_resolution = status['resolution']; needs_refresh = True
-                elif command == 'confirm_delete_marker': index, marker_data = value; self._confirm_delete(index, marker_data)
-                elif command == 'show_description_dialog_for_marker': marker_index = value; self._open_description_dialog_event(marker_index=marker_index)
-                elif command == 'exit_gui': self.destroy()
+                elif command == 'confirm_delete_marker': index, marker_data = value; self._confirm_delete(index, marker_data, sent_at)
+                elif command == 'show_description_dialog_for_marker': marker_index = value; self._open_description_dialog_event(marker_index=marker_index, sent_at=sent_at)
+                elif command == 'camera_capabilities':
+                    if value != self.camera_capabilities or self.capabilities_pending:
+                        self.camera_capabilities, self.capabilities_pending = value, False; self._update_camera_menu(); self._update_resolution_menu()
+                        self.command_queue.put(('set_camera_names', {index: caps['name'] for index, caps in value.items()}))
+                elif command == 'perf_stats':
+                    if self.performance_window is not None: self.performance_window.show_stats(value)
+                elif command == 'frame_ring': self._attach_frame_ring(*value)
+                elif command == 'exit_gui': self._shutdown(); return
         except queue.Empty: pass
+        if self._closed: return
         if needs_refresh: self._refresh_marker_table()
-        self.after(100, self._check_for_updates)
+        if self._update_fd is None: self.after(100, self._check_for_updates)
     def show_ffmpeg_error_and_exit(self):
         self.deiconify()
         dialog = Toplevel(self); dialog.title("Dependency Not Found")
@@ -121,26 +188,34 @@ class AppGUI(tk.Tk):
         if rh > sh / 2: help_win.geometry(f"{rw}x{int(sh / 2)}"); scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         x=self.winfo_x()+(self.winfo_width()/2)-(help_win.winfo_width()/2); y=self.winfo_y()+(self.winfo_height()/2)-(help_win.winfo_height()/2)
         help_win.geometry(f"+{int(x)}+{int(y)}"); help_win.transient(self); help_win.grab_set()
-    def _get_current_cam_state(self):
-        cam_index = self.camera_index_var.get()
-        if cam_index not in self.camera_states: self.camera_states[cam_index] = {"markers": [], "undo_stack": [], "redo_stack": []}
+    def _get_current_cam_state(self): return self._get_cam_state(self.camera_index_var.get())
+    def _get_cam_state(self, cam_index):
+        if cam_index not in self.camera_states: self.camera_states[cam_index] = {"markers": [], "version": 0, "awaiting_sync": False}
         return self.camera_states[cam_index]
     def _restart_camera(self): self.command_queue.put(('restart_camera', None))
-    def _confirm_delete(self, index, marker_data):
+    def _rescan_cameras(self):
+        # Probing can take seconds, so it runs off the Tk thread and reports back through update_queue
+        def rescan(): self.update_queue.put(('camera_capabilities', discover_camera_capabilities_cached(rescan=True)))
+        threading.Thread(target=rescan, name="CameraRescan", daemon=True).start()
+    def _confirm_delete(self, index, marker_data, sent_at=None):
         marker_num = index + 1; desc = marker_data.get('desc', ''); details = f"Marker #{marker_num} at {marker_data['pos']}"
         if desc: details += f"\nDescription: {desc}"
+        # askyesno blocks until answered, so the latency is taken once its nested event loop first goes idle
+        self.after_idle(self._record_dialog_latency, sent_at)
         self.attributes('-topmost', True); user_response = messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete this marker?\n\n{details}")
+        if self._closed: return
         self.attributes('-topmost', False)
         if user_response: self.command_queue.put(('delete_marker_confirmed', index))
-    def _open_description_dialog_event(self, event=None, marker_index=None):
+    def _open_description_dialog_event(self, event=None, marker_index=None, sent_at=None):
         current_markers = self._get_current_cam_state().get('markers', [])
         if not current_markers: messagebox.showinfo("Info", "Please add a marker first."); return
         if marker_index is None: marker_index = len(current_markers) - 1
         DescriptionDialog(self, current_markers, self.colors, self.command_queue, self._update_marker_from_dialog, starting_index=marker_index)
+        self._record_dialog_latency(sent_at)
     def _update_marker_from_dialog(self, index, updated_marker_data):
         current_markers = self._get_current_cam_state().get('markers', [])
         if 0 <= index < len(current_markers):
-            current_markers[index] = updated_marker_data; self._refresh_marker_table()
+            current_markers[index] = updated_marker_data; self.marker_table.marker_replaced(index)
             self.command_queue.put(('update_marker', (index, current_markers[index])))
         else: messagebox.showerror("Error", f"Invalid marker number: {index + 1}")
     def _switch_camera(self): self.command_queue.put(('switch_camera', self.camera_index_var.get())); self._update_resolution_menu(); self._refresh_marker_table()
@@ -148,6 +223,12 @@ class AppGUI(tk.Tk):
     def _set_marker_shape(self): self.command_queue.put(('set_marker_shape', self.marker_shape.get()))
     def _set_marker_color(self): self.command_queue.put(('set_marker_color', self.colors[self.marker_color_name.get()]))
     def _set_marker_size(self): self.command_queue.put(('set_marker_size', self.marker_size.get()))
+    def _move_all_markers(self):
+        offset = simpledialog.askstring("Move All Markers", "Move every marker of this camera by dx, dy (camera pixels):", parent=self)
+        if not offset: return
+        try: dx, dy = (int(v) for v in offset.replace(',', ' ').split())
+        except ValueError: messagebox.showerror("Error", "Enter two whole numbers, e.g. 12, -4.", parent=self); return
+        self.command_queue.put(('move_all_markers', (dx, dy)))
     def _new_file(self):
         if messagebox.askyesno("Confirm New", "Clear all current markers?"): self.current_filepath = None; self.command_queue.put(('clear_markers', None))
     def _load_file(self):
@@ -177,7 +258,31 @@ class AppGUI(tk.Tk):
             self.current_filepath = final_filepath; print(f"GUI: Saved new file to {final_filepath}")
         except Exception as e: messagebox.showerror("Error", f"Failed to save file.\n{e}")
     def _open_cam_settings(self): CameraSettingsWindow(self, self.command_queue)
-    def _on_exit(self): self.command_queue.put(('exit', None)); self.destroy()
+    def _open_performance(self):
+        if self.performance_window is not None: self.performance_window.lift(); return
+        self.performance_window = PerformanceWindow(self, self.command_queue, self._station_info, self._performance_closed)
+    def _performance_closed(self): self.performance_window = None
+    def _attach_frame_ring(self, cam_index, info):
+        """Follows a ('frame_ring', ...) message: the camera's frames moved to the ring in info, or stopped being shared if info is None."""
+        ring = None
+        if info is not None:
+            same = next((index for index, attached in self.frame_rings.items() if attached.name == info['name']), None)
+            # A ring announced again under another camera index is the same memory, now carrying that camera's frames
+            if same is not None: ring = self.frame_rings.pop(same)
+            else:
+                try: ring = FrameRingReader(info['name'])
+                except (FileNotFoundError, ValueError): pass # Already replaced by a newer ring
+        old = self.frame_rings.pop(cam_index, None)
+        if old is not None and old is not ring: old.close()
+        if ring is not None: self.frame_rings[cam_index] = ring
+    def _open_snapshot(self):
+        if self.snapshot_window is not None: self.snapshot_window.lift(); return
+        self.snapshot_window = SnapshotWindow(self, self.command_queue, lambda: self.frame_rings.get(self.camera_index_var.get()), self._snapshot_closed)
+    def _snapshot_closed(self): self.snapshot_window = None
+    def _station_info(self):
+        return {"host": platform.node(), "platform": sys.platform, "camera": self.current_camera_name, "camera_index": self.camera_index_var.get(),
+                "resolution": f"{self.current_resolution[0]}x{self.current_resolution[1]}"}
+    def _on_exit(self): self.command_queue.put(('exit', None)); self._shutdown()
 
 class DescriptionDialog(Toplevel):
     def __init__(self, parent, markers, colors, command_queue, callback, starting_index=0):
@@ -249,4 +354,72 @@ class CameraSettingsWindow(Toplevel):
         tk.Label(self, text="Brightness").pack(); Scale(self, from_=0, to=255, orient=tk.HORIZONTAL, command=self._set_brightness, variable=tk.DoubleVar(value=128)).pack(fill=tk.X, padx=10)
         tk.Label(self, text="Contrast").pack(); Scale(self, from_=0, to=255, orient=tk.HORIZONTAL, command=self._set_contrast, variable=tk.DoubleVar(value=128)).pack(fill=tk.X, padx=10)
     def _set_brightness(self, value): self.command_queue.put(('set_property', ('brightness', int(float(value)))))
-    def _set_contrast(self, value): self.command_queue.put(('set_property', ('contrast', int(float(value)))))
\ No newline at end of file
+    def _set_contrast(self, value): self.command_queue.put(('set_property', ('contrast', int(float(value)))))
+class PerformanceWindow(Toplevel):
+    # Pipeline order; any other stage the camera process reports is listed after these
+    STAGES = ('commands', 'grab', 'retrieve', 'decode', 'rotate', 'markers', 'resize', 'imshow', 'share', 'zoom_windows', 'waitKey', 'loop')
+    def __init__(self, parent, command_queue, get_station, on_close):
+        super().__init__(parent); self.command_queue=command_queue; self.get_station=get_station; self.on_close=on_close; self.summary=None
+        self.title("Performance"); self.geometry("640x340")
+        self.fps_label = ttk.Label(self, text="Waiting for timings from the camera process..."); self.fps_label.pack(anchor=tk.W, padx=10, pady=(10, 5))
+        columns = ('stage',) + SUMMARY_FIELDS
+        self.tree = ttk.Treeview(self, columns=columns, show='headings', height=len(self.STAGES))
+        for column in columns: self.tree.heading(column, text=column if column in ('stage', 'count') else f"{column} (ms)"); self.tree.column(column, width=120 if column == 'stage' else 70, anchor=tk.W if column == 'stage' else tk.E)
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=10)
+        btn_frame = ttk.Frame(self); btn_frame.pack(pady=10)
+        ttk.Button(btn_frame, text="Export CSV...", command=lambda: self._export('csv')).pack(side=tk.LEFT, padx=5); ttk.Button(btn_frame, text="Export JSON...", command=lambda: self._export('json')).pack(side=tk.LEFT, padx=5)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        # Timing only runs while this window is open
+        self.command_queue.put(('set_perf_stats', True))
+    def show_stats(self, summary):
+        self.summary = summary; stages = summary['stages']
+        self.tree.delete(*self.tree.get_children())
+        for stage in [s for s in self.STAGES if s in stages] + sorted(set(stages) - set(self.STAGES)):
+            values = stages[stage]; self.tree.insert('', tk.END, values=(stage, values['count']) + tuple(f"{values[k]:.2f}" for k in SUMMARY_FIELDS[1:]))
+        fps = summary['fps']; text = f"Display: {fps.get('rendered', 0.0):.1f} fps    Camera: {fps.get('captured', 0.0):.1f} fps"
+        if 'decode_utilization' in summary.get('gauges', {}): text += f"    Decoded: {fps.get('decoded', 0.0):.1f} fps, workers {summary['gauges']['decode_utilization']:.0%} busy"
+        if 'undo_history_kib' in summary.get('gauges', {}): text += f"    Undo history: {summary['gauges']['undo_history_kib']:.0f} KiB"
+        cameras = sorted(name for name in fps if name.startswith('cam '))
+        if cameras: text += "    " + ", ".join(f"{name.capitalize()}: {fps[name]:.1f} fps" for name in cameras)
+        self.fps_label.config(text=text)
+    def _export(self, kind):
+        if self.summary is None: messagebox.showinfo("Info", "No timings received yet.", parent=self); return
+        filepath = filedialog.asksaveasfilename(parent=self, title="Export Performance Stats", defaultextension=f".{kind}", filetypes=[(kind.upper(), f"*.{kind}"), ("All Files", "*.*")])
+        if not filepath: return
+        try: (export_csv if kind == 'csv' else export_json)(filepath, self.summary, self.get_station())
+        except Exception as e: messagebox.showerror("Error", f"Failed to export stats.\n{e}", parent=self)
+    def _on_close(self): self.command_queue.put(('set_perf_stats', False)); self.on_close(); self.destroy()
+
+class SnapshotWindow(Toplevel):
+    """Live preview of the current camera, read straight from the camera process's shared-memory frame ring (see frame_ring)."""
+    PREVIEW_WIDTH, REFRESH_MS = 640, 200
+    def __init__(self, parent, command_queue, get_ring, on_close):
+        super().__init__(parent); self.command_queue=command_queue; self.get_ring=get_ring; self.on_close=on_close; self.shown_seq=None; self.photo=None
+        self.title("Snapshot")
+        self.image_label = ttk.Label(self, text="Waiting for frames from the camera process..."); self.image_label.pack(padx=10, pady=10)
+        btn_frame = ttk.Frame(self); btn_frame.pack(pady=(0, 10))
+        ttk.Button(btn_frame, text="Save...", command=self._save).pack(side=tk.LEFT, padx=5)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        # Frames are only copied into shared memory while this window is open
+        self.command_queue.put(('share_frames', True)); self._refresh()
+    def _refresh(self):
+        ring = self.get_ring(); size = ring.frame_size() if ring is not None else None
+        if size is not None and ring.latest_seq() != self.shown_seq:
+            self.shown_seq = ring.latest_seq()
+            try: ppm = ring.latest_ppm(max(1, -(-size[0] // self.PREVIEW_WIDTH)))
+            except ValueError as e: ppm = None; self.photo = None; self.image_label.config(image="", text=str(e))
+            if ppm is not None: self.photo = tk.PhotoImage(data=ppm); self.image_label.config(image=self.photo, text="")
+        self.after_id = self.after(self.REFRESH_MS, self._refresh)
+    def _save(self):
+        ring = self.get_ring()
+        try: ppm = ring.latest_ppm() if ring is not None else None
+        except ValueError as e: messagebox.showerror("Error", str(e), parent=self); return
+        if ppm is None: messagebox.showinfo("Info", "No frame received yet.", parent=self); return
+        filepath = filedialog.asksaveasfilename(parent=self, title="Save Snapshot", defaultextension=".png", filetypes=[("PNG", "*.png"), ("PPM", "*.ppm"), ("All Files", "*.*")])
+        if not filepath: return
+        try:
+            if filepath.lower().endswith('.ppm'):
+                with open(filepath, 'wb') as f: f.write(ppm)
+            else: tk.PhotoImage(data=ppm).write(filepath, format='png')
+        except Exception as e: messagebox.showerror("Error", f"Failed to save snapshot.\n{e}", parent=self)
+    def _on_close(self): self.after_cancel(self.after_id); self.command_queue.put(('share_frames', False)); self.on_close(); self.destroy()
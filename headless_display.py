@@ -0,0 +1,39 @@
+# headless_display.py
+import time
+
+import cv2
+
+class HeadlessDisplay:
+    """Drop-in for the cv2 HighGUI functions CameraHandler calls, for running without a screen.
+
+    Windows only exist as names; imshow counts frames and keeps the last image per window, waitKey never
+    sees a key press, and click() delivers a mouse event to a window's callback as HighGUI would.
+    A window's image area is the size given to resizeWindow, or window_size if it was never resized.
+    With pace=True waitKey sleeps for its delay like the real one, otherwise it returns at once.
+    """
+    def __init__(self, window_size=(300, 300), pace=False):
+        self.window_size, self.pace = window_size, pace
+        self.callbacks, self.frames_shown, self.last_image, self.sizes, self.titles, self.positions = {}, {}, {}, {}, {}, {}
+
+    def namedWindow(self, name, flags=None): self.callbacks.setdefault(name, None)
+    def setMouseCallback(self, name, callback): self.callbacks[name] = callback
+    def setWindowProperty(self, name, prop, value): pass
+    def resizeWindow(self, name, width, height): self.sizes[name] = (int(width), int(height))
+    def setWindowTitle(self, name, title): self.titles[name] = title
+    def moveWindow(self, name, x, y): self.positions[name] = (int(x), int(y))
+    def imshow(self, name, image):
+        self.callbacks.setdefault(name, None)
+        self.frames_shown[name] = self.frames_shown.get(name, 0) + 1; self.last_image[name] = image
+    def waitKey(self, delay=0):
+        if self.pace and delay > 0: time.sleep(delay / 1000)
+        return -1
+    def getWindowProperty(self, name, prop):
+        if prop == cv2.WND_PROP_VISIBLE: return 1.0 if name in self.callbacks else 0.0
+        return 0.0
+    def getWindowImageRect(self, name): return (0, 0) + tuple(self.sizes.get(name, self.window_size))
+    def destroyWindow(self, name): self.callbacks.pop(name, None); self.sizes.pop(name, None)
+    def destroyAllWindows(self): self.callbacks.clear(); self.sizes.clear()
+
+    def click(self, name, event, x, y, flags=0):
+        callback = self.callbacks.get(name)
+        if callback is not None: callback(event, x, y, flags, None)
@@ -1,5 +1,9 @@
 # main.py
+import time
+LAUNCHED_AT, IMPORTS_STARTED = time.time(), time.perf_counter()  # wall clock is comparable across processes, for time-to-first-frame
+import argparse
 import multiprocessing
+import threading
 import subprocess
 import sys
 import json
@@ -11,12 +15,21 @@ import tkinter.font as tkFont
 import queue
 
 from gui_module import AppGUI
-from camera_process import run_camera_process
-from resolution_lister import discover_camera_capabilities
+from capability_cache import discover_camera_capabilities_cached, load_cached_capabilities
+import v4l2_native
+IMPORTS_MS = (time.perf_counter() - IMPORTS_STARTED) * 1000
+
+def run_camera(*args):
+    """Camera-process entry point. camera_process, and with it OpenCV and NumPy, is imported here in the child,
+    so the GUI process never loads them."""
+    started = time.perf_counter()
+    from camera_process import run_camera_process
+    print(f"CAM: Camera modules (OpenCV, NumPy) imported in {(time.perf_counter() - started) * 1000:.0f} ms.")
+    run_camera_process(*args)
 
 def check_ffmpeg_availability():
-    """Checks if ffmpeg is in the system's PATH. Returns True if found, False otherwise."""
-    return shutil.which('ffmpeg') is not None
+    """Checks if ffmpeg is in the system's PATH, or not needed because V4L2 can be queried natively. Returns True if usable."""
+    return shutil.which('ffmpeg') is not None or v4l2_native.is_available()
 
 if __name__ == "__main__":
     if not check_ffmpeg_availability():
@@ -29,20 +42,38 @@ if __name__ == "__main__":
         app.show_ffmpeg_error_and_exit()
     else:
         multiprocessing.freeze_support()
-        print("MAIN: Discovering available cameras and resolutions...")
-        camera_capabilities = discover_camera_capabilities()
-        if not camera_capabilities:
-            print("MAIN: No cameras found. The application may not function correctly.")
-        else:
-            print(f"MAIN: Found capabilities: {camera_capabilities}")
+        parser = argparse.ArgumentParser(description="PCB Cam")
+        parser.add_argument('--rescan', action='store_true', help="Ignore the camera capability cache and probe every camera again.")
+        parser.add_argument('--source', default=None, help="Frame source instead of the cameras: 'synthetic', 'synthetic:FPS', or an image/video file to loop.")
+        parser.add_argument('--reduced-decode', action='store_true', help="Take raw MJPEG from the camera and decode it at 1/2, 1/4 or 1/8 scale while zoomed out.")
+        parser.add_argument('--decode-workers', type=int, default=0, help="Decode the camera's MJPEG frames on this many threads instead of the capture thread.")
+        parser.add_argument('--keep-warm', action='store_true', help="Keep the previous camera open after switching, so switching back is immediate.")
+        parser.add_argument('--cameras', nargs='+', type=int, default=None, help="Device indices to run at once, each in its own window, e.g. --cameras 0 1 for a top and a side camera.")
+        args = parser.parse_args()
+
+        print(f"MAIN: GUI modules imported in {IMPORTS_MS:.0f} ms.")
 
         command_queue = multiprocessing.Queue()
         update_queue = multiprocessing.Queue()
 
-        camera_proc = multiprocessing.Process(target=run_camera_process, args=(command_queue, update_queue))
+        # The camera process starts first and the GUI comes up at once, from the cached capabilities if there are any;
+        # discovery runs in the background and its result fills the Camera and Resolution menus when it arrives
+        camera_capabilities = {} if args.rescan else load_cached_capabilities()
+        camera_names = {index: caps['name'] for index, caps in camera_capabilities.items()}
+        camera_proc = multiprocessing.Process(target=run_camera, args=(command_queue, update_queue, camera_names, args.source, args.reduced_decode, args.decode_workers, args.keep_warm, LAUNCHED_AT, args.cameras))
         camera_proc.start()
 
-        app = AppGUI(command_queue, update_queue, camera_capabilities)
+        if camera_capabilities: print(f"MAIN: Using cached capabilities: {camera_capabilities}. Revalidating in the background...")
+        else: print("MAIN: Discovering available cameras and resolutions in the background...")
+        def discover_capabilities():
+            capabilities = discover_camera_capabilities_cached(rescan=args.rescan)
+            if not capabilities: print("MAIN: No cameras found. The application may not function correctly.")
+            else: print(f"MAIN: Found capabilities: {capabilities}")
+            update_queue.put(('camera_capabilities', capabilities))
+        threading.Thread(target=discover_capabilities, name="CapabilityDiscovery", daemon=True).start()
+
+        app = AppGUI(command_queue, update_queue, camera_capabilities, capabilities_pending=not camera_capabilities)
+        print(f"MAIN: Control panel shown {(time.time() - LAUNCHED_AT) * 1000:.0f} ms after launch.")
         app.mainloop()
 
         camera_proc.join()
\ No newline at end of file
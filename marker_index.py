@@ -0,0 +1,132 @@
+# marker_index.py
+import math
+
+class MarkerIndex:
+    """Uniform grid over marker positions (original-frame coordinates) for nearest-marker and rectangle queries.
+
+    Each cell holds the list indices of the markers inside it, so the index mirrors the marker list:
+    appending, removing the last marker and moving a marker are O(1), while inserting or removing in the
+    middle renumbers the markers that follow.
+    """
+    def __init__(self, markers=(), cell_size=64):
+        self.cell_size = cell_size
+        self.rebuild(markers)
+
+    def rebuild(self, markers):
+        """Indexes markers afresh: marker dicts, or a MarkerStore, whose x and y fields are read directly."""
+        self._cells, self._positions = {}, []
+        self._min_cell, self._max_cell = None, None
+        positions = zip(markers.field('x').tolist(), markers.field('y').tolist()) if hasattr(markers, 'field') else (marker['pos'] for marker in markers)
+        for pos in positions: self.insert(len(self._positions), pos)
+
+    def __len__(self): return len(self._positions)
+
+    def _cell(self, pos): return (math.floor(pos[0]) // self.cell_size, math.floor(pos[1]) // self.cell_size)
+
+    def _add_to_cell(self, cell, index):
+        self._cells.setdefault(cell, set()).add(index)
+        # Bounds only ever grow between rebuilds; they just cap how far a nearest-marker search walks
+        if self._min_cell is None: self._min_cell, self._max_cell = cell, cell
+        else:
+            self._min_cell = (min(self._min_cell[0], cell[0]), min(self._min_cell[1], cell[1]))
+            self._max_cell = (max(self._max_cell[0], cell[0]), max(self._max_cell[1], cell[1]))
+
+    def _discard_from_cell(self, cell, index):
+        members = self._cells[cell]; members.discard(index)
+        if not members: del self._cells[cell]
+
+    def insert(self, index, pos):
+        pos = (int(pos[0]), int(pos[1]))
+        for j in range(len(self._positions)-1, index-1, -1):
+            members = self._cells[self._cell(self._positions[j])]; members.discard(j); members.add(j+1)
+        self._positions.insert(index, pos)
+        self._add_to_cell(self._cell(pos), index)
+
+    def append(self, pos): self.insert(len(self._positions), pos)
+
+    def remove(self, index):
+        pos = self._positions.pop(index)
+        self._discard_from_cell(self._cell(pos), index)
+        for j in range(index, len(self._positions)):
+            members = self._cells[self._cell(self._positions[j])]; members.discard(j+1); members.add(j)
+
+    def move(self, index, pos):
+        pos = (int(pos[0]), int(pos[1]))
+        self._discard_from_cell(self._cell(self._positions[index]), index)
+        self._positions[index] = pos
+        self._add_to_cell(self._cell(pos), index)
+
+    def _closest_in(self, indices, x, y, best):
+        for i in indices:
+            px, py = self._positions[i]
+            candidate = ((px-x)**2 + (py-y)**2, i)
+            if candidate < best: best = candidate
+        return best
+
+    def nearest(self, x, y):
+        """Index of the marker closest to (x, y), lowest index on ties, or -1 if there are no markers."""
+        if not self._positions: return -1
+        best = (math.inf, -1)
+        cx, cy = self._cell((x, y))
+        max_ring = max(cx - self._min_cell[0], self._max_cell[0] - cx, cy - self._min_cell[1], self._max_cell[1] - cy, 0)
+        for ring in range(max_ring + 1):
+            if 8*ring > len(self._cells):
+                # The ring is now bigger than the occupied part of the grid, so scan what is left directly
+                for (cell_x, cell_y), members in self._cells.items():
+                    if max(abs(cell_x-cx), abs(cell_y-cy)) >= ring: best = self._closest_in(members, x, y, best)
+                break
+            for cell in self._ring_cells(cx, cy, ring):
+                members = self._cells.get(cell)
+                if members: best = self._closest_in(members, x, y, best)
+            # Anything in a further ring is at least ring*cell_size away
+            if best[1] != -1 and best[0] < (ring*self.cell_size)**2: break
+        return best[1]
+
+    @staticmethod
+    def _ring_cells(cx, cy, ring):
+        if ring == 0: yield (cx, cy); return
+        for dx in range(-ring, ring+1): yield (cx+dx, cy-ring); yield (cx+dx, cy+ring)
+        for dy in range(-ring+1, ring): yield (cx-ring, cy+dy); yield (cx+ring, cy+dy)
+
+    def in_rect(self, x0, y0, x1, y1):
+        """Sorted indices of the markers with x0 <= x <= x1 and y0 <= y <= y1."""
+        (cx0, cy0), (cx1, cy1) = self._cell((x0, y0)), self._cell((x1, y1))
+        if (cx1-cx0+1)*(cy1-cy0+1) <= len(self._cells):
+            cells = (self._cells.get((cell_x, cell_y)) for cell_x in range(cx0, cx1+1) for cell_y in range(cy0, cy1+1))
+        else: cells = (members for (cell_x, cell_y), members in self._cells.items() if cx0 <= cell_x <= cx1 and cy0 <= cell_y <= cy1)
+        found = []
+        for members in cells:
+            if not members: continue
+            for i in members:
+                px, py = self._positions[i]
+                if x0 <= px <= x1 and y0 <= py <= y1: found.append(i)
+        return sorted(found)
+
+if __name__ == '__main__':
+    # Microbenchmark: grid index against the linear scan it replaces, at 10k markers
+    import random
+    import time
+    random.seed(0)
+    frame_width, frame_height, count, queries = 4656, 3496, 10000, 2000
+    markers = [{"pos": (random.randrange(frame_width), random.randrange(frame_height))} for _ in range(count)]
+    points = [(random.uniform(0, frame_width), random.uniform(0, frame_height)) for _ in range(queries)]
+    def linear_nearest(x, y):
+        min_dist_sq, nearest_index = float('inf'), -1
+        for i, marker in enumerate(markers):
+            dist_sq = (marker['pos'][0]-x)**2 + (marker['pos'][1]-y)**2
+            if dist_sq < min_dist_sq: min_dist_sq, nearest_index = dist_sq, i
+        return nearest_index
+    start = time.perf_counter(); index = MarkerIndex(markers); build_ms = (time.perf_counter()-start)*1000
+    start = time.perf_counter(); [linear_nearest(x, y) for x, y in points]; linear_us = (time.perf_counter()-start)/queries*1e6
+    start = time.perf_counter(); [index.nearest(x, y) for x, y in points]; grid_us = (time.perf_counter()-start)/queries*1e6
+    rect = (1000, 1000, 1400, 1300)
+    start = time.perf_counter(); rect_hits = index.in_rect(*rect); rect_us = (time.perf_counter()-start)*1e6
+    start = time.perf_counter()
+    for _ in range(1000): index.append((random.randrange(frame_width), random.randrange(frame_height)))
+    for _ in range(1000): index.remove(len(index)-1)
+    edit_us = (time.perf_counter()-start)/2000*1e6
+    start = time.perf_counter(); index.remove(count//2); index.insert(count//2, markers[count//2]['pos']); middle_ms = (time.perf_counter()-start)*1000
+    print(f"{count} markers, build {build_ms:.1f} ms")
+    print(f"nearest: linear scan {linear_us:.1f} us/query, grid {grid_us:.1f} us/query ({linear_us/grid_us:.0f}x)")
+    print(f"in_rect {rect}: {len(rect_hits)} markers in {rect_us:.1f} us")
+    print(f"append/remove last: {edit_us:.2f} us/op, remove+insert in the middle: {middle_ms:.2f} ms")
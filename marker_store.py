@@ -0,0 +1,122 @@
+# marker_store.py
+import numpy as np
+
+# One record per marker: position (original-frame pixels), size, and indices into the interned shape and colour tables
+MARKER_DTYPE = np.dtype([('x', np.int32), ('y', np.int32), ('size', np.int32), ('shape', np.uint8), ('color', np.uint16)])
+
+# Interned for the whole process, so every store shares one table; a marker holds only the index
+_shapes, _colors = ['Cross', 'Circle', 'Square'], []
+_shape_ids, _color_ids = {shape: i for i, shape in enumerate(_shapes)}, {}
+_palette = np.empty((0, 3), np.uint8)
+
+def _intern_shape(shape):
+    shape_id = _shape_ids.get(shape)
+    if shape_id is None: shape_id = _shape_ids[shape] = len(_shapes); _shapes.append(shape)
+    return shape_id
+def _intern_color(color):
+    global _palette
+    color = tuple(int(c) for c in color); color_id = _color_ids.get(color)
+    if color_id is None:
+        color_id = _color_ids[color] = len(_colors); _colors.append(color)
+        _palette = np.array(_colors, np.uint8).reshape(-1, 3)
+    return color_id
+def shape_name(shape_id): return _shapes[shape_id]
+def palette():
+    """(colors, 3) uint8 array of the interned BGR colours, indexed by a record's 'color' field."""
+    return _palette
+
+class MarkerStore:
+    """One camera's markers as a NumPy structured array (MARKER_DTYPE), with the face of a list of marker dicts.
+
+    Shapes and colours are interned, so each marker is a 15-byte record; descriptions, the only free text, are
+    kept in a parallel list. Indexing and iterating build the usual {"pos", "shape", "color", "size", "desc"}
+    dicts on the fly, and insert(), append(), pop() and item assignment take them, so the JSON files and the
+    GUI (which gets to_list()) see markers exactly as before. placements() works on all markers at once;
+    hit tests go through the marker_index.MarkerIndex kept alongside the store. Records live in a buffer
+    that doubles as it fills, so appending is amortized O(1).
+    """
+    def __init__(self, markers=()):
+        self._records, self._count, self._desc = np.empty(16, MARKER_DTYPE), 0, []
+        self.extend(markers)
+
+    @staticmethod
+    def _record(marker):
+        return (int(marker['pos'][0]), int(marker['pos'][1]), int(marker['size']), _intern_shape(marker['shape']), _intern_color(marker['color']))
+    def _reserve(self, count):
+        if count <= len(self._records): return
+        records = np.empty(max(count, 2*len(self._records)), MARKER_DTYPE); records[:self._count] = self._records[:self._count]
+        self._records = records
+    def _position(self, index):
+        if index < 0: index += self._count
+        if not 0 <= index < self._count: raise IndexError("marker index out of range")
+        return index
+    def _marker(self, record, desc):
+        x, y, size, shape_id, color_id = record
+        return {"pos": (x, y), "shape": _shapes[shape_id], "color": _colors[color_id], "size": size, "desc": desc}
+
+    def __len__(self): return self._count
+    def __getitem__(self, index):
+        index = self._position(index)
+        return self._marker(self._records[index].tolist(), self._desc[index])
+    def __iter__(self):
+        for record, desc in zip(self._records[:self._count].tolist(), self._desc): yield self._marker(record, desc)
+    def __setitem__(self, index, marker):
+        index = self._position(index); self._records[index] = self._record(marker); self._desc[index] = marker.get('desc', "")
+    def to_list(self): return list(self)
+    def insert(self, index, marker):
+        index = min(max(index + self._count if index < 0 else index, 0), self._count)
+        self._reserve(self._count + 1)
+        self._records[index+1:self._count+1] = self._records[index:self._count]
+        self._records[index] = self._record(marker); self._desc.insert(index, marker.get('desc', "")); self._count += 1
+    def append(self, marker): self.insert(self._count, marker)
+    def extend(self, markers):
+        markers = list(markers)
+        self._reserve(self._count + len(markers))
+        self._records[self._count:self._count+len(markers)] = [self._record(marker) for marker in markers]
+        self._desc.extend(marker.get('desc', "") for marker in markers); self._count += len(markers)
+    def pop(self, index=-1):
+        index = self._position(index); marker = self[index]
+        self._records[index:self._count-1] = self._records[index+1:self._count]; del self._desc[index]; self._count -= 1
+        return marker
+    def clear(self): self._count = 0; self._desc.clear()
+    def translate(self, dx, dy):
+        """Moves every marker by (dx, dy) original-frame pixels."""
+        self._records['x'][:self._count] += int(dx); self._records['y'][:self._count] += int(dy)
+    @property
+    def nbytes(self):
+        """Bytes held for the markers: the record buffer plus the description strings."""
+        return self._records.nbytes + sum(len(desc) for desc in self._desc)
+
+    def field(self, name): return self._records[name][:self._count]
+    def placements(self, frame_size, offset=(0, 0), scale=None):
+        """Vectorized render.marker_placement: (xs, ys, sizes) of every marker on the rotated view starting at offset,
+        or on that view downscaled by scale=(sx, sy), through pixel centres."""
+        xs = frame_size[0] - 1 - self.field('x').astype(np.int64) - int(offset[0])
+        ys = frame_size[1] - 1 - self.field('y').astype(np.int64) - int(offset[1])
+        sizes = self.field('size').astype(np.int64)
+        if scale is None: return xs, ys, sizes
+        xs, ys = np.rint((xs+0.5)*scale[0] - 0.5).astype(np.int64), np.rint((ys+0.5)*scale[1] - 0.5).astype(np.int64)
+        return xs, ys, np.maximum(1, np.rint(sizes*min(scale)).astype(np.int64))
+
+if __name__ == '__main__':
+    # Memory and speed against the list of dicts it replaces, at 10k markers
+    import pickle
+    import random
+    import sys
+    import time
+    from marker_index import MarkerIndex
+    random.seed(0)
+    frame_width, frame_height, count = 4656, 3496, 10000
+    markers = [{"pos": (random.randrange(frame_width), random.randrange(frame_height)), "shape": random.choice(['Cross', 'Circle', 'Square']),
+                "color": random.choice([(0, 0, 255), (0, 255, 0), (255, 0, 0), (0, 255, 255)]), "size": random.choice([9, 15, 25]), "desc": ""} for _ in range(count)]
+    start = time.perf_counter(); store = MarkerStore(markers); build_ms = (time.perf_counter()-start)*1000
+    list_bytes = sys.getsizeof(markers) + sum(sys.getsizeof(m) + sys.getsizeof(m['pos']) + sum(sys.getsizeof(v) for v in m['pos']) for m in markers)
+    print(f"{count} markers: list of dicts ~{list_bytes/1024:.0f} KiB, store {store.nbytes/1024:.0f} KiB; built in {build_ms:.1f} ms, pickled for the GUI {len(pickle.dumps(store.to_list()))/1024:.0f} KiB")
+    points = [(random.uniform(0, frame_width), random.uniform(0, frame_height)) for _ in range(500)]
+    def linear_nearest(x, y): return min(range(count), key=lambda i: ((markers[i]['pos'][0]-x)**2 + (markers[i]['pos'][1]-y)**2, i))
+    start = time.perf_counter(); [linear_nearest(x, y) for x, y in points]; linear_us = (time.perf_counter()-start)/len(points)*1e6
+    start = time.perf_counter(); index = MarkerIndex(store); index_ms = (time.perf_counter()-start)*1000
+    start = time.perf_counter(); [index.nearest(x, y) for x, y in points]; index_us = (time.perf_counter()-start)/len(points)*1e6
+    print(f"nearest: linear scan {linear_us:.0f} us/query, MarkerIndex over the store {index_us:.0f} us/query (built in {index_ms:.1f} ms)")
+    start = time.perf_counter(); store.to_list(); to_list_ms = (time.perf_counter()-start)*1000
+    print(f"to_list: {to_list_ms:.1f} ms")
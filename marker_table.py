@@ -0,0 +1,197 @@
+# marker_table.py
+import tkinter as tk
+from tkinter import ttk
+import tkinter.font as tkFont
+
+COLUMNS = ('index', 'x', 'y', 'shape', 'color', 'size', 'desc')
+HEADINGS = {'index': '#', 'x': 'X-Coord', 'y': 'Y-Coord', 'shape': 'Shape', 'color': 'Color', 'size': 'Size', 'desc': 'Description'}
+COLUMN_LAYOUT = {'index': (40, tk.CENTER), 'x': (80, tk.CENTER), 'y': (80, tk.CENTER), 'shape': (80, tk.W), 'color': (80, tk.W), 'size': (60, tk.CENTER), 'desc': (200, tk.W)}
+
+class MarkerTableView:
+    """Which marker sits on which table row, kept as marker indices so the marker list itself is never copied.
+
+    With no sort and no filter row r is simply marker r and nothing is stored. Otherwise _order lists the
+    marker indices row by row, and edits patch it in place rather than sorting or filtering again.
+    """
+    def __init__(self, color_names):
+        self.color_names = color_names
+        self.markers, self.sort_column, self.sort_reverse, self.filter_text = [], None, False, ''
+        self._order = None
+
+    def __len__(self): return len(self.markers) if self._order is None else len(self._order)
+
+    def color_name(self, marker): return self.color_names.get(tuple(marker['color']), "Custom")
+    def row_values(self, i):
+        marker = self.markers[i]; pos = marker['pos']
+        return (i+1, pos[0], pos[1], marker['shape'], self.color_name(marker), f"{marker['size']}px", marker.get('desc', ''))
+
+    def _sort_key(self, i):
+        # The marker index breaks ties, so every key is unique and a binary search finds exactly one slot
+        column, marker = self.sort_column, self.markers[i]
+        if column is None or column == 'index': return (i,)
+        if column == 'x': return (marker['pos'][0], i)
+        if column == 'y': return (marker['pos'][1], i)
+        if column == 'color': return (self.color_name(marker), i)
+        if column == 'desc': return (marker.get('desc', '').lower(), i)
+        return (marker[column], i)
+    def _matches(self, i): return self.filter_text in self.markers[i].get('desc', '').lower()
+
+    def set_markers(self, markers): self.markers = markers; self._rebuild()
+    def set_sort(self, column, reverse=False): self.sort_column, self.sort_reverse = column, reverse; self._rebuild()
+    def set_filter(self, text): self.filter_text = text.strip().lower(); self._rebuild()
+    def _rebuild(self):
+        if self.sort_column is None and not self.filter_text: self._order = None; return
+        order = [i for i in range(len(self.markers)) if self._matches(i)] if self.filter_text else list(range(len(self.markers)))
+        if self.sort_column not in (None, 'index') or self.sort_reverse: order.sort(key=self._sort_key, reverse=self.sort_reverse)
+        self._order = order
+
+    def _insert_position(self, key):
+        lo, hi = 0, len(self._order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_key = self._sort_key(self._order[mid])
+            if (mid_key > key) if self.sort_reverse else (mid_key < key): lo = mid + 1
+            else: hi = mid
+        return lo
+    def _place(self, i):
+        if self._matches(i): self._order.insert(self._insert_position(self._sort_key(i)), i)
+
+    # --- Called after the marker list has been edited; the sorted/filtered order costs O(n) integer shifts, never a re-sort ---
+    def inserted(self, index):
+        if self._order is None: return
+        self._order = [i+1 if i >= index else i for i in self._order]; self._place(index)
+    def removed(self, index):
+        if self._order is None: return
+        self._order = [i-1 if i > index else i for i in self._order if i != index]
+    def replaced(self, index):
+        if self._order is None: return
+        if index in self._order: self._order.remove(index)
+        self._place(index)
+
+    def rows(self, first, count):
+        """Marker indices shown on rows first .. first+count-1."""
+        if self._order is None: return range(first, min(first + count, len(self.markers)))
+        return self._order[first:first+count]
+
+class VirtualMarkerTable(ttk.Frame):
+    """Marker table that keeps Treeview items only for the rows on screen and refills them as the view scrolls.
+
+    Scrolling, edits and resizes cost O(visible rows) Treeview calls however many markers there are.
+    Column headings sort (click again to reverse, a third time to clear) and the entry filters by description.
+    """
+    def __init__(self, parent, color_names):
+        super().__init__(parent)
+        self.view = MarkerTableView(color_names)
+        self._top, self._visible, self._items, self.selected_marker, self._shown_selection = 0, 20, [], None, ()
+        filter_frame = ttk.Frame(self); filter_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(filter_frame, text="Filter description:").pack(side=tk.LEFT)
+        self.filter_var = tk.StringVar(); self.filter_var.trace_add('write', lambda *args: self._on_filter())
+        ttk.Entry(filter_frame, textvariable=self.filter_var).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0))
+        self.tree = ttk.Treeview(self, columns=COLUMNS, show='headings', selectmode='browse')
+        for column in COLUMNS:
+            self.tree.heading(column, text=HEADINGS[column], command=lambda c=column: self._on_heading(c))
+            width, anchor = COLUMN_LAYOUT[column]; self.tree.column(column, width=width, anchor=anchor)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y); self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.tree.bind('<Configure>', lambda e: self._fit_rows())
+        self.tree.bind('<<TreeviewSelect>>', self._on_select)
+        self.tree.bind('<MouseWheel>', lambda e: self.scroll_by(-3 if e.delta > 0 else 3))
+        self.tree.bind('<Button-4>', lambda e: self.scroll_by(-3)); self.tree.bind('<Button-5>', lambda e: self.scroll_by(3))
+        self._row_height = tkFont.nametofont('TkDefaultFont').metrics('linespace') + 4
+
+    def set_markers(self, markers):
+        self.view.set_markers(markers)
+        if self.selected_marker is not None and self.selected_marker >= len(markers): self.selected_marker = None
+        self._render()
+    def marker_inserted(self, index):
+        self.view.inserted(index)
+        if self.selected_marker is not None and self.selected_marker >= index: self.selected_marker += 1
+        self._render()
+    def marker_removed(self, index):
+        self.view.removed(index)
+        if self.selected_marker == index: self.selected_marker = None
+        elif self.selected_marker is not None and self.selected_marker > index: self.selected_marker -= 1
+        self._render()
+    def marker_replaced(self, index): self.view.replaced(index); self._render()
+
+    def scroll_by(self, rows): self._top += rows; self._render()
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto': self._top = int(float(amount) * len(self.view))
+        elif action == 'scroll': self._top += int(amount) * (self._visible if unit == 'pages' else 1)
+        self._render()
+    def _on_heading(self, column):
+        view = self.view
+        if view.sort_column != column: view.set_sort(column)
+        elif not view.sort_reverse: view.set_sort(column, reverse=True)
+        else: view.set_sort(None)
+        for c in COLUMNS: self.tree.heading(c, text=HEADINGS[c] + ((" ▼" if view.sort_reverse else " ▲") if c == view.sort_column else ""))
+        self._top = 0; self._render()
+    def _on_filter(self): self.view.set_filter(self.filter_var.get()); self._top = 0; self._render()
+    def _on_select(self, event):
+        # <<TreeviewSelect>> is queued, so it also arrives for the selection _render sets; only a user click changes the marker
+        selection = self.tree.selection()
+        if selection == self._shown_selection: return
+        self.selected_marker = self.view.rows(self._top + self._items.index(selection[0]), 1)[0] if selection else None
+    def _fit_rows(self):
+        bbox = self.tree.bbox(self._items[0]) if self._items else ''
+        header, row_height = (bbox[1], bbox[3]) if bbox else (self._row_height, self._row_height)
+        visible = max(1, (self.tree.winfo_height() - header) // max(1, row_height))
+        if visible != self._visible: self._visible = visible; self._render()
+
+    def _render(self):
+        total = len(self.view)
+        self._top = max(0, min(self._top, total - self._visible))
+        indices = self.view.rows(self._top, self._visible)
+        # Treeview items are recycled: only add or drop the difference in row count, then refill their values
+        while len(self._items) < len(indices): self._items.append(self.tree.insert('', tk.END))
+        if len(self._items) > len(indices): self.tree.delete(*self._items[len(indices):]); del self._items[len(indices):]
+        selected_item = ()
+        for item, i in zip(self._items, indices):
+            self.tree.item(item, values=self.view.row_values(i))
+            if i == self.selected_marker: selected_item = (item,)
+        self._shown_selection = selected_item; self.tree.selection_set(selected_item)
+        if total: self.scrollbar.set(self._top / total, (self._top + len(indices)) / total)
+        else: self.scrollbar.set(0, 1)
+
+if __name__ == '__main__':
+    # Benchmark at 50k markers: the row-order model on its own, then the widget against a full Treeview rebuild if a display is available
+    import random
+    import time
+    random.seed(0)
+    colors = {(0, 0, 255): 'Red', (0, 255, 0): 'Green', (255, 0, 0): 'Blue', (0, 255, 255): 'Yellow'}
+    count = 50000
+    def random_marker(n): return {"pos": (random.randrange(4656), random.randrange(3496)), "shape": random.choice(['Cross', 'Circle', 'Square']),
+                                  "color": random.choice(list(colors)), "size": random.choice([9, 15, 25]), "desc": random.choice(["", "", f"R{n}", f"C{n}", f"U{n} pin"])}
+    markers = [random_marker(n) for n in range(count)]
+    def timed(label, fn, repeat=1):
+        start = time.perf_counter()
+        for _ in range(repeat): fn()
+        print(f"{label:<44} {(time.perf_counter()-start)/repeat*1000:8.3f} ms")
+    view = MarkerTableView(colors)
+    timed("view: set_markers (no sort/filter)", lambda: view.set_markers(markers))
+    timed("view: rows(25000, 30) unsorted", lambda: [view.row_values(i) for i in view.rows(25000, 30)], 100)
+    timed("view: sort by description", lambda: view.set_sort('desc'))
+    timed("view: filter 'r1' on sorted", lambda: view.set_filter('r1'))
+    timed("view: rows(100, 30) sorted+filtered", lambda: [view.row_values(i) for i in view.rows(100, 30)], 100)
+    def edit_round():
+        markers.append(random_marker(len(markers))); view.inserted(len(markers)-1)
+        i = random.randrange(len(markers)); markers[i] = dict(markers[i], desc="r1 edited"); view.replaced(i)
+        markers.pop(0); view.removed(0)
+    timed("view: append+replace+remove, sorted+filtered", edit_round, 20)
+    view.set_sort(None); view.set_filter('')
+    timed("view: append+replace+remove, unsorted", edit_round, 20)
+    try: root = tk.Tk()
+    except tk.TclError: print("No display: skipping the Treeview comparison.")
+    else:
+        root.geometry("800x450")
+        tree = ttk.Treeview(root, columns=COLUMNS, show='headings'); tree.pack()
+        def full_rebuild():
+            tree.delete(*tree.get_children())
+            for i, marker in enumerate(markers): pos = marker['pos']; tree.insert('', tk.END, values=(i+1, pos[0], pos[1], marker['shape'], colors.get(marker['color'], "Custom"), f"{marker['size']}px", marker['desc']))
+        timed("Treeview: full rebuild (old refresh)", full_rebuild); tree.destroy()
+        table = VirtualMarkerTable(root, colors); table.pack(fill=tk.BOTH, expand=True); root.update()
+        timed("virtual table: set_markers", lambda: table.set_markers(markers))
+        timed("virtual table: scroll by a page", lambda: table._on_scrollbar('scroll', 1, 'pages'), 100)
+        def table_edit(): markers.append(random_marker(len(markers))); table.marker_inserted(len(markers)-1); markers.pop(0); table.marker_removed(0)
+        timed("virtual table: append+remove", table_edit, 100)
+        root.destroy()
@@ -0,0 +1,52 @@
+# message_channel.py
+import sys
+import time
+
+class StampedSender:
+    """Stands in for a queue on the sending side and stamps each (command, value) with its send time, so the receiver can measure latency."""
+    def __init__(self, target_queue): self.target_queue = target_queue
+    def put(self, item): self.target_queue.put((item[0], item[1], time.time()))
+
+def unpack_message(item):
+    """(command, value, sent_at) for stamped and plain 2-tuple messages alike; sent_at is None if unstamped."""
+    return item[0], item[1], item[2] if len(item) > 2 else None
+
+def wake_fileno(message_queue):
+    """File descriptor that turns readable when a multiprocessing.Queue has data, or None if it cannot be watched.
+
+    This is the read end of the queue's own pipe (the same one concurrent.futures waits on), so it only
+    signals once the feeder thread has actually written the message. Tk can only watch it on Unix.
+    """
+    reader = getattr(message_queue, '_reader', None)
+    if reader is None or sys.platform == "win32": return None
+    return reader.fileno()
+
+def _send_test_messages(update_queue, count):
+    import random
+    sender = StampedSender(update_queue)
+    for i in range(count): time.sleep(random.uniform(0.01, 0.12)); sender.put(('tick', i))
+    sender.put(('done', None))
+
+if __name__ == '__main__':
+    # Delivery latency: waiting on wake_fileno() against the GUI's old 100 ms polling, with messages sent at random times
+    import multiprocessing
+    import queue
+    import select
+    def receive(update_queue, wait):
+        latencies = []
+        while True:
+            wait()
+            try:
+                while True:
+                    command, value, sent_at = unpack_message(update_queue.get_nowait())
+                    if command == 'done': return sorted(latencies)
+                    latencies.append((time.time() - sent_at) * 1000)
+            except queue.Empty: pass
+    for mode in ('poll 100 ms', 'wake fd'):
+        update_queue = multiprocessing.Queue()
+        fd = wake_fileno(update_queue)
+        if mode == 'wake fd' and fd is None: print("wake fd: not available on this platform"); continue
+        wait = (lambda: time.sleep(0.1)) if mode == 'poll 100 ms' else (lambda: select.select([fd], [], []))
+        proc = multiprocessing.Process(target=_send_test_messages, args=(update_queue, 60)); proc.start()
+        latencies = receive(update_queue, wait); proc.join()
+        print(f"{mode:>12}: p50 {latencies[len(latencies)//2]:.2f} ms, p95 {latencies[int(len(latencies)*0.95)]:.2f} ms, max {latencies[-1]:.2f} ms")
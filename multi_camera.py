@@ -0,0 +1,142 @@
+# multi_camera.py
+import collections
+import queue
+import time
+
+import cv2
+
+from camera_process import CameraHandler
+from message_channel import unpack_message
+from perf_stats import NULL_STATS, PerfStats
+
+class MultiCameraHandler:
+    """Runs several cameras at once (e.g. a fixture's top and side cameras), one CameraHandler per camera.
+
+    Each camera has its own capture thread, window, markers and undo history; the GUI talks to the active
+    one, which is the last window clicked or the camera picked in the Camera menu. Rendering is shared out
+    by deficit round-robin: each round every camera earns an equal slice of the CPU budget (cpu_budget of
+    the render_fps period) and renders a new frame only once its credit covers what a render has been
+    costing it, so a 4K camera renders less often rather than starving a 720p one. A camera with no new
+    frame gets no credit for the round. Per-camera FPS is kept in fps_stats and shown in the Performance window.
+    """
+    # Commands that apply to every camera; the rest go to the active one
+    BROADCAST_COMMANDS = ('set_camera_names', 'set_marker_shape', 'set_marker_color', 'set_marker_size', 'share_frames')
+
+    def __init__(self, command_queue, update_queue, camera_indices, render_fps=30, cpu_budget=0.8, camera_names=None, frame_source=None, display=None, reduced_decode=False, decode_workers=0, keep_warm=False):
+        self.command_queue, self.update_queue, self.display = command_queue, update_queue, display or cv2
+        self.render_fps, self.cpu_budget = render_fps, cpu_budget
+        self.handlers = []
+        for index in camera_indices:
+            # Each handler reads its own queue, fed by _route_commands
+            handler = CameraHandler(queue.Queue(), update_queue, True, render_fps, camera_names, frame_source, self.display, reduced_decode, decode_workers, keep_warm, window_name=f"PCB Cam {index}")
+            handler.device_index, handler.deficit_ms, handler.render_cost_ms = index, 0.0, 0.0
+            self.handlers.append(handler)
+        self.active, self.perf, self.perf_reported_at = None, NULL_STATS, 0.0
+        self.fps_stats, self.max_display_size = PerfStats(), None
+        self.rendered, self.started_at = collections.Counter(), None
+
+    def _fps_counter(self, handler): return f"cam {handler.device_index}"
+    def _handler_for(self, index): return next((handler for handler in self.handlers if handler.device_index == index), None)
+    def _activate(self, handler):
+        """Points the GUI at handler: its camera becomes current in the menus and its markers fill the table."""
+        if handler is self.active: return
+        self.active = handler; handler._send_status(); handler._sync_gui_markers()
+    def _watch_mouse(self, handler):
+        def mouse_events(event, x, y, flags, param):
+            if event in (cv2.EVENT_LBUTTONDOWN, cv2.EVENT_MBUTTONDOWN, cv2.EVENT_RBUTTONDOWN): self._activate(handler)
+            handler.mouse_events(event, x, y, flags, param)
+        self.display.setMouseCallback(handler.WINDOW_NAME, mouse_events)
+    def _place_windows(self):
+        """Gives each camera an equal share of the screen width, side by side."""
+        if not self.max_display_size: return
+        share_w, share_h = self.max_display_size[0] // len(self.handlers), self.max_display_size[1]
+        for position, handler in enumerate(self.handlers):
+            handler.max_display_size = (share_w, share_h)
+            if not handler.window_open: continue
+            handler._resize_main_window()
+            try: self.display.moveWindow(handler.WINDOW_NAME, position * share_w, 0)
+            except cv2.error: pass
+
+    def start(self):
+        """Opens every camera; False if none could be opened. A camera that fails to open is left out."""
+        for handler in list(self.handlers):
+            # One name table for all cameras, so a camera's name is only enumerated by the first handler to miss it
+            if self.handlers[0] is not handler: handler.camera_names = self.handlers[0].camera_names
+            if handler._initialize_camera(): self._watch_mouse(handler)
+            else: print(f"CAM: Leaving camera {handler.device_index} out."); handler.close(); self.handlers.remove(handler)
+        if not self.handlers: return False
+        self._place_windows(); self._activate(self.handlers[0]); self.started_at = time.perf_counter()
+        return True
+    def _set_perf(self, enabled):
+        self.perf = PerfStats() if enabled else NULL_STATS
+        for handler in self.handlers:
+            handler.perf = self.perf
+            if handler.grabber is not None: handler.grabber.set_stats(self.perf)
+    def _route_commands(self):
+        """Hands each waiting GUI command to the camera it is for; False on exit."""
+        while True:
+            try: item = self.command_queue.get_nowait()
+            except queue.Empty: return True
+            command, value, _ = unpack_message(item)
+            if command == 'exit': return False
+            elif command == 'set_perf_stats': self._set_perf(value)
+            elif command == 'set_display_size': self.max_display_size = tuple(value); self._place_windows()
+            elif command in self.BROADCAST_COMMANDS:
+                for handler in self.handlers: handler.command_queue.put(item)
+            elif command == 'request_marker_sync':
+                handler = next((handler for handler in self.handlers if value in handler.camera_states), None)
+                if handler is not None: handler.command_queue.put(item)
+            elif command == 'switch_camera' and self._handler_for(value) is not None: self._activate(self._handler_for(value))
+            # Switching the active window to a camera another window shows would open one device twice
+            else: self.active.command_queue.put(item)
+    def _drop(self, handler):
+        print(f"CAM: Closing camera {handler.device_index}.")
+        handler.close(); self.handlers.remove(handler)
+        if handler is self.active and self.handlers: self.active = None; self._activate(self.handlers[0])
+    def _schedule(self, quantum_ms):
+        """One deficit round-robin round over the cameras."""
+        for handler in list(self.handlers):
+            handler.deficit_ms += quantum_ms
+            if handler.deficit_ms < handler.render_cost_ms and handler.reconnect is None: continue
+            rendered, started = handler.frame_stats['rendered'], time.perf_counter()
+            if not handler.advance(): self._drop(handler); continue
+            if handler.frame_stats['rendered'] == rendered: handler.deficit_ms = 0.0; continue
+            cost = (time.perf_counter() - started) * 1000
+            handler.render_cost_ms = cost if handler.render_cost_ms == 0 else 0.8*handler.render_cost_ms + 0.2*cost
+            handler.deficit_ms -= cost
+            self.rendered[handler.device_index] += 1; self.fps_stats.tick(self._fps_counter(handler)); self.perf.tick(self._fps_counter(handler))
+    def step(self):
+        """One scheduling round: commands, renders, keys. Returns False when the session should end."""
+        loop_start, period_ms = time.perf_counter(), 1000/self.render_fps
+        if not self._route_commands(): return False
+        for handler in self.handlers:
+            if not handler.handle_commands(): return False
+        self._schedule(period_ms * self.cpu_budget / max(1, len(self.handlers)))
+        delay = max(1, int(period_ms - (time.perf_counter()-loop_start)*1000))
+        key = self.display.waitKey(delay) & 0xFF
+        self.perf.add('loop', (time.perf_counter()-loop_start)*1000)
+        if self.perf.enabled and time.time() - self.perf_reported_at >= self.active.PERF_REPORT_INTERVAL:
+            self.perf_reported_at = time.time(); self.perf.gauge('undo_history_kib', sum(handler._history_bytes() for handler in self.handlers)/1024)
+            self.update_queue.put(('perf_stats', self.perf.summary()))
+        if key == 26: self.active._undo_action() # CTRL+Z
+        elif key == 25: self.active._redo_action() # CTRL+Y
+        elif key == ord('q'): return False
+        for handler in [h for h in self.handlers if self.display.getWindowProperty(h.WINDOW_NAME, cv2.WND_PROP_VISIBLE) < 1]: self._drop(handler)
+        return bool(self.handlers)
+    def camera_fps(self):
+        """{device index: frames rendered per second} over the last couple of seconds."""
+        fps = self.fps_stats.summary()['fps']
+        return {handler.device_index: fps.get(self._fps_counter(handler), 0.0) for handler in self.handlers}
+    def close(self):
+        for handler in list(self.handlers): handler.close()
+    def run(self):
+        if not self.start(): self.update_queue.put(('exit_gui', None)); return
+        while self.step(): pass
+        self.update_queue.put(('exit_gui', None)); self.close()
+        elapsed = time.perf_counter() - self.started_at
+        for index, count in sorted(self.rendered.items()): print(f"CAM: Camera {index}: {count} frames rendered, {count/elapsed:.1f} fps average.")
+        print("CAM: Camera process finished.")
+
+def run_multi_camera_process(command_queue, update_queue, camera_indices, camera_names=None, frame_source=None, reduced_decode=False, decode_workers=0, keep_warm=False):
+    MultiCameraHandler(command_queue, update_queue, camera_indices, camera_names=camera_names, frame_source=frame_source,
+                       reduced_decode=reduced_decode, decode_workers=decode_workers, keep_warm=keep_warm).run()
@@ -0,0 +1,95 @@
+# perf_stats.py
+import collections
+import csv
+import json
+import time
+
+class _StageTimer:
+    __slots__ = ('stats', 'stage', 'start')
+    def __init__(self, stats, stage): self.stats, self.stage = stats, stage
+    def __enter__(self): self.start = time.perf_counter(); return self
+    def __exit__(self, *exc): self.stats.add(self.stage, (time.perf_counter() - self.start) * 1000)
+
+class PerfStats:
+    """Rolling per-stage timings of the frame pipeline, in milliseconds.
+
+    Each stage keeps its last `window` samples; summary() turns them into count/mean/p50/p95/p99/max.
+    tick(counter) records an event time, and summary() reports the rate of each counter over the
+    last `rate_window` seconds as frames per second. gauge(name, value) keeps the latest value of a
+    reading such as worker utilization. Samples may be added from several threads.
+    """
+    enabled = True
+    def __init__(self, window=300, rate_window=2.0):
+        self.window, self.rate_window = window, rate_window
+        self._samples, self._events, self._gauges = {}, {}, {}
+
+    def time(self, stage): return _StageTimer(self, stage)
+    def add(self, stage, ms):
+        samples = self._samples.get(stage)
+        if samples is None: samples = self._samples.setdefault(stage, collections.deque(maxlen=self.window))
+        samples.append(ms)
+    def tick(self, counter):
+        events = self._events.get(counter)
+        if events is None: events = self._events.setdefault(counter, collections.deque(maxlen=1000))
+        events.append(time.perf_counter())
+    def gauge(self, name, value): self._gauges[name] = value
+
+    @staticmethod
+    def _percentile(ordered, fraction): return ordered[min(len(ordered)-1, int(fraction * len(ordered)))]
+    def summary(self):
+        """{'stages': {stage: {count, mean, p50, p95, p99, max}}, 'fps': {counter: rate}, 'gauges': {name: value}}, all plain floats for pickling."""
+        stages = {}
+        for stage, samples in list(self._samples.items()):
+            ordered = sorted(samples)
+            if not ordered: continue
+            stages[stage] = {'count': len(ordered), 'mean': sum(ordered)/len(ordered), 'p50': self._percentile(ordered, 0.50),
+                             'p95': self._percentile(ordered, 0.95), 'p99': self._percentile(ordered, 0.99), 'max': ordered[-1]}
+        now, fps = time.perf_counter(), {}
+        for counter, events in list(self._events.items()):
+            recent = [t for t in list(events) if now - t <= self.rate_window]
+            fps[counter] = (len(recent) - 1) / (recent[-1] - recent[0]) if len(recent) > 1 and recent[-1] > recent[0] else 0.0
+        return {'stages': stages, 'fps': fps, 'gauges': dict(self._gauges)}
+
+class _NullTimer:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, *exc): pass
+
+class NullPerfStats:
+    """Stand-in used while instrumentation is off: the same calls, doing nothing."""
+    enabled = False
+    _timer = _NullTimer()
+    def time(self, stage): return self._timer
+    def add(self, stage, ms): pass
+    def tick(self, counter): pass
+    def gauge(self, name, value): pass
+    def summary(self): return {'stages': {}, 'fps': {}, 'gauges': {}}
+
+NULL_STATS = NullPerfStats()
+
+SUMMARY_FIELDS = ('count', 'mean', 'p50', 'p95', 'p99', 'max')
+
+def export_json(path, summary, station=None):
+    with open(path, 'w') as f: json.dump({'station': station or {}, 'exported_at': time.strftime('%Y-%m-%dT%H:%M:%S'), **summary}, f, indent=4)
+
+def export_csv(path, summary, station=None):
+    """One row per stage, then one per FPS counter and one per gauge, each tagged with the station details so files from several stations can be concatenated."""
+    station = station or {}
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(list(station) + ['kind', 'name'] + list(SUMMARY_FIELDS))
+        for stage, values in summary['stages'].items(): writer.writerow(list(station.values()) + ['stage', stage] + [round(values[k], 4) for k in SUMMARY_FIELDS])
+        for counter, rate in summary['fps'].items(): writer.writerow(list(station.values()) + ['fps', counter, round(rate, 3)] + [''] * (len(SUMMARY_FIELDS) - 1))
+        for name, value in summary.get('gauges', {}).items(): writer.writerow(list(station.values()) + ['gauge', name, round(value, 4)] + [''] * (len(SUMMARY_FIELDS) - 1))
+
+if __name__ == '__main__':
+    # Overhead of one timed stage, enabled against the null object
+    n = 200000
+    for stats in (PerfStats(), NULL_STATS):
+        start = time.perf_counter()
+        for _ in range(n):
+            with stats.time('stage'): pass
+        print(f"{type(stats).__name__:>13}: {(time.perf_counter()-start)/n*1e6:.2f} us per timed stage")
+    stats = PerfStats()
+    for i in range(300): stats.add('render', float(i))
+    start = time.perf_counter(); stats.summary(); print(f"summary of a full 300-sample window: {(time.perf_counter()-start)*1000:.2f} ms")
@@ -0,0 +1,198 @@
+# render.py
+import cv2
+import numpy as np
+
+from marker_store import MarkerStore, palette, shape_name
+from perf_stats import NULL_STATS
+
+def draw_single_marker(frame, marker_data, position):
+    shape, color, size = marker_data['shape'], marker_data['color'], marker_data['size']
+    draw_x, draw_y = position
+    half_size = size // 2
+    if shape == 'Cross':
+        cv2.line(frame, (draw_x - half_size, draw_y), (draw_x + half_size, draw_y), color, 1)
+        cv2.line(frame, (draw_x, draw_y - half_size), (draw_x, draw_y + half_size), color, 1)
+    elif shape == 'Circle': cv2.circle(frame, (draw_x, draw_y), half_size, color, 1)
+    elif shape == 'Square': cv2.rectangle(frame, (draw_x - half_size, draw_y - half_size), (draw_x + half_size, draw_y + half_size), color, 1)
+
+def marker_placement(marker, frame_size, offset=(0, 0), scale=None):
+    """Centre and size of a marker drawn on a rotated view starting at offset, or on that view downscaled by scale=(sx, sy).
+
+    Scaled positions use pixel centres, as cv2.resize does, so a marker lands on the output pixel its position was resized into.
+    """
+    draw_x, draw_y = frame_size[0] - 1 - marker['pos'][0] - offset[0], frame_size[1] - 1 - marker['pos'][1] - offset[1]
+    if scale is None: return (draw_x, draw_y), marker['size']
+    return (int(round((draw_x+0.5)*scale[0] - 0.5)), int(round((draw_y+0.5)*scale[1] - 0.5))), max(1, int(round(marker['size']*min(scale))))
+
+def draw_markers(frame, markers, frame_size, offset=(0, 0), scale=None):
+    """Draws markers (stored in original-frame coordinates) onto a rotated frame, or a rotated ROI starting at offset."""
+    for marker in markers:
+        position, size = marker_placement(marker, frame_size, offset, scale)
+        draw_single_marker(frame, marker if size == marker['size'] else {**marker, 'size': size}, position)
+
+_marker_templates = {}
+def _marker_template(shape, size):
+    """Pixel offsets (ys, xs) that draw_single_marker touches for a marker centred on (0, 0)."""
+    key = (shape, size)
+    if key not in _marker_templates:
+        pad = size//2 + 2
+        canvas = np.zeros((2*pad+1, 2*pad+1), np.uint8)
+        draw_single_marker(canvas, {'shape': shape, 'color': 255, 'size': size}, (pad, pad))
+        ys, xs = np.nonzero(canvas)
+        _marker_templates[key] = (ys - pad, xs - pad)
+    return _marker_templates[key]
+
+class MarkerOverlay:
+    """Cached marker layer: every marker pixel and its colour, in rotated-frame coordinates.
+
+    The layer is built from per-shape pixel templates the first time it is needed after invalidate(),
+    vectorized over a MarkerStore (a plain list of marker dicts is converted to one first),
+    and composite() copies the pixels that fall inside an ROI with one vectorized assignment.
+    Overlapping markers resolve in list order, the same as drawing them one after another.
+    For a downscaled view the layer is built in output pixels instead, and rebuilt when the view moves.
+    """
+    def __init__(self): self.invalidate()
+    def invalidate(self): self._ys, self._layer_key, self._view_key = None, None, None
+    def _build(self, markers, frame_size, offset=(0, 0), scale=None, layer_size=None):
+        layer_width, layer_height = layer_size or frame_size
+        store = markers if isinstance(markers, MarkerStore) else MarkerStore(markers)
+        draw_xs, draw_ys, sizes = store.placements(frame_size, offset, scale)
+        # Markers of one shape and size share a template, so each group is placed with one broadcast
+        groups = store.field('shape').astype(np.int64) << 32 | sizes
+        ys_parts, xs_parts, owner_parts = [], [], []
+        for group in np.unique(groups):
+            template_ys, template_xs = _marker_template(shape_name(int(group >> 32)), int(group & 0xFFFFFFFF))
+            if not len(template_ys): continue
+            members = np.flatnonzero(groups == group)
+            ys_parts.append((draw_ys[members, None] + template_ys).ravel()); xs_parts.append((draw_xs[members, None] + template_xs).ravel())
+            owner_parts.append(np.repeat(members, len(template_ys)))
+        if ys_parts:
+            ys, xs, owners = np.concatenate(ys_parts), np.concatenate(xs_parts), np.concatenate(owner_parts)
+            inside = (ys >= 0) & (ys < layer_height) & (xs >= 0) & (xs < layer_width)
+            ys, xs, owners = ys[inside], xs[inside], owners[inside]
+            # Sort into row-major order; a pixel shared by several markers keeps the colour of the last one in the list
+            pixels = ys*layer_width + xs; order = np.lexsort((owners, pixels)); pixels = pixels[order]
+            keep = order[np.diff(pixels, append=-1) != 0]
+            ys, xs, colors = ys[keep], xs[keep], palette()[store.field('color')[owners[keep]]]
+        else: ys, xs, colors = np.empty(0, np.int64), np.empty(0, np.int64), np.empty((0, 3), np.uint8)
+        self._ys, self._xs, self._colors, self._view_key = ys, xs, colors, None
+    def _view_pixels(self, roi_shape, offset):
+        roi_height, roi_width = roi_shape[:2]
+        # Points are stored in row-major order, so the rows covered by the ROI are one contiguous slice
+        lo, hi = np.searchsorted(self._ys, (offset[1], offset[1] + roi_height))
+        roi_ys, roi_xs = self._ys[lo:hi] - offset[1], self._xs[lo:hi] - offset[0]
+        visible = np.flatnonzero((roi_xs >= 0) & (roi_xs < roi_width))
+        pixel_index = (roi_ys[visible]*roi_width + roi_xs[visible])*3
+        byte_index = np.empty(3*len(pixel_index), np.int64)
+        byte_index[0::3], byte_index[1::3], byte_index[2::3] = pixel_index, pixel_index+1, pixel_index+2
+        return byte_index, self._colors[lo:hi].take(visible, axis=0).ravel()
+    def composite(self, roi, markers, frame_size, offset=(0, 0), scale=None):
+        """Draws the markers onto roi, the rotated view starting at offset; with scale, roi is that view downscaled by (sx, sy)."""
+        if scale is None: layer_key = tuple(frame_size)
+        else: layer_key = (tuple(frame_size), int(offset[0]), int(offset[1]), scale, roi.shape)
+        if self._ys is None or self._layer_key != layer_key:
+            if scale is None: self._build(markers, frame_size)
+            else: self._build(markers, frame_size, offset, scale, (roi.shape[1], roi.shape[0]))
+            self._layer_key = layer_key
+        if scale is not None: offset = (0, 0)
+        # The flat pixel indices only change when the view moves, so reuse them while it stays put
+        view_key = (roi.shape, int(offset[0]), int(offset[1]))
+        if self._view_key != view_key: self._view, self._view_key = self._view_pixels(roi.shape, offset), view_key
+        byte_index, color_bytes = self._view
+        if roi.flags['C_CONTIGUOUS']: roi.reshape(-1)[byte_index] = color_bytes
+        else:
+            pixel_index = byte_index[0::3] // 3
+            roi[pixel_index // roi.shape[1], pixel_index % roi.shape[1]] = color_bytes.reshape(-1, 3)
+
+def view_size(frame_size, zoom_level):
+    return int(frame_size[0]/zoom_level), int(frame_size[1]/zoom_level)
+
+def downscale(image, out_size):
+    """Resizes image to out_size: 2x box-filter (INTER_AREA) steps while it is at least twice as large, then one INTER_LINEAR step.
+
+    Halving is OpenCV's fast INTER_AREA case and averages every source pixel; the last step is less than 2x,
+    where bilinear loses nothing, whereas INTER_AREA at a fractional ratio costs several times more.
+    """
+    out_w, out_h = out_size
+    while image.shape[1] >= 2*out_w and image.shape[0] >= 2*out_h:
+        image = cv2.resize(image, (image.shape[1]//2, image.shape[0]//2), interpolation=cv2.INTER_AREA)
+    if (image.shape[1], image.shape[0]) == (out_w, out_h): return image
+    return cv2.resize(image, (out_w, out_h), interpolation=cv2.INTER_LINEAR)
+
+def render_view(frame, markers, zoom_level, pan, out_size, overlay=None, stats=NULL_STATS, frame_size=None):
+    """Renders the pan/zoom view straight from the raw, unrotated frame.
+
+    The visible window on the rotated image maps back to a rectangle of the raw frame, so only that ROI
+    is extracted and flipped, markers are drawn on it, and it is resized once to the output size.
+    When the output is smaller than the ROI (the window is smaller than the sensor), the ROI is downscaled
+    first and the markers are drawn at output resolution, so no stage touches more pixels than it must.
+    If a MarkerOverlay is given, the markers are composited from it instead of drawn one by one.
+    frame_size is the full sensor size that pan and the markers refer to, for a frame decoded at reduced
+    scale; the ROI is then taken from the reduced frame and resized to the output the same way.
+    stats times the 'rotate', 'markers' and 'resize' stages.
+    """
+    frame_width, frame_height = frame_size or (frame.shape[1], frame.shape[0])
+    pan_x, pan_y = int(pan[0]), int(pan[1])
+    view_w, view_h = view_size((frame_width, frame_height), zoom_level)
+    raw_x0, raw_y0 = frame_width - pan_x - view_w, frame_height - pan_y - view_h
+    out_w, out_h = out_size
+    reduced = (frame.shape[1], frame.shape[0]) != (frame_width, frame_height)
+    if reduced or (out_w < view_w and out_h < view_h):
+        if reduced:
+            # The reduced frame's scale follows from its shape (a JPEG decoded at 1/n rounds its size up)
+            fx, fy = frame.shape[1]/frame_width, frame.shape[0]/frame_height
+            x0, y0 = int(round(raw_x0*fx)), int(round(raw_y0*fy))
+            roi = frame[y0:max(y0+1, int(round((raw_y0+view_h)*fy))), x0:max(x0+1, int(round((raw_x0+view_w)*fx)))]
+        else: roi = frame[raw_y0:raw_y0+view_h, raw_x0:raw_x0+view_w]
+        with stats.time('resize'): small = downscale(roi, out_size)
+        with stats.time('rotate'): view = cv2.flip(small, -1)
+        scale = (out_w/view_w, out_h/view_h)
+        with stats.time('markers'):
+            if overlay is not None: overlay.composite(view, markers, (frame_width, frame_height), (pan_x, pan_y), scale)
+            else: draw_markers(view, markers, (frame_width, frame_height), (pan_x, pan_y), scale)
+        return view
+    with stats.time('rotate'): roi = cv2.flip(frame[raw_y0:raw_y0+view_h, raw_x0:raw_x0+view_w], -1)
+    with stats.time('markers'):
+        if overlay is not None: overlay.composite(roi, markers, (frame_width, frame_height), (pan_x, pan_y))
+        else: draw_markers(roi, markers, (frame_width, frame_height), (pan_x, pan_y))
+    if (roi.shape[1], roi.shape[0]) == tuple(out_size): return roi
+    with stats.time('resize'): return cv2.resize(roi, tuple(out_size))
+
+def render_view_reference(frame, markers, zoom_level, pan, out_size):
+    """The original full-frame pipeline (copy, rotate, draw, slice, resize), kept to check render_view against (see test_render.py)."""
+    frame_height, frame_width = frame.shape[:2]
+    pan_x, pan_y = int(pan[0]), int(pan[1])
+    display_frame_main = cv2.rotate(frame.copy(), cv2.ROTATE_180)
+    draw_markers(display_frame_main, markers, (frame_width, frame_height))
+    view_w, view_h = view_size((frame_width, frame_height), zoom_level)
+    zoomed_display_frame = display_frame_main[pan_y:pan_y+view_h, pan_x:pan_x+view_w]
+    return cv2.resize(zoomed_display_frame, tuple(out_size))
+
+def draw_banner(image, text):
+    """Writes text in white on a dark strip across the top of image, for status such as a lost camera."""
+    scale = max(0.5, image.shape[1] / 1600)
+    (text_w, text_h), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, 2)
+    strip_h = text_h + baseline + int(16*scale)
+    image[:strip_h] //= 3
+    cv2.putText(image, text, (int(10*scale), strip_h - baseline - int(8*scale)), cv2.FONT_HERSHEY_SIMPLEX, scale, (255, 255, 255), 2, cv2.LINE_AA)
+
+def crop_zoom_patch(frame, pos, crop_size=150):
+    """Returns the crop_size x crop_size patch of the rotated view centred on pos (original-frame coordinates).
+
+    The patch is cut from the raw frame with mapped coordinates and flipped, so the cost scales with the
+    patch size rather than the sensor size. Parts that fall outside the frame are padded with black.
+    """
+    frame_height, frame_width = frame.shape[:2]
+    half_crop = crop_size // 2
+    draw_x, draw_y = frame_width-1-pos[0], frame_height-1-pos[1]
+    x1, y1 = draw_x-half_crop, draw_y-half_crop
+    x2, y2 = x1+crop_size, y1+crop_size
+    x1c, y1c = max(0, x1), max(0, y1)
+    x2c, y2c = min(frame_width, x2), min(frame_height, y2)
+    if x2c <= x1c or y2c <= y1c: return np.zeros((crop_size, crop_size) + frame.shape[2:], dtype=frame.dtype)
+    cropped_frame = cv2.flip(frame[frame_height-y2c:frame_height-y1c, frame_width-x2c:frame_width-x1c], -1)
+    h, w = cropped_frame.shape[:2]
+    if h < crop_size or w < crop_size:
+        top=max(0, -y1); bottom=max(0, y2-frame_height); left=max(0, -x1); right=max(0, x2-frame_width)
+        cropped_frame = cv2.copyMakeBorder(cropped_frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=[0,0,0])
+    return cropped_frame
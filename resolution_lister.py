@@ -1,14 +1,23 @@
 # resolution_lister.py
+import os
 import sys
 import subprocess
 import json
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import v4l2_native
+
+PROBE_TIMEOUT = 10.0
+MAX_PROBE_WORKERS = 4
 
 def get_camera_devices_windows():
     devices = []
     try:
         command = "Get-PnpDevice -Class 'Camera','Image' -Status 'OK' | Select-Object FriendlyName | ConvertTo-Json"
-        result = subprocess.run(["powershell", "-Command", command], capture_output=True, text=True, check=True, encoding='utf-8')
+        result = subprocess.run(["powershell", "-Command", command], capture_output=True, text=True, check=True, encoding='utf-8', timeout=PROBE_TIMEOUT)
         output = result.stdout.strip()
         if not output: return []
         data = json.loads(output)
@@ -19,16 +28,65 @@ def get_camera_devices_windows():
     return devices
 
 def get_camera_devices_linux():
+    # Read the capture nodes from sysfs/V4L2 directly; v4l2-ctl is only the fallback
+    if v4l2_native.is_available():
+        try: return v4l2_native.list_capture_devices()
+        except Exception as e: print(f"Lister: native V4L2 enumeration failed, falling back to v4l2-ctl. Error: {e}", file=sys.stderr)
     devices = []
     try:
         cmd = "v4l2-ctl --list-devices"
-        result = subprocess.run(cmd.split(), capture_output=True, text=True, check=True)
+        result = subprocess.run(cmd.split(), capture_output=True, text=True, check=True, timeout=PROBE_TIMEOUT)
         output = result.stdout.strip()
         devices = re.findall(r'(/dev/video\d+)', output)
     except Exception as e:
         print(f"Lister: v4l2-ctl failed. Error: {e}", file=sys.stderr)
     return devices
 
+def get_camera_devices():
+    if sys.platform == "win32": return get_camera_devices_windows()
+    elif sys.platform.startswith("linux"): return get_camera_devices_linux()
+    return []
+
+def camera_index(position, device):
+    """The index cv2.VideoCapture opens: the N of /dev/videoN on Linux, the enumeration position elsewhere."""
+    match = re.fullmatch(r'/dev/video(\d+)', device) if sys.platform.startswith("linux") else None
+    return int(match.group(1)) if match else position
+
+def camera_display_name(device, sysfs_root=v4l2_native.SYSFS_ROOT):
+    if sys.platform.startswith("linux"): return _read_sysfs(os.path.join(sysfs_root, os.path.basename(device), "name")) or device
+    return device
+
+def _read_sysfs(path):
+    try:
+        with open(path, 'r') as f: return f.read().strip()
+    except OSError: return ""
+
+def get_device_identity_linux(device_path, sysfs_root=v4l2_native.SYSFS_ROOT):
+    """(identity, fingerprint) for a /dev/videoN node from sysfs.
+
+    The identity is the device name, USB port path, serial number and node index, which stay the same when
+    the node number changes. The fingerprint is vendor/product/firmware revision, which changes if a
+    different model or firmware ends up on the same port.
+    """
+    node_dir = os.path.join(sysfs_root, os.path.basename(device_path))
+    name = _read_sysfs(os.path.join(node_dir, "name")) or device_path
+    interface_dir = os.path.realpath(os.path.join(node_dir, "device"))
+    usb_device_dir = os.path.dirname(interface_dir)
+    serial = _read_sysfs(os.path.join(usb_device_dir, "serial"))
+    identity = "|".join([name, os.path.basename(usb_device_dir), serial, _read_sysfs(os.path.join(node_dir, "index"))])
+    fingerprint = ":".join(_read_sysfs(os.path.join(usb_device_dir, attr)) for attr in ("idVendor", "idProduct", "bcdDevice"))
+    return identity, fingerprint
+
+def get_device_identities(devices):
+    """(identity, fingerprint) per device. On Windows the DirectShow name is all there is, numbered when repeated."""
+    if sys.platform.startswith("linux"): return [get_device_identity_linux(device) for device in devices]
+    identities, seen = [], {}
+    for device in devices:
+        seen[device] = seen.get(device, 0) + 1
+        identity = device if seen[device] == 1 else f"{device}#{seen[device]}"
+        identities.append((identity, device))
+    return identities
+
 def parse_ffmpeg_resolutions_windows(output, min_fps):
     regex = re.compile(r"s=(\d+x\d+)\s+fps=([\d\.]+)")
     found_resolutions = set()
@@ -61,44 +119,62 @@ def parse_ffmpeg_resolutions_linux(output, min_fps):
                         found_resolutions.add((w, h))
     return sorted(list(found_resolutions), key=lambda res: res[0]*res[1])
 
-def discover_camera_capabilities(min_fps=30, format_vcodec='mjpeg'):
-    all_camera_caps = {}
-    
-    if sys.platform == "win32":
-        devices = get_camera_devices_windows()
-        for index, device_name in enumerate(devices):
-            try:
-                command = f'ffmpeg -list_options true -f dshow -i video="{device_name}"'
-                result = subprocess.run(command, capture_output=True, text=True, shell=True, encoding='utf-8')
-                output = result.stdout + result.stderr
-                
-                # --- ADDED: Debug printing ---
-                print("-" * 20, file=sys.stderr)
-                print(f"DEBUG: Raw FFmpeg output for '{device_name}':", file=sys.stderr)
-                print(output, file=sys.stderr)
-                print("-" * 20, file=sys.stderr)
-                
-                resolutions = parse_ffmpeg_resolutions_windows(output, min_fps)
-                all_camera_caps[index] = {"name": device_name, "resolutions": resolutions}
-            except Exception as e:
-                print(f"Error processing '{device_name}': {e}", file=sys.stderr)
-                all_camera_caps[index] = {"name": device_name, "resolutions": []}
-
-    elif sys.platform.startswith("linux"):
-        # (Linux logic is unchanged)
-        devices = get_camera_devices_linux()
-        for index, device_path in enumerate(devices):
-            try:
-                command = f"ffmpeg -list_formats all -f v4l2 -i {device_path}"
-                result = subprocess.run(command.split(), capture_output=True, text=True)
-                output = result.stdout + result.stderr
-                resolutions = parse_ffmpeg_resolutions_linux(output, min_fps)
-                all_camera_caps[index] = {"name": device_path, "resolutions": resolutions}
-            except Exception as e:
-                print(f"Error processing '{device_path}': {e}", file=sys.stderr)
-                all_camera_caps[index] = {"name": device_path, "resolutions": []}
-
-    return all_camera_caps
+def probe_camera_windows(device_name, min_fps, timeout=PROBE_TIMEOUT):
+    command = ["ffmpeg", "-list_options", "true", "-f", "dshow", "-i", f"video={device_name}"]
+    result = subprocess.run(command, capture_output=True, text=True, encoding='utf-8', timeout=timeout)
+    output = result.stdout + result.stderr
+    # --- ADDED: Debug printing (one write per device so parallel probes don't interleave) ---
+    print(f"{'-' * 20}\nDEBUG: Raw FFmpeg output for '{device_name}':\n{output}\n{'-' * 20}", file=sys.stderr)
+    return parse_ffmpeg_resolutions_windows(output, min_fps)
+
+def _call_with_timeout(function, timeout, *args):
+    """function(*args) on its own daemon thread; raises subprocess.TimeoutExpired, like the ffmpeg probes, if it has not
+    returned after timeout. An ioctl stuck in a driver cannot be interrupted, so the thread is abandoned, not joined."""
+    outcome = {}
+    def run():
+        try: outcome['result'] = function(*args)
+        except Exception as e: outcome['error'] = e
+    thread = threading.Thread(target=run, name="V4L2Probe", daemon=True); thread.start(); thread.join(timeout)
+    if thread.is_alive(): raise subprocess.TimeoutExpired(f"V4L2 probe of {args[0]}", timeout)
+    if 'error' in outcome: raise outcome['error']
+    return outcome['result']
+
+def probe_camera_linux(device_path, min_fps, timeout=PROBE_TIMEOUT):
+    # timeout covers the whole probe: the ffmpeg fallback only gets what the native probe left of it
+    deadline = time.monotonic() + timeout
+    if v4l2_native.is_available():
+        # A hung device times out here rather than falling back to ffmpeg, which would hang on it too
+        try: return _call_with_timeout(v4l2_native.probe_device, timeout, device_path, min_fps)
+        except OSError as e: print(f"Lister: native V4L2 probe of '{device_path}' failed, falling back to ffmpeg. Error: {e}", file=sys.stderr)
+    command = ["ffmpeg", "-list_formats", "all", "-f", "v4l2", "-i", device_path]
+    remaining = deadline - time.monotonic()
+    if remaining <= 0: raise subprocess.TimeoutExpired(command, timeout)
+    result = subprocess.run(command, capture_output=True, text=True, timeout=remaining)
+    output = result.stdout + result.stderr
+    return parse_ffmpeg_resolutions_linux(output, min_fps)
+
+def _probe_device(probe, device, min_fps, timeout):
+    try:
+        return {"name": camera_display_name(device), "resolutions": probe(device, min_fps, timeout)}
+    except subprocess.TimeoutExpired:
+        print(f"Error processing '{device}': no answer after {timeout:g}s", file=sys.stderr)
+        return {"name": camera_display_name(device), "resolutions": [], "error": "timeout"}
+    except Exception as e:
+        print(f"Error processing '{device}': {e}", file=sys.stderr)
+        return {"name": camera_display_name(device), "resolutions": [], "error": str(e)}
+
+def probe_devices(devices, min_fps=30, timeout=PROBE_TIMEOUT, max_workers=MAX_PROBE_WORKERS):
+    """Probes the given devices concurrently; a probe that fails or runs past timeout only affects its own entry."""
+    if sys.platform == "win32": probe = probe_camera_windows
+    elif sys.platform.startswith("linux"): probe = probe_camera_linux
+    else: return []
+    if not devices: return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(devices))) as pool:
+        return list(pool.map(lambda device: _probe_device(probe, device, min_fps, timeout), devices))
+
+def discover_camera_capabilities(min_fps=30, format_vcodec='mjpeg', timeout=PROBE_TIMEOUT, max_workers=MAX_PROBE_WORKERS):
+    devices = get_camera_devices()
+    return {camera_index(position, device): caps for position, (device, caps) in enumerate(zip(devices, probe_devices(devices, min_fps, timeout, max_workers)))}
 
 if __name__ == '__main__':
     print("Detecting camera resolutions with default settings (min 30fps, mjpeg format)...")
@@ -110,7 +186,9 @@ if __name__ == '__main__':
         print("\n--- Detection Results ---")
         for index, caps in detected_caps.items():
             print(f"\nCamera Index: {index} | Name: {caps['name']}")
-            if caps['resolutions']:
+            if caps.get('error'):
+                print(f"  Probe failed: {caps['error']}")
+            elif caps['resolutions']:
                 res_str = ", ".join([f"{w}x{h}" for w, h in caps['resolutions']])
                 print(f"  Supported Resolutions: {res_str}")
             else:
@@ -0,0 +1,251 @@
+# test_camera_process.py
+# CameraHandler's click mapping, command drain, marker deltas (replayed into the GUI's side of the protocol) and
+# camera reconnects, on a headless display with no real camera.
+import copy
+import functools
+import queue
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+import camera_process
+from camera_process import CameraHandler
+from capture import BackgroundReconnect
+from frame_sources import SyntheticPCBSource
+from gui_module import AppGUI
+from headless_display import HeadlessDisplay
+from render import marker_placement, render_view, view_size
+
+ZOOM_LEVELS = [1.0, 1.2, 2.0736, 5.0, 10.0]
+
+def make_handler(frame_size=(640, 480), display_size=None):
+    handler = CameraHandler(queue.Queue(), queue.Queue(), threaded_capture=False, display=HeadlessDisplay())
+    handler.frame_width, handler.frame_height = frame_size
+    handler.display_size = display_size or frame_size
+    return handler
+
+def click(handler, x, y):
+    """Left-clicks window pixel (x, y) and returns the raw frame pixel of the marker it placed."""
+    handler.mouse_events(cv2.EVENT_LBUTTONDOWN, x, y, 0, None)
+    return handler._get_current_cam_state()['markers'][-1]['pos']
+
+def window_pixel(handler, raw):
+    """The main-window pixel a raw frame pixel is shown on (through the 180 degree flip, pan and the view-to-window resize)."""
+    frame_size, (view_w, view_h) = (handler.frame_width, handler.frame_height), view_size((handler.frame_width, handler.frame_height), handler.zoom_level)
+    scale = (handler.display_size[0]/view_w, handler.display_size[1]/view_h)
+    return marker_placement({'pos': raw, 'size': 1}, frame_size, (handler.pan_x, handler.pan_y), scale)[0]
+
+def sample(size, count=24):
+    return sorted({0, size-1, *np.linspace(0, size-1, count).astype(int).tolist()})
+
+@pytest.mark.parametrize("frame_size", [(640, 480), (1001, 751)])
+@pytest.mark.parametrize("divisor", [1, 2, 2.5, 4])
+def test_clicks_map_back_to_the_exact_raw_pixel(frame_size, divisor):
+    # divisor 2 and 4 give INTER_AREA-halved views, 2.5 an odd fraction; zooming in far enough upscales the view instead
+    display_size = (int(frame_size[0]/divisor), int(frame_size[1]/divisor))
+    rng, handler = np.random.default_rng(0), make_handler(frame_size, display_size)
+    for zoom_level in ZOOM_LEVELS:
+        view_w, view_h = view_size(frame_size, zoom_level)
+        handler.zoom_level = zoom_level
+        for pan in [(0, 0), (frame_size[0]-view_w, frame_size[1]-view_h), (int(rng.integers(0, frame_size[0]-view_w+1)), int(rng.integers(0, frame_size[1]-view_h+1)))]:
+            handler.pan_x, handler.pan_y = pan; handler.camera_states.clear()
+            # The rotated view covers raw pixels frame-1-pan-view .. frame-1-pan
+            raw_x0, raw_y0 = frame_size[0]-pan[0]-view_w, frame_size[1]-pan[1]-view_h
+            if view_w <= display_size[0] and view_h <= display_size[1]:
+                # Every raw pixel in the view has a window pixel of its own, and clicking it gives that raw pixel back
+                for raw_y in sample(view_h):
+                    for raw_x in sample(view_w):
+                        raw = (raw_x0+raw_x, raw_y0+raw_y)
+                        assert click(handler, *window_pixel(handler, raw)) == raw, (zoom_level, pan, raw)
+            else:
+                # A downscaled window pixel stands for one raw pixel inside its footprint, which maps back to that window pixel exactly
+                for y in sample(display_size[1]):
+                    for x in sample(display_size[0]):
+                        raw = click(handler, x, y)
+                        assert raw_x0 <= raw[0] < raw_x0+view_w and raw_y0 <= raw[1] < raw_y0+view_h, (zoom_level, pan, (x, y))
+                        assert window_pixel(handler, raw) == (x, y), (zoom_level, pan, (x, y))
+                        assert click(handler, x, y) == raw
+            assert (handler.pan_x, handler.pan_y) == pan
+
+@pytest.mark.parametrize("frame_size", [(640, 480), (1001, 751)])
+@pytest.mark.parametrize("divisor", [1, 2, 2.5])
+def test_clicked_raw_pixel_is_shown_under_the_cursor(frame_size, divisor):
+    # A lone lit raw pixel shows up in the rendered view at the window pixel that clicks back to it (brightest there unless upscaling spreads it)
+    display_size = (int(frame_size[0]/divisor), int(frame_size[1]/divisor))
+    rng, handler = np.random.default_rng(1), make_handler(frame_size, display_size)
+    for zoom_level in ZOOM_LEVELS:
+        view_w, view_h = view_size(frame_size, zoom_level)
+        handler.zoom_level, handler.pan_x, handler.pan_y = zoom_level, int(rng.integers(0, frame_size[0]-view_w+1)), int(rng.integers(0, frame_size[1]-view_h+1))
+        for x, y in zip(rng.integers(0, display_size[0], 20), rng.integers(0, display_size[1], 20)):
+            raw = click(handler, int(x), int(y))
+            frame = np.zeros((frame_size[1], frame_size[0]), np.uint8); frame[raw[1], raw[0]] = 255
+            view = render_view(frame, [], zoom_level, (handler.pan_x, handler.pan_y), display_size)
+            assert view[y, x] > 0 and (view[y, x] == view.max() or view_w < display_size[0]), (zoom_level, raw, (x, y))
+
+def drain(handler, commands):
+    """Queues commands and returns what handle_commands dispatches, in order."""
+    dispatched = []
+    handler._dispatch_command = lambda command, value: dispatched.append((command, value)) or True
+    for command in commands: handler.command_queue.put(command)
+    assert handler.handle_commands()
+    return dispatched
+
+def test_drain_keeps_the_last_property_and_marker_update():
+    handler = make_handler()
+    commands = [('set_property', (cv2.CAP_PROP_FOCUS, 10)), ('update_marker', (0, {'pos': (1, 1)})), ('set_property', (cv2.CAP_PROP_EXPOSURE, -5)),
+                ('set_property', (cv2.CAP_PROP_FOCUS, 20)), ('update_marker', (1, {'pos': (2, 2)})), ('update_marker', (0, {'pos': (3, 3)})),
+                ('set_marker_size', 9), ('set_property', (cv2.CAP_PROP_FOCUS, 30)), ('set_marker_size', 25)]
+    assert drain(handler, commands) == [('set_property', (cv2.CAP_PROP_FOCUS, 30)), ('update_marker', (0, {'pos': (3, 3)})), ('set_property', (cv2.CAP_PROP_EXPOSURE, -5)),
+                                        ('update_marker', (1, {'pos': (2, 2)})), ('set_marker_size', 25)]
+    assert handler.command_stats['coalesced'] == 4 and handler.command_stats['last_depth'] == 9 and handler.command_stats['processed'] == 5
+
+def test_drain_does_not_reorder_across_barriers():
+    # delete_marker_confirmed shifts the indices update_marker refers to and move_all_markers moves every marker, so neither may be merged across
+    handler = make_handler()
+    commands = [('update_marker', (2, {'pos': (1, 1)})), ('set_property', (cv2.CAP_PROP_FOCUS, 10)), ('delete_marker_confirmed', 0),
+                ('update_marker', (2, {'pos': (2, 2)})), ('set_property', (cv2.CAP_PROP_FOCUS, 20)), ('move_all_markers', (5, 0)),
+                ('update_marker', (2, {'pos': (3, 3)})), ('update_marker', (2, {'pos': (4, 4)})), ('clear_markers', None), ('clear_markers', None)]
+    assert drain(handler, commands) == [('update_marker', (2, {'pos': (1, 1)})), ('set_property', (cv2.CAP_PROP_FOCUS, 10)), ('delete_marker_confirmed', 0),
+                                        ('update_marker', (2, {'pos': (2, 2)})), ('set_property', (cv2.CAP_PROP_FOCUS, 20)), ('move_all_markers', (5, 0)),
+                                        ('update_marker', (2, {'pos': (4, 4)})), ('clear_markers', None), ('clear_markers', None)]
+    assert handler.command_stats['coalesced'] == 1
+
+def test_drain_stamped_messages_coalesce_like_plain_ones():
+    handler = make_handler()
+    commands = [('set_property', (cv2.CAP_PROP_FOCUS, value), 0.0) for value in range(50)] + [('restart_camera', None, 0.0)]
+    assert drain(handler, commands) == [('set_property', (cv2.CAP_PROP_FOCUS, 49)), ('restart_camera', None)]
+    assert len(handler.command_stats['latency_ms']) == 2
+
+class GuiMirror:
+    """The GUI's side of the marker protocol: AppGUI's own delta handler, and the drain's sync_markers branch."""
+    _apply_marker_delta, _get_cam_state = AppGUI._apply_marker_delta, AppGUI._get_cam_state
+    def __init__(self): self.camera_states, self.command_queue = {}, queue.Queue()
+    def receive(self, message):
+        command, value = message[0], copy.deepcopy(message[1])
+        if command == 'marker_delta': self._apply_marker_delta(value, update_table=False)
+        elif command == 'sync_markers':
+            cam_index, version, markers = value
+            state = self._get_cam_state(cam_index); state['markers'], state['version'], state['awaiting_sync'] = markers, version, False
+
+def random_edit(handler, state, rng):
+    """One add, delete, edit or move-all through the same helpers mouse_events and the commands use."""
+    count, kind = len(state['markers']), rng.random()
+    marker = {"pos": (int(rng.integers(0, 640)), int(rng.integers(0, 480))), "shape": "Cross", "color": (0, 0, 255), "size": 15, "desc": str(rng.integers(100))}
+    if count == 0 or kind < 0.45: handler._insert_marker(state, int(rng.integers(0, count+1)), marker)
+    elif kind < 0.7: handler._remove_marker(state, int(rng.integers(0, count)))
+    elif kind < 0.99: handler._replace_marker(state, int(rng.integers(0, count)), marker)
+    else: handler._translate_markers(state, 1, -1)
+
+def sent(handler):
+    messages = []
+    while not handler.update_queue.empty(): messages.append(handler.update_queue.get_nowait())
+    return [message for message in messages if message[0] in ('marker_delta', 'sync_markers')]
+
+def test_marker_deltas_keep_the_gui_mirror_equal():
+    rng, handler, mirror = np.random.default_rng(0), make_handler(), GuiMirror()
+    state = handler._get_current_cam_state()
+    for _ in range(2000):
+        random_edit(handler, state, rng)
+        for message in sent(handler): mirror.receive(message)
+        assert mirror.camera_states[0]['markers'] == state['markers'].to_list()
+    assert mirror.camera_states[0]['version'] == state['version'] == 2000 and mirror.command_queue.empty()
+
+def test_full_resync_every_marker_resync_every_deltas():
+    handler = make_handler(); state = handler._get_current_cam_state()
+    for index in range(3 * handler.MARKER_RESYNC_EVERY): handler._append_marker(state, {"pos": (index, 0), "shape": "Cross", "color": (0, 0, 255), "size": 15, "desc": ""})
+    commands = [message[0] for message in sent(handler)]
+    assert len(commands) == 3 * handler.MARKER_RESYNC_EVERY
+    assert [index + 1 for index, command in enumerate(commands) if command == 'sync_markers'] == [handler.MARKER_RESYNC_EVERY * n for n in (1, 2, 3)]
+    # A move-all (or load/clear) sends the whole list at once and restarts the count
+    handler._translate_markers(state, 1, 1)
+    for index in range(handler.MARKER_RESYNC_EVERY - 1): handler._remove_marker(state, 0)
+    commands = [message[0] for message in sent(handler)]
+    assert commands[0] == 'sync_markers' and commands[1:] == ['marker_delta'] * (handler.MARKER_RESYNC_EVERY - 1)
+
+def test_dropped_delta_requests_a_full_sync():
+    rng, handler, mirror = np.random.default_rng(1), make_handler(), GuiMirror()
+    state = handler._get_current_cam_state()
+    for _ in range(50): random_edit(handler, state, rng)
+    for message in sent(handler): mirror.receive(message)
+    random_edit(handler, state, rng); assert len(sent(handler)) == 1  # lost on the way
+    for _ in range(20): random_edit(handler, state, rng)
+    for message in sent(handler): mirror.receive(message)
+    # The first delta after the gap asks for a resync once; later ones are ignored until it arrives
+    assert mirror.camera_states[0]['awaiting_sync'] and list(mirror.command_queue.queue) == [('request_marker_sync', 0)]
+    assert mirror.camera_states[0]['markers'] != state['markers'].to_list()
+    handler._dispatch_command(*mirror.command_queue.get_nowait())
+    for message in sent(handler): mirror.receive(message)
+    assert not mirror.camera_states[0]['awaiting_sync'] and mirror.camera_states[0]['version'] == state['version']
+    random_edit(handler, state, rng)
+    for message in sent(handler): mirror.receive(message)
+    assert mirror.camera_states[0]['markers'] == state['markers'].to_list() and mirror.command_queue.empty()
+
+class FlakySource(SyntheticPCBSource):
+    """A synthetic camera whose grabs start failing after `frames` frames."""
+    def __init__(self, index, frames):
+        super().__init__(index, 64, 48); self.frames_left = frames
+    def grab(self):
+        self.frames_left -= 1
+        return self.frames_left >= 0 and super().grab()
+
+class FlakyCamera:
+    """frame_source handing out a FlakySource per open, with that open's frame count from plan; None fails to open."""
+    def __init__(self, plan): self.plan, self.opens = list(plan), 0
+    def __call__(self, index):
+        frames = self.plan[min(self.opens, len(self.plan)-1)]; self.opens += 1
+        source = FlakySource(index, frames or 0)
+        if frames is None: source.release()
+        return source
+
+@pytest.fixture
+def fast_reconnect(monkeypatch):
+    monkeypatch.setattr(camera_process, 'BackgroundReconnect', functools.partial(BackgroundReconnect, base_delay=0.002, max_delay=0.01))
+
+def run_until(handler, condition, timeout=5):
+    """Steps the main loop until condition() holds; False if the loop ended first."""
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline or not handler.step(): return False
+        time.sleep(0.001)
+    return True
+
+def test_camera_lost_before_its_first_frame_reconnects(fast_reconnect):
+    display, camera = HeadlessDisplay(), FlakyCamera([0, None, None, 100])
+    handler = CameraHandler(queue.Queue(), queue.Queue(), threaded_capture=False, frame_source=camera, display=display, camera_names={0: 'Top'})
+    assert handler._initialize_camera(64, 48)
+    # No frame was ever shown, so the banner goes on a blank view of the window's size
+    assert run_until(handler, lambda: handler.banner is not None and handler.WINDOW_NAME in display.last_image)
+    image = display.last_image[handler.WINDOW_NAME]
+    assert handler.last_frame is None and handler.frame_stats['rendered'] == 0
+    assert image.shape == (48, 64, 3) and image.max() == 255 and not image[-8:].any()
+    assert run_until(handler, lambda: handler.frame_stats['rendered'] >= 5)
+    assert camera.opens == 4 and handler.reconnect is None and handler.banner is None and handler.v.isOpened()
+    assert display.last_image[handler.WINDOW_NAME][-8:].any()
+    handler.close()
+
+def test_reconnect_that_gives_up_ends_the_session(fast_reconnect):
+    camera = FlakyCamera([3, None])
+    handler = CameraHandler(queue.Queue(), queue.Queue(), threaded_capture=False, frame_source=camera, display=HeadlessDisplay(), camera_names={0: 'Top'})
+    handler.MAX_RESTART_ATTEMPTS = 4
+    assert handler._initialize_camera(64, 48)
+    assert not run_until(handler, lambda: False)
+    messages = [handler.update_queue.get_nowait()[0] for _ in range(handler.update_queue.qsize())]
+    assert messages[-1] == 'exit_gui' and camera.opens == 1 + 4
+    # Meanwhile the last good frame stayed up, redrawn under each new banner
+    assert handler.last_frame is not None and handler.frame_stats['rendered'] > 3
+    handler.close()
+
+def test_unknown_camera_index_enumerates_the_names_again(monkeypatch):
+    handler, plugged_in = make_handler(), {0: 'Top', 1: 'Side'}
+    enumerations = []
+    monkeypatch.setattr(handler, '_enumerate_camera_names', lambda: enumerations.append(1) or dict(plugged_in))
+    handler.camera_names = {0: 'Top'}
+    assert handler._get_camera_name() == 'Top' and not enumerations
+    handler.device_index = 1; assert handler._get_camera_name() == 'Side' and len(enumerations) == 1
+    # A camera plugged in after that is found by the next miss, not only at the next launch
+    plugged_in[2] = 'Hot-plugged'
+    handler.device_index = 2; assert handler._get_camera_name() == 'Hot-plugged' and len(enumerations) == 2
+    handler.device_index = 1; assert handler._get_camera_name() == 'Side' and len(enumerations) == 2
+    handler.device_index = 7; assert handler._get_camera_name() == 'Camera 7' and len(enumerations) == 3
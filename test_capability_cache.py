@@ -0,0 +1,79 @@
+# test_capability_cache.py
+# discover_camera_capabilities_cached against a fake set of cameras, counting which ones get probed.
+import json
+import os
+import threading
+
+import pytest
+
+import capability_cache
+from capability_cache import discover_camera_capabilities_cached, load_cached_capabilities
+
+class FakeCameras:
+    """Stands in for the enumeration and probing: devices maps device -> (identity, fingerprint, resolutions or None to fail)."""
+    def __init__(self, devices): self.devices, self.probed = dict(devices), []
+    def get_camera_devices(self): return list(self.devices)
+    def get_device_identities(self, devices): return [self.devices[device][:2] for device in devices]
+    def probe_devices(self, devices, min_fps):
+        self.probed.extend(devices)
+        return [{"name": device, "resolutions": [], "error": "timed out"} if self.devices[device][2] is None else {"name": device, "resolutions": self.devices[device][2]} for device in devices]
+
+@pytest.fixture
+def cameras(monkeypatch):
+    cameras = FakeCameras({"cam0": ("usb-1", "fp-a", [(640, 480), (1920, 1080)]), "cam1": ("usb-2", "fp-b", [(1280, 720)])})
+    for name in ('get_camera_devices', 'get_device_identities', 'probe_devices'): monkeypatch.setattr(capability_cache, name, getattr(cameras, name))
+    monkeypatch.setattr(capability_cache, 'camera_index', lambda position, device: position)
+    return cameras
+
+def discover(cameras, path, **kwargs):
+    cameras.probed.clear(); caps = discover_camera_capabilities_cached(path=str(path), **kwargs)
+    return caps, sorted(cameras.probed)
+
+def test_unchanged_cameras_are_not_probed_again(cameras, tmp_path):
+    path = tmp_path / "caps.json"
+    caps, probed = discover(cameras, path)
+    assert probed == ["cam0", "cam1"] and caps == {0: {"name": "cam0", "resolutions": [(640, 480), (1920, 1080)]}, 1: {"name": "cam1", "resolutions": [(1280, 720)]}}
+    assert discover(cameras, path) == (caps, []) and load_cached_capabilities(path=str(path)) == caps
+    # Another min_fps, or rescan, probes everything
+    assert discover(cameras, path, min_fps=15)[1] == ["cam0", "cam1"] and load_cached_capabilities(path=str(path)) == {}
+    assert discover(cameras, path, min_fps=15, rescan=True)[1] == ["cam0", "cam1"]
+
+def test_changed_identity_or_fingerprint_is_probed(cameras, tmp_path):
+    path = tmp_path / "caps.json"; discover(cameras, path)
+    cameras.devices["cam1"] = ("usb-2", "fp-b2", [(1280, 720), (800, 600)])
+    caps, probed = discover(cameras, path)
+    assert probed == ["cam1"] and caps[1]["resolutions"] == [(1280, 720), (800, 600)]
+    cameras.devices["cam0"] = ("usb-3", "fp-a", [(320, 240)])
+    caps, probed = discover(cameras, path)
+    assert probed == ["cam0"] and caps[0]["resolutions"] == [(320, 240)]
+    # A known camera that moved to another index keeps its entry
+    cameras.devices = {"cam1": cameras.devices["cam1"], "cam0": cameras.devices["cam0"]}
+    caps, probed = discover(cameras, path)
+    assert probed == [] and caps[0]["name"] == "cam1" and caps[1]["name"] == "cam0"
+
+def test_failed_probe_is_not_cached(cameras, tmp_path):
+    path = tmp_path / "caps.json"
+    cameras.devices["cam1"] = ("usb-2", "fp-b", None)
+    caps, probed = discover(cameras, path)
+    assert probed == ["cam0", "cam1"] and caps[1]["error"]
+    assert discover(cameras, path)[1] == ["cam1"] and 1 not in load_cached_capabilities(path=str(path))
+    cameras.devices["cam1"] = ("usb-2", "fp-b", [(1280, 720)])
+    assert discover(cameras, path)[1] == ["cam1"] and discover(cameras, path)[1] == []
+
+def test_concurrent_writes_leave_one_whole_file(tmp_path, capsys):
+    path, start = str(tmp_path / "caps.json"), threading.Barrier(8)
+    def write(writer):
+        start.wait()
+        for round in range(50): capability_cache._write_cache(path, {"version": capability_cache.CACHE_VERSION, "writer": writer, "round": round, "pad": "x" * 65536 * (writer + 1)})
+    threads = [threading.Thread(target=write, args=(writer,)) for writer in range(8)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    with open(path) as f: data = json.load(f)
+    assert data["round"] == 49 and data["pad"] == "x" * 65536 * (data["writer"] + 1)
+    assert os.listdir(tmp_path) == ["caps.json"] and "Could not write" not in capsys.readouterr().err
+
+def test_failed_write_leaves_no_temp_file(tmp_path, monkeypatch):
+    def refuse(src, dst): raise PermissionError("read-only")
+    monkeypatch.setattr(capability_cache.os, 'replace', refuse)
+    capability_cache._write_cache(str(tmp_path / "caps.json"), {"version": capability_cache.CACHE_VERSION})
+    assert os.listdir(tmp_path) == []
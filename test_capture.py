@@ -0,0 +1,105 @@
+# test_capture.py
+import random
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from capture import BackgroundReconnect, DecodePool, LatestFrameGrabber, decode_frame
+
+def jpeg(value, width=64, height=48):
+    return cv2.imencode('.jpg', np.full((height, width, 3), value, np.uint8))[1]
+
+def test_decode_frame_at_reduced_scale():
+    buffer = jpeg(200, 640, 480)
+    for reduction, size in ((1, (480, 640)), (2, (240, 320)), (4, (120, 160)), (8, (60, 80))):
+        assert decode_frame(buffer, reduction).shape[:2] == size
+    assert decode_frame(np.frombuffer(b'not a jpeg', np.uint8), 2) is None
+    decoded = np.zeros((48, 64, 3), np.uint8)
+    assert decode_frame(decoded, 4) is decoded and decode_frame(None) is None
+
+def test_pool_delivers_in_capture_order():
+    delivered, lock = [], threading.Lock()
+    def deliver(seq, frame):
+        with lock: delivered.append((seq, int(frame[0, 0, 0])))
+    buffers = [jpeg(value * 10) for value in range(20)]
+    pool = DecodePool(deliver, workers=4, max_pending=1000).start()
+    for seq, buffer in enumerate(buffers, 1): pool.submit(seq, buffer)
+    deadline = time.time() + 10
+    while pool.decoded < len(buffers) and time.time() < deadline: time.sleep(0.01)
+    pool.stop()
+    assert [seq for seq, _ in delivered] == list(range(1, 21))
+    assert all(abs(value - (seq - 1) * 10) <= 2 for seq, value in delivered)
+
+def test_pool_drops_the_oldest_waiting_frame_and_skips_corrupt_ones():
+    delivered = []
+    pool = DecodePool(lambda seq, frame: delivered.append(seq), workers=1, max_pending=2)
+    # Not started, so nothing is taken off the queue: each submit past two drops the oldest waiting buffer
+    for seq in range(1, 6): pool.submit(seq, jpeg(seq) if seq != 5 else np.frombuffer(b'garbage', np.uint8))
+    assert pool.dropped == 3 and delivered == []
+    pool.start(); deadline = time.time() + 10
+    while pool.decoded < 1 and time.time() < deadline: time.sleep(0.01)
+    time.sleep(0.05); pool.stop()
+    assert delivered == [4] and pool.decoded == 1
+
+class FakeCapture:
+    """A capture that fails the test if it is touched from two threads at once; grab() waits on `blocked` while it is clear."""
+    def __init__(self):
+        self.blocked, self.busy, self.sets, self.released = threading.Event(), False, [], False; self.blocked.set()
+    def _enter(self):
+        assert not self.busy, "capture used by two threads at once"; self.busy = True
+    def grab(self):
+        self._enter(); self.blocked.wait(); time.sleep(0.001); self.busy = False; return True
+    def retrieve(self): self._enter(); self.busy = False; return True, np.zeros((4, 4, 3), np.uint8)
+    def set(self, prop, value): self._enter(); self.sets.append((prop, value)); self.busy = False; return True
+    def release(self): self._enter(); self.released = True; self.busy = False
+
+def test_grabber_applies_property_changes_between_grabs():
+    capture = FakeCapture(); grabber = LatestFrameGrabber(capture).start()
+    for value in range(100): grabber.set_property(cv2.CAP_PROP_BRIGHTNESS, value); time.sleep(0.0005)
+    assert grabber.stop() is True and not grabber.failed
+    assert capture.sets[-1] == (cv2.CAP_PROP_BRIGHTNESS, 99) and grabber.latest()[0] > 0
+
+def test_grabber_stuck_in_the_camera_keeps_the_capture():
+    capture = FakeCapture(); grabber = LatestFrameGrabber(capture).start()
+    time.sleep(0.02); capture.blocked.clear(); time.sleep(0.02)
+    grabber.set_property(cv2.CAP_PROP_CONTRAST, 5)
+    assert grabber.stop(timeout=0.1) is False and not capture.released and capture.sets == []
+    # Once the camera answers, the thread releases the capture itself on the way out
+    capture.blocked.set(); deadline = time.time() + 5
+    while not capture.released and time.time() < deadline: time.sleep(0.01)
+    assert capture.released
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline: time.sleep(0.002)
+    return condition()
+
+def test_reconnect_backs_off_with_jitter_and_gives_up(monkeypatch):
+    waits, real_uniform = [], random.uniform
+    def uniform(low, high):
+        value = real_uniform(low, high); waits.append((low, high, value)); return value
+    monkeypatch.setattr(random, 'uniform', uniform)  # capture.py draws its jitter from the random module
+    opens, stale = [], FakeCapture()
+    reconnect = BackgroundReconnect(lambda: opens.append(time.time()), stale, base_delay=0.002, max_delay=0.01, max_attempts=6).start()
+    assert wait_for(lambda: reconnect.gave_up)
+    assert stale.released and reconnect.result is None and reconnect.attempt == len(opens) == 6
+    # Try n waits a random time in the upper half of base_delay * 2**n, capped at max_delay
+    assert [(low, high) for low, high, _ in waits] == [(delay/2, delay) for delay in (0.002, 0.004, 0.008, 0.01, 0.01, 0.01)]
+    assert all(low <= value <= high for low, high, value in waits)
+    assert all(later - earlier >= low for (earlier, later), (low, _, _) in zip(zip(opens, opens[1:]), waits[1:]))
+
+def test_reconnect_hands_over_the_first_capture_that_opens():
+    opened, results = FakeCapture(), iter([None, None])
+    reconnect = BackgroundReconnect(lambda: next(results, opened), base_delay=0.001, max_attempts=8).start()
+    assert wait_for(lambda: reconnect.result is not None)
+    assert reconnect.result is opened and reconnect.attempt == 3 and not reconnect.gave_up and not opened.released
+
+def test_cancelled_reconnect_releases_what_it_opens():
+    opening, opened = threading.Event(), FakeCapture()
+    def open_capture(): opening.wait(); return opened
+    reconnect = BackgroundReconnect(open_capture, base_delay=0.001).start()
+    assert wait_for(lambda: reconnect.attempt == 1)
+    reconnect.cancel(); opening.set()
+    assert wait_for(lambda: opened.released) and reconnect.result is None
@@ -0,0 +1,67 @@
+# test_frame_ring.py
+# FrameRingWriter/FrameRingReader across processes, and the preview images made from the ring.
+import multiprocessing
+import time
+
+import numpy as np
+import pytest
+
+from frame_ring import FrameRingReader, FrameRingWriter
+
+def read_frames(name, count, results):
+    """Reads until count distinct frames were seen; each frame is one repeated byte, so a torn read shows as mixed bytes."""
+    reader, seen, torn = FrameRingReader(name), set(), 0
+    while len(seen) < count:
+        frame = reader.latest()
+        if frame is None: continue
+        seq, _, _, _, _, data = frame
+        if len(set(data[::4097])) != 1: torn += 1
+        seen.add(seq)
+        band = reader.read_rows(100, 110, 2)
+        if band is not None and (band[-1] != 5 or len(set(band[-2])) != 1): torn += 1
+    reader.close(); results.put((len(seen), torn))
+
+def test_reader_in_another_process_never_sees_a_torn_frame():
+    writer = FrameRingWriter(640 * 480 * 3)
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=read_frames, args=(writer.name, 100, results)); process.start()
+    frames, start, written = [np.full((480, 640, 3), value, np.uint8) for value in range(8)], time.perf_counter(), 0
+    # The writer never waits for the reader, so it keeps overwriting slots the reader may be copying
+    while process.is_alive() and time.perf_counter() - start < 20: writer.write(frames[written % 8]); written += 1
+    process.join(); writer.close()
+    assert results.get(timeout=5) == (100, 0)
+
+@pytest.fixture
+def ring():
+    writer = FrameRingWriter(6 * 8 * 3); reader = FrameRingReader(writer.name)
+    yield writer, reader
+    reader.close(); writer.close()
+
+def test_latest_and_read_rows(ring):
+    writer, reader = ring
+    assert reader.latest() is None and reader.frame_size() is None and reader.latest_ppm() is None
+    frame = np.arange(6 * 8 * 3, dtype=np.uint8).reshape(6, 8, 3)
+    assert writer.write(frame, captured_at=12.5) == 1
+    assert reader.latest() == (1, 8, 6, 3, 12.5, frame.tobytes()) and reader.frame_size() == (8, 6)
+    assert reader.read_rows(1, 100, 2) == (1, 8, 6, 3, 12.5, frame[1::2].tobytes(), 3)
+    with pytest.raises(ValueError): writer.write(np.zeros((7, 8, 3), np.uint8))
+
+def test_preview_is_turned_round_and_in_rgb(ring):
+    # A bright pixel near the top-left corner shows near the bottom-right, its BGR bytes in RGB order
+    writer, reader = ring
+    frame = np.zeros((6, 8, 3), np.uint8); frame[2, 3] = (255, 128, 0); writer.write(frame)
+    full, half = reader.latest_ppm(), reader.latest_ppm(2)
+    assert full.startswith(b'P6 8 6 255\n') and full[11:][(3*8 + 4)*3:(3*8 + 5)*3] == bytes((0, 128, 255))
+    assert half.startswith(b'P6 4 3 255\n') and half[11:][(1*4 + 2)*3:(1*4 + 3)*3] == bytes((0, 128, 255))
+
+def test_greyscale_preview_and_unsupported_channels(ring):
+    writer, reader = ring
+    writer.write(np.arange(12, dtype=np.uint8).reshape(3, 4))
+    assert reader.latest_ppm() == b'P5 4 3 255\n' + bytes(range(11, -1, -1))
+    assert reader.latest_ppm(2) == b'P5 2 2 255\n' + bytes((11, 9, 3, 1))
+    writer.write(np.zeros((2, 2, 4), np.uint8))
+    with pytest.raises(ValueError): reader.latest_ppm()
+
+def test_close_unlinks_the_ring():
+    writer = FrameRingWriter(64); name = writer.name; writer.close()
+    with pytest.raises(FileNotFoundError): FrameRingReader(name)
@@ -0,0 +1,55 @@
+# test_gui_updates.py
+# AppGUI's update drain, run on a stand-in for the Tk root (no display needed): a modal dialog opened from the drain
+# spins a nested event loop, which must not start a second drain inside the first.
+import collections
+import queue
+
+import pytest
+
+import gui_module
+from gui_module import AppGUI
+
+class FakeTk:
+    def __init__(self): self.handlers = {}
+    def createfilehandler(self, fd, mask, handler): self.handlers[fd] = handler
+    def deletefilehandler(self, fd): self.handlers.pop(fd, None)
+
+class FakeRoot:
+    """Just what the drain touches; any call after destroy() fails as Tk would."""
+    _on_update_fd, _check_for_updates, _shutdown, _confirm_delete = AppGUI._on_update_fd, AppGUI._check_for_updates, AppGUI._shutdown, AppGUI._confirm_delete
+    _record_dialog_latency = AppGUI._record_dialog_latency
+    def __init__(self, messages):
+        self.tk, self.update_queue, self.command_queue = FakeTk(), queue.Queue(), queue.Queue()
+        for message in messages: self.update_queue.put(message)
+        self.update_stats = {'latency_ms': collections.deque(), 'dialog_latency_ms': collections.deque()}
+        self.frame_rings, self.destroyed, self._closed, self._update_fd, self.events = {}, False, False, 7, []
+        self.tk.createfilehandler(self._update_fd, None, self._on_update_fd)
+    def _alive(self):
+        if self.destroyed: raise gui_module.tk.TclError("application has been destroyed")
+    def destroy(self): self._alive(); self.destroyed = True
+    def attributes(self, *args): self._alive(); self.events.append(args)
+    def after_idle(self, *args): self._alive()
+    def after(self, *args): self._alive()
+    def fire_pending(self):
+        """What Tk's event loop does while the update pipe is readable."""
+        handler = self.tk.handlers.get(self._update_fd)
+        if handler is not None and not self.update_queue.empty(): handler(self._update_fd, None)
+
+def test_dialog_does_not_start_a_second_drain(monkeypatch):
+    root = FakeRoot([('confirm_delete_marker', (0, {'pos': (1, 2)})), ('exit_gui', None)])
+    # The dialog's nested event loop sees the pipe still readable (exit_gui is waiting) and runs whatever handler is set
+    monkeypatch.setattr(gui_module.messagebox, 'askyesno', lambda *args: root.fire_pending() or True)
+    root.fire_pending()
+    assert root.destroyed and root.update_queue.empty() and not root.tk.handlers
+    assert root.events == [('-topmost', True), ('-topmost', False)] and root.command_queue.get_nowait() == ('delete_marker_confirmed', 0)
+
+def test_session_ending_during_a_dialog_stops_the_drain(monkeypatch):
+    root = FakeRoot([('confirm_delete_marker', (0, {'pos': (1, 2)})), ('confirm_delete_marker', (1, {'pos': (3, 4)}))])
+    monkeypatch.setattr(gui_module.messagebox, 'askyesno', lambda *args: root._shutdown() or True)
+    root.fire_pending()
+    assert root.destroyed and root.command_queue.empty() and root.update_queue.qsize() == 1 and not root.tk.handlers
+
+def test_handler_is_restored_after_a_drain():
+    root = FakeRoot([('perf_stats', {})]); root.performance_window = None
+    root.fire_pending()
+    assert root.update_queue.empty() and root.tk.handlers == {7: root._on_update_fd}
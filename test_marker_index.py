@@ -0,0 +1,37 @@
+# test_marker_index.py
+# MarkerIndex against a linear scan of the marker list it mirrors.
+import random
+
+from marker_index import MarkerIndex
+
+FRAME_WIDTH, FRAME_HEIGHT = 4656, 3496
+
+def linear_nearest(positions, x, y):
+    return min(range(len(positions)), key=lambda i: ((positions[i][0]-x)**2 + (positions[i][1]-y)**2, i), default=-1)
+
+def test_nearest_and_in_rect_match_a_linear_scan():
+    rng = random.Random(0)
+    positions = [(rng.randrange(FRAME_WIDTH), rng.randrange(FRAME_HEIGHT)) for _ in range(3000)]
+    index = MarkerIndex({"pos": pos} for pos in positions)
+    assert MarkerIndex().nearest(10, 10) == -1 and len(index) == len(positions)
+    for _ in range(300):
+        x, y = rng.uniform(-500, FRAME_WIDTH + 500), rng.uniform(-500, FRAME_HEIGHT + 500)
+        assert index.nearest(x, y) == linear_nearest(positions, x, y)
+    rect = (1000, 1000, 1400, 1300)
+    assert index.in_rect(*rect) == [i for i, (px, py) in enumerate(positions) if rect[0] <= px <= rect[2] and rect[1] <= py <= rect[3]]
+
+def test_edits_renumber_like_the_list():
+    rng = random.Random(1)
+    positions = [(rng.randrange(FRAME_WIDTH), rng.randrange(FRAME_HEIGHT)) for _ in range(200)]
+    index = MarkerIndex({"pos": pos} for pos in positions)
+    for _ in range(300):
+        op, i, pos = rng.random(), rng.randrange(len(positions)), (rng.randrange(FRAME_WIDTH), rng.randrange(FRAME_HEIGHT))
+        if op < 0.3: positions.insert(i, pos); index.insert(i, pos)
+        elif op < 0.4: positions.append(pos); index.append(pos)
+        elif op < 0.7: positions.pop(i); index.remove(i)
+        else: positions[i] = pos; index.move(i, pos)
+        x, y = rng.uniform(0, FRAME_WIDTH), rng.uniform(0, FRAME_HEIGHT)
+        assert index.nearest(x, y) == linear_nearest(positions, x, y)
+    # Ties go to the lowest index, as with the scan
+    index.rebuild([{"pos": (5, 5)}, {"pos": (15, 5)}, {"pos": (5, 5)}])
+    assert index.nearest(10, 5) == 0 and index.nearest(5, 5) == 0
@@ -0,0 +1,59 @@
+# test_marker_store.py
+# MarkerStore against the plain list of marker dicts it stands in for, and the MarkerIndex kept alongside it.
+import random
+
+import pytest
+
+from marker_index import MarkerIndex
+from marker_store import MarkerStore
+
+FRAME_WIDTH, FRAME_HEIGHT = 4656, 3496
+
+def random_marker(rng, desc=""):
+    return {"pos": (rng.randrange(FRAME_WIDTH), rng.randrange(FRAME_HEIGHT)), "shape": rng.choice(['Cross', 'Circle', 'Square']),
+            "color": rng.choice([(0, 0, 255), (0, 255, 0), (255, 0, 0), (0, 255, 255)]), "size": rng.choice([9, 15, 25]), "desc": desc}
+
+@pytest.fixture
+def markers():
+    rng = random.Random(0)
+    return [random_marker(rng) for _ in range(2000)]
+
+def linear_nearest(markers, x, y):
+    return min(range(len(markers)), key=lambda i: ((markers[i]['pos'][0]-x)**2 + (markers[i]['pos'][1]-y)**2, i), default=-1)
+
+def test_list_face(markers):
+    store = MarkerStore(markers)
+    assert len(store) == len(markers) and store.to_list() == markers and list(store) == markers
+    assert store[0] == markers[0] and store[-1] == markers[-1]
+    with pytest.raises(IndexError): store[len(markers)]
+    with pytest.raises(IndexError): MarkerStore().pop()
+
+def test_edits_match_a_plain_list(markers):
+    rng, store = random.Random(1), MarkerStore(markers)
+    for step in range(500):
+        i, op = rng.randrange(len(markers)), rng.choice(['insert', 'append', 'pop', 'set'])
+        if op == 'insert': new = random_marker(rng, f"note {step}"); markers.insert(i, new); store.insert(i, new)
+        elif op == 'append': new = random_marker(rng, f"R{step}"); markers.append(new); store.append(new)
+        elif op == 'pop': assert store.pop(i) == markers.pop(i)
+        else: new = dict(markers[i], pos=(1, 2), color=(10, 20, 30), shape='Star'); markers[i] = new; store[i] = new
+    assert store.to_list() == markers
+    store.clear(); assert len(store) == 0 and store.to_list() == []
+
+def test_translate(markers):
+    store = MarkerStore(markers); store.translate(-5, 7)
+    assert [m['pos'] for m in store] == [(m['pos'][0] - 5, m['pos'][1] + 7) for m in markers]
+
+def test_marker_index_follows_the_store(markers):
+    # Edited as CameraHandler's marker helpers do, the grid index answers like a linear scan of the store it mirrors
+    rng, store = random.Random(3), MarkerStore(markers)
+    index = MarkerIndex(store)
+    for _ in range(300):
+        op, i = rng.random(), rng.randrange(len(store))
+        if op < 0.3: new = random_marker(rng); store.insert(i, new); index.insert(i, new['pos'])
+        elif op < 0.5: store.pop(i); index.remove(i)
+        elif op < 0.8: new = random_marker(rng); store[i] = new; index.move(i, new['pos'])
+        else: store.translate(rng.randint(-9, 9), rng.randint(-9, 9)); index.rebuild(store)
+        x, y = rng.uniform(0, FRAME_WIDTH), rng.uniform(0, FRAME_HEIGHT)
+        assert index.nearest(x, y) == linear_nearest(store.to_list(), x, y)
+    rect = (0, 0, 900, 700)
+    assert index.in_rect(*rect) == [i for i, m in enumerate(store) if rect[0] <= m['pos'][0] <= rect[2] and rect[1] <= m['pos'][1] <= rect[3]]
@@ -0,0 +1,46 @@
+# test_marker_table.py
+# MarkerTableView's row order, patched edit by edit, against the order it would rebuild from scratch. No display needed.
+import random
+
+import pytest
+
+from marker_table import MarkerTableView
+
+COLORS = {(0, 0, 255): 'Red', (0, 255, 0): 'Green', (255, 0, 0): 'Blue', (0, 255, 255): 'Yellow'}
+
+def random_marker(rng, n):
+    return {"pos": (rng.randrange(4656), rng.randrange(3496)), "shape": rng.choice(['Cross', 'Circle', 'Square']),
+            "color": rng.choice(list(COLORS) + [(1, 2, 3)]), "size": rng.choice([9, 15, 25]), "desc": rng.choice(["", "", f"R{n}", f"C{n}", f"U{n} pin"])}
+
+def rebuilt_rows(view):
+    fresh = MarkerTableView(COLORS); fresh.set_markers(view.markers)
+    fresh.set_sort(view.sort_column, view.sort_reverse); fresh.set_filter(view.filter_text)
+    return list(fresh.rows(0, len(view.markers)))
+
+def test_unsorted_rows_are_the_markers():
+    rng = random.Random(0); view = MarkerTableView(COLORS); view.set_markers([random_marker(rng, n) for n in range(10)])
+    assert list(view.rows(3, 4)) == [3, 4, 5, 6] and list(view.rows(8, 5)) == [8, 9] and len(view) == 10
+    view.markers[9] = {"pos": (12, 34), "shape": "Circle", "color": (1, 2, 3), "size": 15, "desc": "U7 pin"}
+    assert view.row_values(9) == (10, 12, 34, "Circle", "Custom", "15px", "U7 pin")
+
+def test_sort_and_filter():
+    rng = random.Random(1); markers = [random_marker(rng, n) for n in range(500)]
+    view = MarkerTableView(COLORS); view.set_markers(markers)
+    view.set_sort('desc'); view.set_filter(' R1 ')
+    assert list(view.rows(0, len(markers))) == sorted((i for i, m in enumerate(markers) if 'r1' in m['desc'].lower()), key=lambda i: (markers[i]['desc'].lower(), i))
+    view.set_sort('x', reverse=True); view.set_filter('')
+    assert list(view.rows(0, len(markers))) == sorted(range(len(markers)), key=lambda i: (markers[i]['pos'][0], i), reverse=True)
+
+@pytest.mark.parametrize("column", [None, 'index', 'x', 'y', 'shape', 'color', 'size', 'desc'])
+@pytest.mark.parametrize("reverse", [False, True])
+@pytest.mark.parametrize("text", ['', 'r1'])
+def test_edits_patch_the_order_like_a_rebuild(column, reverse, text):
+    rng = random.Random(2); markers = [random_marker(rng, n) for n in range(300)]
+    view = MarkerTableView(COLORS); view.set_markers(markers); view.set_sort(column, reverse); view.set_filter(text)
+    for step in range(150):
+        op, i = rng.random(), rng.randrange(len(markers))
+        if op < 0.3: markers.insert(i, random_marker(rng, step)); view.inserted(i)
+        elif op < 0.4: markers.append(random_marker(rng, step)); view.inserted(len(markers) - 1)
+        elif op < 0.7: markers.pop(i); view.removed(i)
+        else: markers[i] = dict(markers[i], desc=rng.choice(["", "r1 edited", f"R1{step}"]), pos=(rng.randrange(4656), 0)); view.replaced(i)
+    assert list(view.rows(0, len(markers))) == rebuilt_rows(view)
@@ -0,0 +1,71 @@
+# test_multi_camera.py
+# MultiCameraHandler's deficit round-robin and command routing, with fake cameras of fixed render cost on a fake clock.
+import queue
+
+import pytest
+
+import multi_camera
+from headless_display import HeadlessDisplay
+from multi_camera import MultiCameraHandler
+
+class FakeClock:
+    def __init__(self): self.now = 0.0
+    def perf_counter(self): return self.now
+
+class FakeCamera:
+    """What _schedule and _route_commands use of a CameraHandler; each render takes cost_ms on the clock."""
+    def __init__(self, index, cost_ms, clock):
+        self.device_index, self.cost_ms, self.clock, self.has_frames = index, cost_ms, clock, True
+        self.deficit_ms, self.render_cost_ms, self.reconnect = 0.0, 0.0, None
+        self.frame_stats, self.command_queue, self.camera_states = {'rendered': 0}, queue.Queue(), {index: {}}
+        self.busy_ms = 0.0
+    def advance(self):
+        if self.has_frames: self.clock.now += self.cost_ms / 1000; self.busy_ms += self.cost_ms; self.frame_stats['rendered'] += 1
+        return True
+    def received(self):
+        return [self.command_queue.get_nowait()[0] for _ in range(self.command_queue.qsize())]
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock(); monkeypatch.setattr(multi_camera, 'time', clock)
+    return clock
+
+def scheduler(cameras):
+    multi = MultiCameraHandler(queue.Queue(), queue.Queue(), [], display=HeadlessDisplay())
+    multi.handlers, multi.active = list(cameras), cameras[0]
+    return multi
+
+def test_slow_camera_does_not_starve_fast_ones(clock):
+    fast, medium, slow = FakeCamera(0, 2.0, clock), FakeCamera(1, 6.0, clock), FakeCamera(2, 45.0, clock)
+    multi, rounds, quantum_ms = scheduler([fast, medium, slow]), 600, 1000/30 * 0.8 / 3
+    for _ in range(rounds): multi._schedule(quantum_ms)
+    # The cheap cameras render every round; the 4K-like one renders as often as its share of the budget pays for
+    assert multi.rendered[0] == multi.rendered[1] == rounds
+    assert abs(multi.rendered[2] - rounds * quantum_ms / slow.cost_ms) <= 2
+    # No camera is serviced for more than its share of the time, give or take one render
+    for camera in (fast, medium, slow): assert camera.busy_ms <= rounds * quantum_ms + camera.cost_ms
+    assert slow.busy_ms / (rounds * quantum_ms) > 0.95
+
+def test_camera_without_frames_banks_no_credit(clock):
+    live, idle = FakeCamera(0, 5.0, clock), FakeCamera(1, 30.0, clock)
+    multi = scheduler([live, idle])
+    for _ in range(20): multi._schedule(10.0)
+    idle.has_frames = False
+    for _ in range(100): multi._schedule(10.0)
+    # Coming back after a stall it waits for fresh credit, rather than rendering back to back on what it saved up
+    assert idle.deficit_ms == 0.0
+    idle.has_frames = True; before = multi.rendered[1]
+    for _ in range(30): multi._schedule(10.0)
+    assert multi.rendered[1] - before <= 30 * 10.0 / 30.0 + 1 and multi.rendered[0] == 150
+
+def test_broadcast_commands_reach_every_camera(clock):
+    cameras = [FakeCamera(index, 1.0, clock) for index in (0, 2, 5)]
+    multi = scheduler(cameras)
+    for command in MultiCameraHandler.BROADCAST_COMMANDS: multi.command_queue.put((command, None))
+    multi.command_queue.put(('update_marker', (0, {})))
+    multi.command_queue.put(('request_marker_sync', 5))
+    assert multi._route_commands()
+    assert cameras[0].received() == list(MultiCameraHandler.BROADCAST_COMMANDS) + ['update_marker']
+    assert cameras[1].received() == list(MultiCameraHandler.BROADCAST_COMMANDS)
+    assert cameras[2].received() == list(MultiCameraHandler.BROADCAST_COMMANDS) + ['request_marker_sync']
+    multi.command_queue.put(('exit', None)); assert not multi._route_commands()
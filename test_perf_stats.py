@@ -0,0 +1,42 @@
+# test_perf_stats.py
+import csv
+import json
+import time
+
+from perf_stats import NULL_STATS, SUMMARY_FIELDS, PerfStats, export_csv, export_json
+
+def test_stage_percentiles():
+    stats = PerfStats()
+    for i in range(100): stats.add('render', float(i))
+    render = stats.summary()['stages']['render']
+    assert (render['count'], render['mean'], render['p50'], render['p95'], render['p99'], render['max']) == (100, 49.5, 50.0, 95.0, 99.0, 99.0)
+
+def test_window_keeps_the_newest_samples():
+    stats = PerfStats(window=10)
+    for i in range(100): stats.add('grab', float(i))
+    assert stats.summary()['stages']['grab']['count'] == 10 and stats.summary()['stages']['grab']['p50'] == 95.0
+
+def test_timer_rates_and_gauges():
+    stats = PerfStats()
+    with stats.time('decode'): time.sleep(0.01)
+    for _ in range(11): stats.tick('rendered'); time.sleep(0.01)
+    stats.gauge('decode_utilization', 0.5)
+    summary = stats.summary()
+    assert summary['stages']['decode']['max'] >= 10
+    assert 0 < summary['fps']['rendered'] <= 100 and summary['gauges'] == {'decode_utilization': 0.5}
+
+def test_null_stats_record_nothing():
+    with NULL_STATS.time('render'): NULL_STATS.add('render', 1.0); NULL_STATS.tick('rendered'); NULL_STATS.gauge('g', 1.0)
+    assert not NULL_STATS.enabled and NULL_STATS.summary() == {'stages': {}, 'fps': {}, 'gauges': {}}
+
+def test_exports(tmp_path):
+    stats = PerfStats(); stats.add('render', 4.0); stats.tick('rendered'); stats.gauge('undo_history_kib', 12.0)
+    summary, station = stats.summary(), {'host': 'bench-1', 'camera': 'Top'}
+    export_json(tmp_path / 'stats.json', summary, station)
+    saved = json.loads((tmp_path / 'stats.json').read_text())
+    assert saved['station'] == station and saved['stages'] == summary['stages'] and 'exported_at' in saved
+    export_csv(tmp_path / 'stats.csv', summary, station)
+    with open(tmp_path / 'stats.csv', newline='') as f: rows = list(csv.reader(f))
+    assert rows[0] == ['host', 'camera', 'kind', 'name'] + list(SUMMARY_FIELDS)
+    assert [row[:4] for row in rows[1:]] == [['bench-1', 'Top', 'stage', 'render'], ['bench-1', 'Top', 'fps', 'rendered'], ['bench-1', 'Top', 'gauge', 'undo_history_kib']]
+    assert rows[1][4:] == ['1', '4.0', '4.0', '4.0', '4.0', '4.0']
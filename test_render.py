@@ -0,0 +1,74 @@
+# test_render.py
+# render_view, MarkerOverlay and crop_zoom_patch against the original full-frame pipeline (render_view_reference).
+import cv2
+import numpy as np
+import pytest
+
+from marker_store import MarkerStore
+from render import MarkerOverlay, crop_zoom_patch, render_view, render_view_reference, view_size
+
+FRAME_SIZES = [(640, 480), (1920, 1080), (4656, 3496)]
+ZOOM_LEVELS = [1.0, 1.2, 1.44, 2.0736, 5.0, 10.0]
+
+def random_scene(frame_width, frame_height, seed=0, count=200):
+    """A noise frame and count markers of every shape, some hanging off the frame edges."""
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 256, (frame_height, frame_width, 3), dtype=np.uint8)
+    markers = [{"pos": (int(rng.integers(-20, frame_width+20)), int(rng.integers(-20, frame_height+20))),
+                "shape": str(rng.choice(['Cross', 'Circle', 'Square'])), "color": tuple(int(c) for c in rng.choice([(0, 0, 255), (0, 255, 0), (255, 0, 0), (0, 255, 255)])),
+                "size": int(rng.choice([9, 15, 25])), "desc": ""} for _ in range(count)]
+    return rng, frame, markers
+
+def random_views(rng, frame_width, frame_height, count=8):
+    for _ in range(count):
+        zoom_level = float(rng.choice(ZOOM_LEVELS))
+        view_w, view_h = view_size((frame_width, frame_height), zoom_level)
+        yield zoom_level, (int(rng.integers(0, frame_width-view_w+1)), int(rng.integers(0, frame_height-view_h+1))), (view_w, view_h)
+
+@pytest.mark.parametrize("frame_size", FRAME_SIZES)
+def test_render_view_matches_reference(frame_size):
+    rng, frame, markers = random_scene(*frame_size)
+    overlay, store = MarkerOverlay(), MarkerStore(markers)
+    for zoom_level, pan, _ in random_views(rng, *frame_size):
+        expected = render_view_reference(frame, markers, zoom_level, pan, frame_size)
+        assert np.array_equal(expected, render_view(frame, markers, zoom_level, pan, frame_size)), (zoom_level, pan)
+        assert np.array_equal(expected, render_view(frame, store, zoom_level, pan, frame_size, overlay)), (zoom_level, pan)
+
+@pytest.mark.parametrize("frame_size", FRAME_SIZES)
+def test_downscaled_view(frame_size):
+    # The overlay must match drawing at output resolution, and the image must stay close to a plain INTER_AREA resize
+    rng, frame, markers = random_scene(*frame_size, seed=1)
+    overlay, smooth_frame = MarkerOverlay(), cv2.GaussianBlur(frame, (0, 0), 4)
+    for zoom_level, pan, (view_w, view_h) in random_views(rng, *frame_size):
+        out_size = (max(1, view_w*2//5), max(1, view_h*2//5))
+        assert np.array_equal(render_view(frame, markers, zoom_level, pan, out_size), render_view(frame, markers, zoom_level, pan, out_size, overlay)), (zoom_level, pan)
+        plain = cv2.resize(render_view(smooth_frame, [], zoom_level, pan, (view_w, view_h)), out_size, interpolation=cv2.INTER_AREA)
+        assert np.abs(render_view(smooth_frame, [], zoom_level, pan, out_size).astype(int) - plain).mean() <= 2, (zoom_level, pan)
+
+@pytest.mark.parametrize("frame_size", FRAME_SIZES)
+@pytest.mark.parametrize("reduction", [2, 4, 8])
+def test_reduced_decode_view(frame_size, reduction):
+    # A frame decoded at reduced scale puts markers on the same output pixels as the full frame, and shows nearly the same image
+    frame_width, frame_height = frame_size
+    _, frame, markers = random_scene(*frame_size, seed=2)
+    overlay, smooth_frame, black = MarkerOverlay(), cv2.GaussianBlur(frame, (0, 0), 4), np.zeros_like(frame)
+    reduced_size = (-(-frame_width // reduction), -(-frame_height // reduction))
+    reduced_smooth = cv2.resize(smooth_frame, reduced_size, interpolation=cv2.INTER_AREA)
+    for zoom_level in (1.0, 1.2):
+        view_w, view_h = view_size(frame_size, zoom_level)
+        pan, out_size = ((frame_width-view_w)//2, (frame_height-view_h)//2), (view_w//reduction, view_h//reduction)
+        full = render_view(black, markers, zoom_level, pan, out_size, overlay)
+        reduced = render_view(black[:reduced_size[1], :reduced_size[0]], markers, zoom_level, pan, out_size, overlay, frame_size=frame_size)
+        assert np.array_equal(full, reduced), zoom_level
+        full = render_view(smooth_frame, [], zoom_level, pan, out_size)
+        reduced = render_view(reduced_smooth, [], zoom_level, pan, out_size, frame_size=frame_size)
+        assert np.abs(full.astype(int) - reduced).mean() <= 3, zoom_level
+
+@pytest.mark.parametrize("frame_size", FRAME_SIZES)
+def test_crop_zoom_patch_matches_padded_rotated_frame(frame_size):
+    frame_width, frame_height = frame_size
+    _, frame, markers = random_scene(*frame_size, seed=3, count=50)
+    padded = cv2.copyMakeBorder(cv2.rotate(frame, cv2.ROTATE_180), 150, 150, 150, 150, cv2.BORDER_CONSTANT, value=[0, 0, 0])
+    for marker in markers:
+        draw_x, draw_y = frame_width-1-marker['pos'][0], frame_height-1-marker['pos'][1]
+        assert np.array_equal(padded[draw_y+75:draw_y+225, draw_x+75:draw_x+225], crop_zoom_patch(frame, marker['pos'])), marker['pos']
@@ -0,0 +1,53 @@
+# test_resolution_lister.py
+# probe_devices on Linux with the native V4L2 probe and ffmpeg replaced by fakes, so no camera is needed.
+import subprocess
+import threading
+import time
+
+import pytest
+
+import resolution_lister
+from resolution_lister import probe_devices
+
+@pytest.fixture
+def native(monkeypatch):
+    """Routes each device's native probe to native.probes[device], a function of min_fps."""
+    monkeypatch.setattr(resolution_lister.sys, 'platform', 'linux')
+    monkeypatch.setattr(resolution_lister, 'camera_display_name', lambda device: device)
+    monkeypatch.setattr(resolution_lister.v4l2_native, 'is_available', lambda *args: True)
+    class Native: probes = {}
+    monkeypatch.setattr(resolution_lister.v4l2_native, 'probe_device', lambda device, min_fps: Native.probes[device](min_fps))
+    return Native
+
+def test_devices_are_probed_in_parallel(native):
+    devices = [f"/dev/video{n}" for n in range(4)]
+    all_started = threading.Barrier(len(devices), timeout=5)
+    def probe(resolutions):
+        # Only returns once every probe has started, which a one-at-a-time probe would never see
+        def wait_for_the_others(min_fps): all_started.wait(); return resolutions
+        return wait_for_the_others
+    native.probes = {device: probe([(640 * (n + 1), 480)]) for n, device in enumerate(devices)}
+    results = probe_devices(devices, 30, timeout=5, max_workers=4)
+    assert [result['name'] for result in results] == devices and [result['resolutions'] for result in results] == [[(640 * (n + 1), 480)] for n in range(4)]
+
+def test_blocking_probe_times_out_alone(native):
+    stuck = threading.Event()
+    native.probes = {"/dev/video0": lambda min_fps: [(1920, 1080)], "/dev/video1": lambda min_fps: stuck.wait(), "/dev/video2": lambda min_fps: [(1280, 720)]}
+    started = time.monotonic()
+    results = probe_devices(list(native.probes), 30, timeout=0.3)
+    assert time.monotonic() - started < 2
+    assert [result['resolutions'] for result in results] == [[(1920, 1080)], [], [(1280, 720)]]
+    assert results[1]['error'] == 'timeout' and 'error' not in results[0]
+    stuck.set()
+
+def test_ffmpeg_fallback_gets_the_remaining_time(native, monkeypatch):
+    calls = []
+    def failing_probe(min_fps): time.sleep(0.3); raise OSError(5, "Input/output error")
+    def ffmpeg(command, timeout, **kwargs):
+        calls.append(timeout)
+        return subprocess.CompletedProcess(command, 0, "", "")
+    native.probes = {"/dev/video0": failing_probe}
+    monkeypatch.setattr(resolution_lister.subprocess, 'run', ffmpeg)
+    result = probe_devices(["/dev/video0"], 30, timeout=1.0)[0]
+    # The failed native probe used 0.3 s of the second, so ffmpeg gets at most the 0.7 s left
+    assert 'error' not in result and len(calls) == 1 and 0 < calls[0] <= 0.7
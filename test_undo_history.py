@@ -0,0 +1,68 @@
+# test_undo_history.py
+# UndoHistory's diffing, merging, grouping and bounds, on a clock the tests move by hand.
+from undo_history import UndoHistory
+
+MARKER = {"pos": (0, 0), "shape": "Cross", "color": (0, 0, 255), "size": 15, "desc": ""}
+
+class FakeClock:
+    def __init__(self): self.now = 0.0
+    def __call__(self): return self.now
+
+def scroll_x(history, clock, index, start, stop, seconds_apart=0.1):
+    """Records the marker's x coordinate being scrolled from start to stop a tick at a time."""
+    for x in range(start + 1, stop + 1):
+        clock.now += seconds_apart; history.modify(index, {**MARKER, "pos": (x - 1, 0)}, {**MARKER, "pos": (x, 0)})
+
+def test_modify_keeps_only_changed_fields():
+    history = UndoHistory(clock=FakeClock())
+    history.modify(0, MARKER, dict(MARKER))
+    assert len(history) == 0
+    history.modify(0, MARKER, {**MARKER, "size": 9, "desc": "R1"})
+    assert history.undo() == ('modify', 0, {'size': (15, 9), 'desc': ("", "R1")})
+
+def test_repeated_modifies_merge_into_one_step():
+    clock = FakeClock(); history = UndoHistory(clock=clock)
+    scroll_x(history, clock, 0, 0, 10)
+    assert len(history) == 1
+    assert history.undo() == ('modify', 0, {'pos': ((0, 0), (10, 0))})
+    assert history.redo() == ('modify', 0, {'pos': ((0, 0), (10, 0))})
+
+def test_merge_window_and_other_markers_split_steps():
+    clock = FakeClock(); history = UndoHistory(clock=clock)
+    scroll_x(history, clock, 0, 0, 3)
+    clock.now += UndoHistory.MERGE_SECONDS + 0.1
+    scroll_x(history, clock, 0, 3, 5)
+    scroll_x(history, clock, 1, 0, 2)
+    assert [entry[2] for entry in history.undo_stack] == [{'pos': ((0, 0), (3, 0))}, {'pos': ((3, 0), (5, 0))}, {'pos': ((0, 0), (2, 0))}]
+
+def test_merge_back_to_start_drops_the_step():
+    clock = FakeClock(); history = UndoHistory(clock=clock)
+    history.modify(0, MARKER, {**MARKER, "size": 9}); clock.now += 0.5
+    history.modify(0, {**MARKER, "size": 9}, MARKER)
+    assert len(history) == 0 and history.nbytes == 0
+
+def test_no_merge_after_undo():
+    clock = FakeClock(); history = UndoHistory(clock=clock)
+    scroll_x(history, clock, 0, 0, 2); history.modify(1, MARKER, {**MARKER, "size": 9})
+    history.undo(); scroll_x(history, clock, 0, 2, 4)
+    assert len(history) == 2 and not history.redo_stack
+
+def test_group_is_one_step():
+    history = UndoHistory(clock=FakeClock())
+    with history.group('move_all_markers'):
+        history.modify(1, MARKER, {**MARKER, "size": 9})
+        with history.group('inner'): history.translate(5, 5)
+    assert len(history) == 1
+    assert history.undo() == ('group', 'move_all_markers', [('modify', 1, {'size': (15, 9)}), ('translate', (5, 5))])
+    with history.group('single'): history.add(0, MARKER)
+    assert history.undo() == ('add', 0, MARKER)
+
+def test_bounds_evict_oldest_steps():
+    history = UndoHistory(max_entries=3, clock=FakeClock())
+    for index in range(5): history.add(index, MARKER)
+    assert [entry[1] for entry in history.undo_stack] == [2, 3, 4] and history.evicted == 2
+    history = UndoHistory(max_bytes=2000, clock=FakeClock())
+    for index in range(50): history.add(index, {**MARKER, "desc": "x" * 50})
+    assert 0 < history.nbytes <= 2000 and history.stats()['undo'] == len(history) < 50
+    history.undo(); history.add(0, MARKER)
+    assert history.stats()['redo'] == 0 and history.nbytes == sum(entry[-1] for entry in history.undo_stack)
@@ -0,0 +1,75 @@
+# test_v4l2_native.py
+# Enumeration and probing against a fake sysfs tree and a fake ioctl, so no camera is needed.
+import errno
+import os
+
+import pytest
+
+import v4l2_native
+from v4l2_native import V4L2_CAP_DEVICE_CAPS, V4L2_CAP_VIDEO_CAPTURE, V4L2_PIX_FMT_JPEG, V4L2_PIX_FMT_MJPEG
+
+V4L2_CAP_META_CAPTURE, V4L2_PIX_FMT_YUYV = 0x00800000, v4l2_native._fourcc(b'YUYV')
+
+# node: (sysfs name, device caps, {pixel format: {(width, height): max fps}})
+NODES = {
+    0: ("Top Camera", V4L2_CAP_VIDEO_CAPTURE, {V4L2_PIX_FMT_YUYV: {(320, 240): 30},
+                                               V4L2_PIX_FMT_MJPEG: {(640, 480): 30, (1920, 1080): 60, (4656, 3496): 10}}),
+    1: ("Top Camera", V4L2_CAP_META_CAPTURE, {}),
+    2: ("Side Camera", V4L2_CAP_VIDEO_CAPTURE, {V4L2_PIX_FMT_JPEG: {(1280, 720): 30}}),
+}
+
+class FakeV4L2:
+    """open/close/ioctl stand-ins serving NODES; /dev/video<N> for any other N does not open."""
+    def __init__(self, dev_root):
+        self.dev_root, self.open_fds = dev_root, {}
+    def open(self, path, flags):
+        node = int(path[len(os.path.join(self.dev_root, "video")):])
+        if node not in NODES: raise FileNotFoundError(errno.ENOENT, "No such device", path)
+        fd = 100 + len(self.open_fds) + node * 10; self.open_fds[fd] = NODES[node]
+        return fd
+    def close(self, fd): del self.open_fds[fd]
+    def ioctl(self, fd, request, arg):
+        _, caps, formats = self.open_fds[fd]
+        if request == v4l2_native.VIDIOC_QUERYCAP: arg.capabilities, arg.device_caps = caps | V4L2_CAP_DEVICE_CAPS, caps; return
+        if request == v4l2_native.VIDIOC_ENUM_FMT: items = list(formats)
+        elif request == v4l2_native.VIDIOC_ENUM_FRAMESIZES: items = list(formats.get(arg.pixel_format, {}))
+        elif request == v4l2_native.VIDIOC_ENUM_FRAMEINTERVALS:
+            fps = formats.get(arg.pixel_format, {}).get((arg.width, arg.height)); items = [fps] if fps else []
+        else: raise OSError(errno.ENOTTY, "Inappropriate ioctl")
+        if arg.index >= len(items): raise OSError(errno.EINVAL, "Invalid argument")
+        item = items[arg.index]
+        if request == v4l2_native.VIDIOC_ENUM_FMT: arg.pixelformat = item
+        elif request == v4l2_native.VIDIOC_ENUM_FRAMESIZES: arg.type = v4l2_native.V4L2_FRMSIZE_TYPE_DISCRETE; arg.discrete.width, arg.discrete.height = item
+        else: arg.type = v4l2_native.V4L2_FRMIVAL_TYPE_DISCRETE; arg.discrete.numerator, arg.discrete.denominator = 1, item
+
+@pytest.fixture
+def fake(tmp_path):
+    sysfs = tmp_path / "video4linux"
+    for node, (name, _, _) in NODES.items():
+        (sysfs / f"video{node}").mkdir(parents=True); (sysfs / f"video{node}" / "name").write_text(name + "\n")
+    # A node that vanished between listing and opening, and an entry that is not a video node at all
+    (sysfs / "video7").mkdir(); (sysfs / "v4l-subdev0").mkdir()
+    fake = FakeV4L2(str(tmp_path / "dev"))
+    fake.kwargs = {'ioctl': fake.ioctl, 'open_fn': fake.open, 'close_fn': fake.close}
+    fake.sysfs = str(sysfs)
+    yield fake
+    assert not fake.open_fds, "device left open"
+
+def test_list_video_nodes(fake):
+    assert v4l2_native.list_video_nodes(fake.sysfs) == [(0, "Top Camera"), (1, "Top Camera"), (2, "Side Camera"), (7, "/dev/video7")]
+
+def test_list_capture_devices_skips_non_capture_nodes(fake):
+    devices = v4l2_native.list_capture_devices(fake.sysfs, fake.dev_root, **fake.kwargs)
+    assert devices == [os.path.join(fake.dev_root, "video0"), os.path.join(fake.dev_root, "video2")]
+
+def test_probe_device_keeps_mjpeg_sizes_fast_enough(fake):
+    path = os.path.join(fake.dev_root, "video0")
+    assert v4l2_native.probe_device(path, 30, **fake.kwargs) == [(640, 480), (1920, 1080)]
+    assert v4l2_native.probe_device(path, 60, **fake.kwargs) == [(1920, 1080)]
+    assert v4l2_native.probe_device(path, 0, **fake.kwargs) == [(640, 480), (1920, 1080), (4656, 3496)]
+
+def test_discover_v4l2_capabilities(fake):
+    caps = v4l2_native.discover_v4l2_capabilities(30, fake.sysfs, fake.dev_root, **fake.kwargs)
+    assert caps == {0: {"name": "Top Camera", "resolutions": [(640, 480), (1920, 1080)]},
+                    2: {"name": "Side Camera", "resolutions": [(1280, 720)]}}
+    assert v4l2_native.discover_v4l2_capabilities(31, fake.sysfs, fake.dev_root, **fake.kwargs)[2]["resolutions"] == []
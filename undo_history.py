@@ -0,0 +1,109 @@
+# undo_history.py
+import contextlib
+import sys
+import time
+
+MARKER_FIELDS = ('pos', 'shape', 'color', 'size', 'desc')
+
+def _size_of(value):
+    """Rough bytes held by an undo entry: the containers and the small values inside them."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict): return size + sum(_size_of(k) + _size_of(v) for k, v in value.items())
+    if isinstance(value, (tuple, list)): return size + sum(_size_of(item) for item in value)
+    return size
+
+class UndoHistory:
+    """One camera's undo/redo history, bounded in entries and in bytes.
+
+    Entries are tuples: ('add', index, marker), ('delete', index, marker), ('modify', index, {field: (old, new)}),
+    ('translate', (dx, dy)) for moving every marker, and ('group', label, entries) for several recorded as one
+    step. A modify keeps only the fields that changed, and a modify of the same marker within MERGE_SECONDS of
+    the last one (a spinbox being scrolled, say) is folded into it; fields that end up back where they started
+    are dropped. When either bound is passed the oldest undo steps go first. undo() and redo() hand back the
+    entry to apply or revert; the history itself never touches the markers. clock times the merge window.
+    """
+    MERGE_SECONDS = 2.0
+    def __init__(self, max_entries=500, max_bytes=4 << 20, clock=time.monotonic):
+        self.max_entries, self.max_bytes, self.clock = max_entries, max_bytes, clock
+        self.undo_stack, self.redo_stack, self.nbytes = [], [], 0
+        self._group, self._merge_until, self.evicted = None, 0.0, 0
+
+    def __len__(self): return len(self.undo_stack)
+    def _push(self, entry):
+        """Records entry as the newest step (or into the open group), dropping the redo steps it invalidates."""
+        if self._group is not None: self._group.append(entry); return
+        for old in self.redo_stack: self.nbytes -= old[-1]
+        self.redo_stack.clear()
+        self.undo_stack.append(entry + (_size_of(entry),)); self.nbytes += self.undo_stack[-1][-1]
+        while self.undo_stack and (len(self.undo_stack) > self.max_entries or self.nbytes > self.max_bytes):
+            self.nbytes -= self.undo_stack.pop(0)[-1]; self.evicted += 1
+    def add(self, index, marker): self._merge_until = 0.0; self._push(('add', index, marker))
+    def delete(self, index, marker): self._merge_until = 0.0; self._push(('delete', index, marker))
+    def translate(self, dx, dy): self._merge_until = 0.0; self._push(('translate', (dx, dy)))
+    def modify(self, index, old, new):
+        diff = {field: (old.get(field), new.get(field)) for field in MARKER_FIELDS if old.get(field) != new.get(field)}
+        if not diff: return
+        now, last = self.clock(), self.undo_stack[-1] if self.undo_stack else None
+        if self._group is None and not self.redo_stack and now < self._merge_until and last is not None and last[0] == 'modify' and last[1] == index:
+            merged = dict(last[2])
+            for field, (before, after) in diff.items(): merged[field] = (merged[field][0] if field in merged else before, after)
+            merged = {field: change for field, change in merged.items() if change[0] != change[1]}
+            self.nbytes -= self.undo_stack.pop()[-1]
+            if merged: self._push(('modify', index, merged))
+        else: self._push(('modify', index, diff))
+        self._merge_until = now + self.MERGE_SECONDS
+    @contextlib.contextmanager
+    def group(self, label):
+        """Everything recorded inside the with-block becomes one undo step; nested groups join the outer one."""
+        if self._group is not None: yield; return
+        self._group, self._merge_until = [], 0.0
+        try: yield
+        finally:
+            entries, self._group = self._group, None
+            if len(entries) == 1: self._push(entries[0])
+            elif entries: self._push(('group', label, entries))
+
+    def undo(self):
+        """The newest step, without its size, now moved to the redo stack; None if there is nothing to undo. Revert it."""
+        if not self.undo_stack: return None
+        entry = self.undo_stack.pop(); self.redo_stack.append(entry); self._merge_until = 0.0
+        return entry[:-1]
+    def redo(self):
+        """The last undone step, back on the undo stack; None if there is nothing to redo. Apply it."""
+        if not self.redo_stack: return None
+        entry = self.redo_stack.pop(); self.undo_stack.append(entry); self._merge_until = 0.0
+        return entry[:-1]
+    def clear(self):
+        self.undo_stack.clear(); self.redo_stack.clear(); self.nbytes, self._merge_until = 0, 0.0
+    def stats(self):
+        return {'undo': len(self.undo_stack), 'redo': len(self.redo_stack), 'bytes': self.nbytes, 'evicted': self.evicted}
+
+if __name__ == '__main__':
+    # A simulated shift: spinbox scrolling, clicks and deletes, against the unbounded full-dict stacks it replaces
+    import random
+    random.seed(0)
+    clock = [0.0]
+    history, naive, markers = UndoHistory(clock=lambda: clock[0]), [], []
+    for step in range(200000):
+        clock[0] += random.uniform(0.05, 3.0)
+        roll = random.random()
+        if roll < 0.1 or not markers:
+            marker = {"pos": (random.randrange(4656), random.randrange(3496)), "shape": "Cross", "color": (0, 0, 255), "size": 15, "desc": ""}
+            markers.append(marker); history.add(len(markers)-1, marker); naive.append({'action_type': 'add', 'data': marker})
+        elif roll < 0.12:
+            index = random.randrange(len(markers)); marker = markers.pop(index)
+            history.delete(index, marker); naive.append({'action_type': 'delete', 'index': index, 'data': marker})
+        else:
+            # Scrolling one marker's x coordinate a tick at a time
+            index = random.randrange(len(markers)) if roll < 0.3 else len(markers)-1
+            old = markers[index]; new = {**old, "pos": (old['pos'][0] + 1, old['pos'][1])}; markers[index] = new
+            history.modify(index, old, new); naive.append({'action_type': 'modify', 'index': index, 'old_data': old, 'new_data': new})
+    def unique_size(value, seen):
+        # Dicts shared between entries (one edit's new_data is the next one's old_data) count once
+        if id(value) in seen: return 0
+        seen.add(id(value)); size = sys.getsizeof(value)
+        if isinstance(value, dict): return size + sum(unique_size(v, seen) for v in value.values())
+        if isinstance(value, (tuple, list)): return size + sum(unique_size(item, seen) for item in value)
+        return size
+    naive_bytes = unique_size(naive, set())
+    print(f"{len(naive)} edits: full-dict stack {len(naive)} entries, ~{naive_bytes/1e6:.1f} MB; history {history.stats()}, {history.nbytes/1e6:.2f} MB")
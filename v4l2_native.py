@@ -0,0 +1,168 @@
+# v4l2_native.py
+# Camera enumeration on Linux straight from sysfs and the V4L2 ioctls, without spawning v4l2-ctl or ffmpeg.
+import ctypes
+import errno
+import os
+import re
+
+try:
+    import fcntl
+except ImportError: fcntl = None
+
+SYSFS_ROOT = "/sys/class/video4linux"
+DEV_ROOT = "/dev"
+
+# --- V4L2 ABI (linux/videodev2.h) ---
+def _fourcc(code): return code[0] | (code[1] << 8) | (code[2] << 16) | (code[3] << 24)
+V4L2_PIX_FMT_MJPEG, V4L2_PIX_FMT_JPEG = _fourcc(b'MJPG'), _fourcc(b'JPEG')
+V4L2_BUF_TYPE_VIDEO_CAPTURE = 1
+V4L2_CAP_VIDEO_CAPTURE, V4L2_CAP_DEVICE_CAPS = 0x00000001, 0x80000000
+V4L2_FRMSIZE_TYPE_DISCRETE, V4L2_FRMIVAL_TYPE_DISCRETE = 1, 1
+
+class v4l2_capability(ctypes.Structure):
+    _fields_ = [("driver", ctypes.c_char * 16), ("card", ctypes.c_char * 32), ("bus_info", ctypes.c_char * 32),
+                ("version", ctypes.c_uint32), ("capabilities", ctypes.c_uint32), ("device_caps", ctypes.c_uint32), ("reserved", ctypes.c_uint32 * 3)]
+
+class v4l2_fmtdesc(ctypes.Structure):
+    _fields_ = [("index", ctypes.c_uint32), ("type", ctypes.c_uint32), ("flags", ctypes.c_uint32), ("description", ctypes.c_char * 32),
+                ("pixelformat", ctypes.c_uint32), ("mbus_code", ctypes.c_uint32), ("reserved", ctypes.c_uint32 * 3)]
+
+class v4l2_frmsize_discrete(ctypes.Structure):
+    _fields_ = [("width", ctypes.c_uint32), ("height", ctypes.c_uint32)]
+
+class v4l2_frmsize_stepwise(ctypes.Structure):
+    _fields_ = [("min_width", ctypes.c_uint32), ("max_width", ctypes.c_uint32), ("step_width", ctypes.c_uint32),
+                ("min_height", ctypes.c_uint32), ("max_height", ctypes.c_uint32), ("step_height", ctypes.c_uint32)]
+
+class _frmsize_union(ctypes.Union):
+    _fields_ = [("discrete", v4l2_frmsize_discrete), ("stepwise", v4l2_frmsize_stepwise)]
+
+class v4l2_frmsizeenum(ctypes.Structure):
+    _anonymous_ = ("u",)
+    _fields_ = [("index", ctypes.c_uint32), ("pixel_format", ctypes.c_uint32), ("type", ctypes.c_uint32),
+                ("u", _frmsize_union), ("reserved", ctypes.c_uint32 * 2)]
+
+class v4l2_fract(ctypes.Structure):
+    _fields_ = [("numerator", ctypes.c_uint32), ("denominator", ctypes.c_uint32)]
+
+class v4l2_frmival_stepwise(ctypes.Structure):
+    _fields_ = [("min", v4l2_fract), ("max", v4l2_fract), ("step", v4l2_fract)]
+
+class _frmival_union(ctypes.Union):
+    _fields_ = [("discrete", v4l2_fract), ("stepwise", v4l2_frmival_stepwise)]
+
+class v4l2_frmivalenum(ctypes.Structure):
+    _anonymous_ = ("u",)
+    _fields_ = [("index", ctypes.c_uint32), ("pixel_format", ctypes.c_uint32), ("width", ctypes.c_uint32), ("height", ctypes.c_uint32),
+                ("type", ctypes.c_uint32), ("u", _frmival_union), ("reserved", ctypes.c_uint32 * 2)]
+
+def _IOC(direction, nr, struct): return (direction << 30) | (ctypes.sizeof(struct) << 16) | (ord('V') << 8) | nr
+_IOC_WRITE, _IOC_READ = 1, 2
+VIDIOC_QUERYCAP = _IOC(_IOC_READ, 0, v4l2_capability)
+VIDIOC_ENUM_FMT = _IOC(_IOC_READ | _IOC_WRITE, 2, v4l2_fmtdesc)
+VIDIOC_ENUM_FRAMESIZES = _IOC(_IOC_READ | _IOC_WRITE, 74, v4l2_frmsizeenum)
+VIDIOC_ENUM_FRAMEINTERVALS = _IOC(_IOC_READ | _IOC_WRITE, 75, v4l2_frmivalenum)
+
+def is_available(sysfs_root=SYSFS_ROOT): return fcntl is not None and os.path.isdir(sysfs_root)
+
+def list_video_nodes(sysfs_root=SYSFS_ROOT):
+    """[(node_number, name)] for every videoN entry in sysfs, in node order."""
+    nodes = []
+    for entry in os.listdir(sysfs_root):
+        match = re.fullmatch(r'video(\d+)', entry)
+        if not match: continue
+        try:
+            with open(os.path.join(sysfs_root, entry, "name"), 'r') as f: name = f.read().strip()
+        except OSError: name = ""
+        nodes.append((int(match.group(1)), name or f"/dev/{entry}"))
+    return sorted(nodes)
+
+class V4L2Device:
+    """An open /dev/videoN node. The ioctl and open/close functions can be swapped out to test without hardware."""
+    def __init__(self, path, ioctl=None, open_fn=os.open, close_fn=os.close):
+        self.path, self._ioctl, self._close = path, ioctl or fcntl.ioctl, close_fn
+        self.fd = open_fn(path, os.O_RDWR | os.O_NONBLOCK)
+    def close(self): self._close(self.fd)
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+    def _enumerate(self, request, struct):
+        """Yields filled-in copies of struct for index 0, 1, ... until the driver answers EINVAL."""
+        index = 0
+        while True:
+            struct.index = index
+            try: self._ioctl(self.fd, request, struct)
+            except OSError as e:
+                if e.errno == errno.EINVAL: return
+                raise
+            yield struct
+            index += 1
+
+    def is_capture_device(self):
+        cap = v4l2_capability()
+        self._ioctl(self.fd, VIDIOC_QUERYCAP, cap)
+        caps = cap.device_caps if cap.capabilities & V4L2_CAP_DEVICE_CAPS else cap.capabilities
+        return bool(caps & V4L2_CAP_VIDEO_CAPTURE)
+
+    def pixel_formats(self):
+        return [desc.pixelformat for desc in self._enumerate(VIDIOC_ENUM_FMT, v4l2_fmtdesc(type=V4L2_BUF_TYPE_VIDEO_CAPTURE))]
+
+    def frame_sizes(self, pixel_format):
+        sizes = []
+        for size in self._enumerate(VIDIOC_ENUM_FRAMESIZES, v4l2_frmsizeenum(pixel_format=pixel_format)):
+            if size.type == V4L2_FRMSIZE_TYPE_DISCRETE: sizes.append((size.discrete.width, size.discrete.height))
+            else:
+                # Continuous/stepwise ranges would list thousands of sizes; offer the two ends
+                step = size.stepwise
+                sizes += [(step.min_width, step.min_height), (step.max_width, step.max_height)]
+                break
+        return sizes
+
+    def max_fps(self, pixel_format, width, height):
+        best = 0.0
+        for interval in self._enumerate(VIDIOC_ENUM_FRAMEINTERVALS, v4l2_frmivalenum(pixel_format=pixel_format, width=width, height=height)):
+            # A stepwise range's shortest interval is its min entry
+            fract = interval.discrete if interval.type == V4L2_FRMIVAL_TYPE_DISCRETE else interval.stepwise.min
+            if fract.numerator: best = max(best, fract.denominator / fract.numerator)
+            if interval.type != V4L2_FRMIVAL_TYPE_DISCRETE: break
+        return best
+
+    def mjpeg_resolutions(self, min_fps):
+        found_resolutions = set()
+        for pixel_format in self.pixel_formats():
+            if pixel_format not in (V4L2_PIX_FMT_MJPEG, V4L2_PIX_FMT_JPEG): continue
+            for w, h in self.frame_sizes(pixel_format):
+                if self.max_fps(pixel_format, w, h) >= min_fps: found_resolutions.add((w, h))
+        return sorted(found_resolutions, key=lambda res: res[0]*res[1])
+
+def list_capture_devices(sysfs_root=SYSFS_ROOT, dev_root=DEV_ROOT, ioctl=None, open_fn=os.open, close_fn=os.close):
+    """Device paths of the nodes that can capture video, skipping metadata and output nodes."""
+    devices = []
+    for node, name in list_video_nodes(sysfs_root):
+        path = os.path.join(dev_root, f"video{node}")
+        try:
+            with V4L2Device(path, ioctl, open_fn, close_fn) as device:
+                if device.is_capture_device(): devices.append(path)
+        except OSError: continue
+    return devices
+
+def probe_device(path, min_fps, ioctl=None, open_fn=os.open, close_fn=os.close):
+    with V4L2Device(path, ioctl, open_fn, close_fn) as device: return device.mjpeg_resolutions(min_fps)
+
+def discover_v4l2_capabilities(min_fps=30, sysfs_root=SYSFS_ROOT, dev_root=DEV_ROOT, ioctl=None, open_fn=os.open, close_fn=os.close):
+    """{node_number: {"name", "resolutions"}} for every capture node, the same shape as discover_camera_capabilities."""
+    names = dict(list_video_nodes(sysfs_root))
+    all_camera_caps = {}
+    for path in list_capture_devices(sysfs_root, dev_root, ioctl, open_fn, close_fn):
+        node = int(re.search(r'(\d+)$', path).group(1))
+        try: resolutions = probe_device(path, min_fps, ioctl, open_fn, close_fn)
+        except OSError as e: all_camera_caps[node] = {"name": names[node], "resolutions": [], "error": str(e)}; continue
+        all_camera_caps[node] = {"name": names[node], "resolutions": resolutions}
+    return all_camera_caps
+
+if __name__ == '__main__':
+    if not is_available(): print("V4L2 sysfs interface not available on this system.")
+    else:
+        for node, caps in discover_v4l2_capabilities(min_fps=0).items():
+            res_str = ", ".join(f"{w}x{h}" for w, h in caps['resolutions']) or caps.get('error', 'no MJPEG sizes')
+            print(f"/dev/video{node} | {caps['name']} | {res_str}")